@@ -15,7 +15,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import settings
 from database import Base
 # Import all models to ensure they are registered
-from models import user, habit, entry, score
+from models import user, habit, entry, bitmap, score, rollup, heatmap, streak, alert
 
 # this is the Alembic Config object
 config = context.config
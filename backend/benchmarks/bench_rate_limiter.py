@@ -0,0 +1,71 @@
+"""
+Benchmark - per-request overhead of the rate limiter middleware
+
+Run from backend/:  python -m benchmarks.bench_rate_limiter
+"""
+import asyncio
+import time
+import uuid
+
+from middleware.rate_limiter import InMemoryBucketStore, RateLimitMiddleware
+from services.auth_service import AuthService
+
+
+async def _app(scope, receive, send):
+    pass
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+def _scope(path: str, token: str | None = None, ip: str = "10.0.0.1") -> dict:
+    headers = [(b"host", b"test")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "path": path, "headers": headers, "client": (ip, 1234)}
+
+
+async def _per_call_us(app, scopes, number: int) -> float:
+    started = time.perf_counter()
+    for i in range(number):
+        await app(scopes[i % len(scopes)], _receive, _send)
+    return (time.perf_counter() - started) / number * 1e6
+
+
+async def main(number: int = 200_000):
+    limiter = RateLimitMiddleware(
+        _app, store=InMemoryBucketStore(), per_minute=10**9, auth_per_hour=10**9
+    )
+    tokens = [AuthService.create_access_token(uuid.uuid4()) for _ in range(1000)]
+    cases = {
+        "bare app": (_app, [_scope("/api/habits")]),
+        "anonymous (IP)": (limiter, [_scope("/api/habits", ip=f"10.0.{i // 256}.{i % 256}") for i in range(1000)]),
+        "1000 users (cached token)": (limiter, [_scope("/api/habits", t) for t in tokens]),
+        "auth route (IP)": (limiter, [_scope("/api/auth/login")]),
+    }
+
+    # Warm the token cache so the numbers show the steady state
+    await _per_call_us(limiter, cases["1000 users (cached token)"][1], len(tokens))
+
+    print(f"{'case':<28}{'µs/request':>12}")
+    baseline = None
+    for name, (app, scopes) in cases.items():
+        us = await _per_call_us(app, scopes, number)
+        if baseline is None:
+            baseline = us
+            print(f"{name:<28}{us:>12.2f}")
+        else:
+            print(f"{name:<28}{us:>12.2f}  (+{us - baseline:.2f})")
+
+    cold = RateLimitMiddleware(_app, store=InMemoryBucketStore(), per_minute=10**9, auth_per_hour=10**9)
+    cold_us = await _per_call_us(cold, cases["1000 users (cached token)"][1], len(tokens))
+    print(f"{'first request per token':<28}{cold_us:>12.2f}  (JWT verify, once per token)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Benchmark - JSON rendering time, response validation cost and bytes on the
+wire for analytics payloads
+
+Run from backend/:  python -m benchmarks.bench_responses
+"""
+import timeit
+import uuid
+from datetime import date, timedelta
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from middleware.compression import compress, brotli
+from responses import FastJSONResponse, trusted_response
+from schemas.analytics import WeeklyAnalytics, MonthlyAnalytics, TrendData
+
+
+def weekly_payload(habit_count: int = 15) -> WeeklyAnalytics:
+    breakdown = [
+        {
+            "habit_id": str(uuid.uuid4()),
+            "habit_name": f"Habit {i}",
+            "category": "health" if i % 2 else "learning",
+            "completed_count": i % 7,
+            "target_count": 7,
+            "completion_rate": round(100 * (i % 7) / 7, 1),
+            "weight": 1 + i % 3,
+            "weighted_contribution": 3.25,
+            "is_below_threshold": i % 3 == 0,
+        }
+        for i in range(habit_count)
+    ]
+    insights = [
+        {"icon": "📈", "message": f"Habit {i} improved by {i * 5}%", "impact": i * 1.5}
+        for i in range(5)
+    ]
+    return WeeklyAnalytics(
+        week_start=date(2024, 3, 4),
+        week_end=date(2024, 3, 10),
+        completion_rate=71.4,
+        weighted_score=68.2,
+        consistency_score=80.0,
+        total_completed=75,
+        total_possible=105,
+        habit_breakdown=breakdown,
+        insights=insights,
+        daily_rates=[60.0, 73.3, 80.0, 66.7, 86.7, 53.3, 80.0],
+        comparison_to_last_week=4.2,
+    )
+
+
+def monthly_payload(habit_count: int = 15) -> MonthlyAnalytics:
+    habits = [
+        {
+            "habit_id": str(uuid.uuid4()),
+            "habit_name": f"Habit {i}",
+            "category": "health",
+            "completion_rate": 50.0 + i,
+            "weight": 2,
+        }
+        for i in range(habit_count)
+    ]
+    return MonthlyAnalytics(
+        month=3,
+        year=2024,
+        avg_completion_rate=70.1,
+        avg_weighted_score=66.9,
+        consistency_trend=1.8,
+        performance_grade="B",
+        top_habits=habits[:3],
+        struggling_habits=habits[-3:],
+        weekly_scores=[61.0, 64.5, 70.2, 72.8, 66.1],
+        score_explanation=[{"icon": "⭐", "message": "Strong finish", "impact": 2.0}],
+    )
+
+
+def trend_payload(weeks: int = 104) -> TrendData:
+    start = date(2022, 1, 3)
+    return TrendData(
+        period="weekly",
+        labels=[(start + timedelta(weeks=i)).isoformat() for i in range(weeks)],
+        completion_rates=[50 + (i * 7) % 40 + 0.5 for i in range(weeks)],
+        weighted_scores=[45 + (i * 11) % 45 + 0.25 for i in range(weeks)],
+        consistency_scores=[60 + (i * 3) % 30 + 0.1 for i in range(weeks)],
+    )
+
+
+def render_default(model) -> bytes:
+    """Stock JSONResponse over the same serialized model FastAPI produces"""
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+def render_fast(model) -> bytes:
+    return FastJSONResponse(model.model_dump(mode="json")).body
+
+
+def validated_path(content: dict) -> bytes:
+    """Previous path: build the model, then FastAPI dumps and re-validates it"""
+    adapter = TypeAdapter(WeeklyAnalytics)
+    model = WeeklyAnalytics(**content)
+    validated = adapter.validate_python(model.model_dump())
+    return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+
+def trusted_path(content: dict) -> bytes:
+    return trusted_response(WeeklyAnalytics, content).body
+
+
+def bench_validation(number: int = 500):
+    print(f"\n{'habits':<8}{'validated µs':>14}{'trusted µs':>12}")
+    for habit_count in (10, 50, 200):
+        content = weekly_payload(habit_count).model_dump()
+        validated_us = timeit.timeit(lambda: validated_path(content), number=number) / number * 1e6
+        trusted_us = timeit.timeit(lambda: trusted_path(content), number=number) / number * 1e6
+        print(f"{habit_count:<8}{validated_us:>14.1f}{trusted_us:>12.1f}")
+
+
+def main(number: int = 2000):
+    payloads = {
+        "weekly": weekly_payload(),
+        "monthly": monthly_payload(),
+        "trends(104w)": trend_payload(),
+    }
+    print(f"{'payload':<14}{'default µs':>12}{'orjson µs':>12}{'raw B':>9}{'gzip B':>9}{'br B':>9}")
+    for name, model in payloads.items():
+        default_us = timeit.timeit(lambda: render_default(model), number=number) / number * 1e6
+        fast_us = timeit.timeit(lambda: render_fast(model), number=number) / number * 1e6
+        body = render_fast(model)
+        gzip_size = len(compress(body, "gzip"))
+        br_size = len(compress(body, "br")) if brotli is not None else "-"
+        print(f"{name:<14}{default_us:>12.1f}{fast_us:>12.1f}{len(body):>9}{gzip_size:>9}{br_size:>9}")
+
+
+if __name__ == "__main__":
+    main()
+    bench_validation()
@@ -2,14 +2,17 @@
 Database connection and session management
 """
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import text
 from sqlalchemy.orm import DeclarativeBase
 
 # Import settings lazily to avoid issues
 def get_engine():
     from config import settings
+    from middleware.db_timing import TimedQueuePool
     return create_async_engine(
         settings.DATABASE_URL,
         echo=settings.DEBUG,
+        poolclass=TimedQueuePool,
         pool_size=5,
         max_overflow=10,
         pool_pre_ping=True
@@ -30,6 +33,12 @@ def get_session_factory():
     global _engine, _session_factory
     if _session_factory is None:
         _engine = get_engine()
+        from middleware.db_timing import install_db_timing
+        from middleware.profiler import install_profiler
+        from middleware.slow_queries import install_slow_query_log
+        install_db_timing(_engine)
+        install_slow_query_log(_engine)
+        install_profiler(_engine)
         _session_factory = async_sessionmaker(
             _engine,
             class_=AsyncSession,
@@ -38,6 +47,12 @@ def get_session_factory():
     return _session_factory
 
 
+def get_db_engine():
+    """Shared engine, for background jobs that work outside a request session"""
+    get_session_factory()
+    return _engine
+
+
 async def get_db() -> AsyncSession:
     """Dependency for getting database sessions"""
     factory = get_session_factory()
@@ -52,8 +67,75 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def _read_only_session(deferrable: bool) -> AsyncSession:
+    factory = get_session_factory()
+    async with factory() as session:
+        options = {"postgresql_readonly": True}
+        if deferrable:
+            # A DEFERRABLE read-only snapshot never takes part in serialization
+            # conflicts, so multi-query reports see one consistent state
+            options.update(isolation_level="SERIALIZABLE", postgresql_deferrable=True)
+        await session.connection(execution_options=options)
+        try:
+            yield session
+        finally:
+            # Nothing to commit: closing ends the transaction and frees the connection
+            await session.close()
+
+
+async def get_read_db() -> AsyncSession:
+    """Dependency for GET endpoints: READ ONLY transaction, never committed"""
+    async for session in _read_only_session(deferrable=False):
+        yield session
+
+
+async def get_analytics_db() -> AsyncSession:
+    """Dependency for multi-query analytics reads: SERIALIZABLE READ ONLY DEFERRABLE"""
+    async for session in _read_only_session(deferrable=True):
+        yield session
+
+
+async def release(session: AsyncSession):
+    """
+    Hand a read-only session's connection back to the pool before CPU-bound
+    work. Already-loaded objects stay readable; nothing can be lazy-loaded
+    afterwards. Never call this on a session with pending writes.
+    """
+    await session.close()
+
+
+def _unique_constraint(name: str, table: str, columns: str) -> str:
+    # Keep the most recently calculated row of each duplicate group first
+    return f"""
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN
+            DELETE FROM {table} AS a USING {table} AS b
+            WHERE {" AND ".join(f"a.{c} = b.{c}" for c in columns.split(", "))}
+              AND (a.calculated_at, a.id) < (b.calculated_at, b.id);
+            ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({columns});
+        END IF;
+    END $$
+    """
+
+
+# create_all only creates missing tables; these bring tables created by
+# earlier versions up to date, and are no-ops on current ones
+_UPGRADES = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0",
+    _unique_constraint("unique_user_week", "weekly_scores", "user_id, week_start"),
+    _unique_constraint("unique_user_month", "monthly_scores", "user_id, year, month"),
+]
+
+
+async def upgrade_schema(conn) -> None:
+    """Apply _UPGRADES on an open connection"""
+    for statement in _UPGRADES:
+        await conn.execute(text(statement))
+
+
 async def init_db():
     """Initialize database tables"""
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await upgrade_schema(conn)
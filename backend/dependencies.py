@@ -1,16 +1,22 @@
 """
 Dependencies - Shared dependencies for routers
 """
-from fastapi import Depends, HTTPException, status
+from datetime import date
+from typing import Callable, Dict, Optional
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from database import get_db
+from config import settings
+from database import get_db, get_read_db, get_analytics_db
+from middleware.error_handler import NotModified
 from services.auth_service import AuthService
+from services.data_version import DataVersion
 from models.user import User
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 async def get_current_user(
@@ -18,6 +24,49 @@ async def get_current_user(
     db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current authenticated user from JWT token"""
+    return await _authenticate(credentials, db)
+
+
+async def get_current_user_read(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """Current user, loaded through the same read-only session as the endpoint"""
+    return await _authenticate(credentials, db)
+
+
+async def get_current_user_analytics(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_analytics_db)
+) -> User:
+    """Current user, loaded through the same analytics snapshot as the endpoint"""
+    return await _authenticate(credentials, db)
+
+
+async def get_current_user_stream(
+    access_token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """
+    Current user for streaming endpoints. EventSource cannot send headers,
+    so the access token may also come as the access_token query parameter.
+    """
+    if credentials is None:
+        if not access_token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated"
+            )
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token)
+    return await _authenticate(credentials, db)
+
+
+async def _authenticate(
+    credentials: HTTPAuthorizationCredentials,
+    db: AsyncSession
+) -> User:
+    """Resolve the bearer token to a user"""
     token = credentials.credentials
     payload = AuthService.decode_token(token)
     
@@ -42,3 +91,59 @@ async def get_current_user(
         )
     
     return user
+
+
+def conditional_user(
+    user_dependency: Callable,
+    period_end: Optional[Callable[[Dict[str, str]], date]] = None
+) -> Callable:
+    """
+    Wrap a user dependency with ETag handling for GET endpoints.
+
+    The ETag comes from the user's data_version, so a matching If-None-Match
+    is answered with 304 before the endpoint does any work. period_end maps
+    the raw path params to the last day the response covers; responses for
+    periods that ended before today get a long-lived Cache-Control.
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        current_user: User = Depends(user_dependency)
+    ) -> User:
+        today = date.today()
+        end = _resolve_period_end(period_end, request.path_params)
+        closed = end is not None and end < today
+        
+        etag = DataVersion.etag(
+            current_user.id,
+            current_user.data_version,
+            request.url.path,
+            request.url.query,
+            None if closed else today
+        )
+        if closed:
+            cache_control = f"private, max-age={settings.CLOSED_PERIOD_MAX_AGE}"
+        else:
+            cache_control = "private, no-cache"
+        
+        if DataVersion.matches(request.headers.get("if-none-match"), etag):
+            raise NotModified(etag, cache_control)
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
+        return current_user
+    
+    return dependency
+
+
+def _resolve_period_end(
+    period_end: Optional[Callable[[Dict[str, str]], date]],
+    path_params: Dict[str, str]
+) -> Optional[date]:
+    """Malformed params are left for the endpoint's own validation to reject"""
+    if period_end is None:
+        return None
+    try:
+        return period_end(path_params)
+    except (KeyError, ValueError):
+        return None
@@ -8,8 +8,9 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
 from database import init_db
-from routers import auth_router, habits_router, entries_router, analytics_router
-from middleware import setup_error_handlers, setup_rate_limiter
+from routers import auth_router, habits_router, entries_router, analytics_router, stream_router
+from middleware import setup_error_handlers, setup_rate_limiter, setup_db_timing, setup_compression, setup_metrics, setup_profiler
+from responses import FastJSONResponse
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -21,9 +22,21 @@ async def lifespan(app: FastAPI):
     try:
         await init_db()
         logger.info("Database initialized")
+        from services.partition_manager import run_partition_maintenance
+        await run_partition_maintenance()
+        from services.rollups import run_rollup_backfill
+        await run_rollup_backfill()
+        from services.streaks import run_streak_backfill
+        await run_streak_backfill()
     except Exception as e:
         logger.error(f"Database init failed: {e}")
     
+    try:
+        from services.events import get_broker
+        await get_broker().start()
+    except Exception as e:
+        logger.warning(f"Event broker start failed, streams are local to this worker: {e}")
+    
     # Start scheduler in background (non-blocking)
     try:
         from services.scheduler import setup_scheduler
@@ -40,23 +53,35 @@ async def lifespan(app: FastAPI):
         shutdown_scheduler()
     except Exception:
         pass
+    try:
+        from services.events import get_broker
+        await get_broker().stop()
+    except Exception:
+        pass
 
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Data-driven habit tracking platform",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
+# Rate limiter sits inside CORS so 429s carry CORS headers and preflights are free
+setup_rate_limiter(app)
 app.add_middleware(CORSMiddleware, allow_origins=settings.CORS_ORIGINS, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 setup_error_handlers(app)
-setup_rate_limiter(app)
+setup_db_timing(app)
+setup_profiler(app)
+setup_compression(app)
 
 app.include_router(auth_router, prefix="/api")
 app.include_router(habits_router, prefix="/api")
 app.include_router(entries_router, prefix="/api")
 app.include_router(analytics_router, prefix="/api")
+app.include_router(stream_router, prefix="/api")
+setup_metrics(app)
 
 
 @app.get("/health")
@@ -2,6 +2,10 @@
 Middleware package
 """
 from middleware.error_handler import setup_error_handlers
-from middleware.rate_limiter import limiter, setup_rate_limiter
+from middleware.rate_limiter import setup_rate_limiter
+from middleware.db_timing import setup_db_timing
+from middleware.compression import setup_compression
+from middleware.metrics import setup_metrics
+from middleware.profiler import setup_profiler
 
-__all__ = ["setup_error_handlers", "limiter", "setup_rate_limiter"]
+__all__ = ["setup_error_handlers", "setup_rate_limiter", "setup_db_timing", "setup_compression", "setup_metrics", "setup_profiler"]
@@ -0,0 +1,144 @@
+"""
+Database timing per request - connection hold time versus query time
+
+Pool checkout/checkin and cursor execute events are attributed to the request
+that is running (via a context variable). Each response carries a
+Server-Timing header, e.g. `db;dur=3.2, conn;dur=4.0, pool;dur=0.1`, and the
+request's latency and database work go to middleware.metrics.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from middleware.metrics import record_pool_wait, record_request
+
+logger = logging.getLogger(__name__)
+
+
+class RequestDBStats:
+    """Database work done while serving one request"""
+    __slots__ = ("query_count", "query_time", "hold_time", "pool_wait")
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.hold_time = 0.0
+        self.pool_wait = 0.0
+
+
+_current: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_stats() -> Optional[RequestDBStats]:
+    """Stats of the request being served, if any"""
+    return _current.get()
+
+
+def install_db_timing(engine: AsyncEngine):
+    """Attach query and connection-hold timers to an engine"""
+    sync_engine = engine.sync_engine
+
+    # The start time lives on the statement's execution context, so a
+    # statement that raises (and never reaches after_cursor_execute) leaves
+    # nothing behind on the pooled connection
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        stats = _current.get()
+        if stats is not None:
+            stats.query_count += 1
+            stats.query_time += elapsed
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        # Remember which request holds the connection; checkin may run elsewhere
+        connection_record.info["checked_out"] = (time.perf_counter(), _current.get())
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        checked_out = connection_record.info.pop("checked_out", None)
+        if checked_out is None:
+            return
+        started, stats = checked_out
+        if stats is not None:
+            stats.hold_time += time.perf_counter() - started
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times each checkout. The pool has no event for "started
+    waiting", so the wait is measured around _do_get; it includes opening a
+    new connection when the pool has to grow.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            record_pool_wait(waited)
+            stats = _current.get()
+            if stats is not None:
+                stats.pool_wait += waited
+
+
+class DBTimingMiddleware:
+    """
+    ASGI middleware that scopes RequestDBStats to each HTTP request and
+    records its latency, status and database work per route
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestDBStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Connections are released before the response starts
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f"db;dur={stats.query_time * 1000:.1f}, "
+                    f"conn;dur={stats.hold_time * 1000:.1f}, "
+                    f"pool;dur={stats.pool_wait * 1000:.1f}".encode()
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else None
+            record_request(scope["method"], path, status, time.perf_counter() - started, stats)
+            if path is not None:
+                logger.debug(
+                    f"{path}: {stats.query_count} queries, query {stats.query_time * 1000:.1f}ms, "
+                    f"held {stats.hold_time * 1000:.1f}ms, pool wait {stats.pool_wait * 1000:.1f}ms"
+                )
+
+
+def setup_db_timing(app):
+    """Register the middleware with the app"""
+    app.add_middleware(DBTimingMiddleware)
@@ -3,7 +3,7 @@ Centralized error handling
 """
 import logging
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.exc import IntegrityError
 
 logger = logging.getLogger(__name__)
@@ -17,9 +17,23 @@ class AppException(Exception):
         self.status_code = status_code
 
 
+class NotModified(Exception):
+    """Raised by conditional GETs when the client's cached copy is still current"""
+    def __init__(self, etag: str, cache_control: str):
+        self.etag = etag
+        self.cache_control = cache_control
+
+
 def setup_error_handlers(app: FastAPI):
     """Register error handlers with the app"""
     
+    @app.exception_handler(NotModified)
+    async def not_modified_handler(request: Request, exc: NotModified):
+        return Response(
+            status_code=304,
+            headers={"ETag": exc.etag, "Cache-Control": exc.cache_control}
+        )
+    
     @app.exception_handler(AppException)
     async def app_exception_handler(request: Request, exc: AppException):
         logger.error(f"AppException: {exc.code} - {exc.message}")
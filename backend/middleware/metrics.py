@@ -0,0 +1,219 @@
+"""
+Request metrics - per-route latency, SQL and pool histograms
+
+Recording is a bisect and a few additions per request, so it stays on in
+production. GET /metrics renders everything in the Prometheus text format;
+p50/p95/p99 come from the histogram buckets (histogram_quantile in
+Prometheus, or route_summary() here).
+"""
+import hmac
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response
+
+from config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Requests that matched no route share one label instead of one per raw path
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """Fixed upper bounds; counts[i] is observations <= bounds[i] and > bounds[i-1]"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs as Prometheus expects, ending with +Inf"""
+        pairs, running = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            pairs.append(("+Inf" if bound == float("inf") else repr(float(bound)), running))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Linear interpolation inside the bucket, like histogram_quantile()"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        running, lower = 0, 0.0
+        for bound, count in zip(self.bounds, self.counts):
+            if count and running + count >= rank:
+                return lower + (bound - lower) * (rank - running) / count
+            running += count
+            lower = bound
+        # Past the last bound there is nothing to interpolate against
+        return self.bounds[-1]
+
+
+class RouteMetrics:
+    """Everything recorded for one (method, route) pair"""
+    __slots__ = ("latency", "queries", "query_time", "hold_time", "pool_wait", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_time = Histogram(DB_TIME_BUCKETS)
+        self.hold_time = 0.0
+        self.pool_wait = 0.0
+        self.statuses: Dict[int, int] = {}
+
+
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+_pool_wait = Histogram(POOL_WAIT_BUCKETS)
+
+
+def record_request(method: str, route: Optional[str], status: int, duration: float, stats) -> None:
+    """Called once per finished HTTP request with its RequestDBStats"""
+    key = (method, route or UNMATCHED_ROUTE)
+    metrics = _routes.get(key)
+    if metrics is None:
+        metrics = _routes[key] = RouteMetrics()
+    metrics.latency.observe(duration)
+    metrics.queries.observe(stats.query_count)
+    metrics.query_time.observe(stats.query_time)
+    metrics.hold_time += stats.hold_time
+    metrics.pool_wait += stats.pool_wait
+    metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+
+def record_pool_wait(seconds: float) -> None:
+    """Time spent getting a connection out of the pool, including connecting"""
+    _pool_wait.observe(seconds)
+
+
+def reset() -> None:
+    _routes.clear()
+    _pool_wait.__init__(POOL_WAIT_BUCKETS)
+
+
+def route_summary() -> Dict[str, Dict]:
+    """Per-route request counts, latency percentiles and DB totals, in milliseconds"""
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 2)
+
+    summary = {}
+    for (method, route), metrics in _routes.items():
+        requests = metrics.latency.count
+        summary[f"{method} {route}"] = {
+            "requests": requests,
+            "p50_ms": ms(metrics.latency.quantile(0.5)),
+            "p95_ms": ms(metrics.latency.quantile(0.95)),
+            "p99_ms": ms(metrics.latency.quantile(0.99)),
+            "queries": int(metrics.queries.sum),
+            "avg_queries": round(metrics.queries.sum / requests, 2),
+            "avg_query_ms": ms(metrics.query_time.sum / requests),
+            "avg_hold_ms": ms(metrics.hold_time / requests),
+            "avg_pool_wait_ms": ms(metrics.pool_wait / requests),
+        }
+    return summary
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram_lines(lines: List[str], name: str, histogram: Histogram, **labels):
+    for le, count in histogram.cumulative():
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {count}")
+    lines.append(f"{name}_sum{_labels(**labels) if labels else ''} {histogram.sum!r}")
+    lines.append(f"{name}_count{_labels(**labels) if labels else ''} {histogram.count}")
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    routes = sorted(_routes.items())
+    lines: List[str] = []
+
+    lines.append("# HELP ppas_http_requests_total HTTP requests by route and status")
+    lines.append("# TYPE ppas_http_requests_total counter")
+    for (method, route), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(
+                f"ppas_http_requests_total{_labels(method=method, route=route, status=status)} {count}"
+            )
+
+    lines.append("# HELP ppas_http_request_duration_seconds Time to serve a request, by route")
+    lines.append("# TYPE ppas_http_request_duration_seconds histogram")
+    for (method, route), metrics in routes:
+        _histogram_lines(lines, "ppas_http_request_duration_seconds", metrics.latency, method=method, route=route)
+
+    lines.append("# HELP ppas_db_queries_per_request SQL statements executed per request")
+    lines.append("# TYPE ppas_db_queries_per_request histogram")
+    for (method, route), metrics in routes:
+        _histogram_lines(lines, "ppas_db_queries_per_request", metrics.queries, method=method, route=route)
+
+    lines.append("# HELP ppas_db_query_seconds_per_request Time spent executing SQL per request")
+    lines.append("# TYPE ppas_db_query_seconds_per_request histogram")
+    for (method, route), metrics in routes:
+        _histogram_lines(lines, "ppas_db_query_seconds_per_request", metrics.query_time, method=method, route=route)
+
+    lines.append("# HELP ppas_db_connection_hold_seconds_total Time requests held a pooled connection")
+    lines.append("# TYPE ppas_db_connection_hold_seconds_total counter")
+    for (method, route), metrics in routes:
+        lines.append(
+            f"ppas_db_connection_hold_seconds_total{_labels(method=method, route=route)} {metrics.hold_time!r}"
+        )
+
+    lines.append("# HELP ppas_db_pool_wait_seconds_total Time requests waited for a pooled connection")
+    lines.append("# TYPE ppas_db_pool_wait_seconds_total counter")
+    for (method, route), metrics in routes:
+        lines.append(
+            f"ppas_db_pool_wait_seconds_total{_labels(method=method, route=route)} {metrics.pool_wait!r}"
+        )
+
+    lines.append("# HELP ppas_db_pool_wait_seconds Wait for each connection checkout, including connecting")
+    lines.append("# TYPE ppas_db_pool_wait_seconds histogram")
+    _histogram_lines(lines, "ppas_db_pool_wait_seconds", _pool_wait)
+
+    pool = _pool_status()
+    if pool is not None:
+        lines.append("# HELP ppas_db_pool_connections Pooled connections by state")
+        lines.append("# TYPE ppas_db_pool_connections gauge")
+        for state, value in pool.items():
+            lines.append(f"ppas_db_pool_connections{_labels(state=state)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _pool_status() -> Optional[Dict[str, int]]:
+    import database
+    engine = database._engine
+    if engine is None or not hasattr(engine.pool, "checkedout"):
+        return None
+    pool = engine.pool
+    return {"checked_out": pool.checkedout(), "idle": pool.checkedin(), "overflow": max(pool.overflow(), 0)}
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    # Not served at all until a scrape token is configured
+    if not settings.METRICS_TOKEN:
+        return Response(status_code=404)
+    authorization = request.headers.get("authorization", "")
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return Response(status_code=401)
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def setup_metrics(app: FastAPI):
+    """Expose GET /metrics (outside the API schema)"""
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
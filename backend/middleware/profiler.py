@@ -0,0 +1,204 @@
+"""
+On-demand request profiling - one signed request, sampled, with its SQL
+
+A request carrying `X-Profile: <expires>.<signature>` (HMAC-SHA256 of
+"<expires>.<path>" with PROFILING_SECRET) runs under a sampling profiler.
+A background thread records the event-loop thread's stack every
+PROFILING_INTERVAL_MS; the result is written to PROFILING_DIR as
+`<id>.folded` (collapsed stacks for flamegraph.pl / speedscope, with each
+SQL statement added as a `SQL;...` frame weighted by its duration) and
+`<id>.json` (the SQL spans). The response carries `X-Profile-Id`.
+
+Generate a header with:  python -m middleware.profiler /api/analytics/month
+Samples cover the whole loop thread, so concurrent requests show up too;
+profile on a quiet worker when the numbers matter.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import orjson
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_active: ContextVar[Optional["Profile"]] = ContextVar("active_profile", default=None)
+
+
+def sign(secret: str, path: str, expires: int) -> str:
+    """Header value that allows profiling `path` until `expires` (unix time)"""
+    digest = hmac.new(secret.encode(), f"{expires}.{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{digest}"
+
+
+def verify(secret: str, path: str, value: str) -> bool:
+    expires, _, digest = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign(secret, path, int(expires)), f"{expires}.{digest}")
+
+
+class Profile:
+    """Stack samples and SQL spans of one request"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.spans: List[Dict] = []
+        self.started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name=f"profile-{self.id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(names))] += 1
+
+    def add_span(self, statement: str, started: float, duration: float):
+        self.spans.append({
+            "start_ms": round((started - self.started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "statement": " ".join(statement.split()),
+        })
+
+    def folded(self) -> str:
+        """Collapsed stacks; SQL spans are converted to samples of the same interval"""
+        lines = [f"{stack} {count}" for stack, count in self.samples.items()]
+        for span in self.spans:
+            weight = round(span["duration_ms"] / 1000 / self.interval)
+            if weight:
+                statement = span["statement"][:120].replace(";", ",")
+                lines.append(f"SQL;{statement} {weight}")
+        return "\n".join(lines) + "\n"
+
+
+def install_profiler(engine: AsyncEngine):
+    """Record SQL spans of profiled requests on an engine if PROFILING_SECRET is set"""
+    if not settings.PROFILING_SECRET:
+        return
+    sync_engine = engine.sync_engine
+
+    # As in db_timing, the start time lives on the statement's execution
+    # context, so a failing statement leaves nothing on the pooled connection
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _active.get() is not None:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _active.get()
+        started = getattr(context, "_profile_started", None)
+        if profile is not None and started is not None:
+            profile.add_span(statement, started, time.perf_counter() - started)
+
+
+class ProfilerMiddleware:
+    """Profiles requests with a valid X-Profile header, one at a time per process"""
+
+    def __init__(self, app, secret: str, directory: str, interval_ms: float = 1.0):
+        self.app = app
+        self.secret = secret
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = next((value for name, value in scope["headers"] if name == b"x-profile"), None)
+        if header is None:
+            await self.app(scope, receive, send)
+            return
+        if not verify(self.secret, scope["path"], header.decode("latin-1")):
+            logger.warning(f"Rejected X-Profile header for {scope['path']}")
+            await self.app(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            logger.info("Profile already running; serving request unprofiled")
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(threading.get_ident(), self.interval)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _active.reset(token)
+            self._busy.release()
+            self._save(profile, scope)
+
+    def _save(self, profile: Profile, scope):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, profile.id)
+        with open(base + ".folded", "w") as f:
+            f.write(profile.folded())
+        with open(base + ".json", "wb") as f:
+            f.write(orjson.dumps({
+                "id": profile.id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "duration_ms": round((time.perf_counter() - profile.started) * 1000, 3),
+                "interval_ms": profile.interval * 1000,
+                "samples": sum(profile.samples.values()),
+                "sql": profile.spans,
+            }, option=orjson.OPT_INDENT_2))
+        logger.info(f"Profiled {scope['method']} {scope['path']} -> {base}.folded")
+
+
+def setup_profiler(app: FastAPI):
+    """Register the middleware only when PROFILING_SECRET is set"""
+    if settings.PROFILING_SECRET:
+        app.add_middleware(
+            ProfilerMiddleware,
+            secret=settings.PROFILING_SECRET,
+            directory=settings.PROFILING_DIR,
+            interval_ms=settings.PROFILING_INTERVAL_MS
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or not settings.PROFILING_SECRET:
+        sys.exit("usage: PROFILING_SECRET=... python -m middleware.profiler /api/path")
+    expires = int(time.time()) + 600
+    print(f"X-Profile: {sign(settings.PROFILING_SECRET, sys.argv[1], expires)}")
@@ -1,22 +1,231 @@
 """
-Rate limiting middleware using SlowAPI
+Rate limiting - ASGI token buckets per user (per IP on auth routes)
 """
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import math
+import time
+from typing import Dict, List, Optional, Tuple
 from fastapi import FastAPI
+from jose import jwt, JWTError
 
 from config import settings
 
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
+# Unauthenticated endpoints that hand out tokens; limited per client IP
+AUTH_PATHS = frozenset({"/api/auth/login", "/api/auth/register", "/api/auth/refresh"})
 
+_RETRY_BODY = b'{"error":"RATE_LIMITED","message":"Too many requests, retry later"}'
+
+
+class InMemoryBucketStore:
+    """
+    Token buckets for one process. Keys are spread over shards so that the
+    idle-bucket sweep only ever walks one small dict at a time.
+    """
+
+    def __init__(self, shards: int = 16, sweep_every: int = 10000):
+        self._shards: List[Dict[str, List[float]]] = [{} for _ in range(shards)]
+        self._sweep_every = sweep_every
+        self._calls = 0
+        self._next_sweep = 0
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        """Take one token; returns 0 if allowed, else seconds until one is available"""
+        return self.take_now(key, rate, capacity, time.monotonic())
+
+    def take_now(self, key: str, rate: float, capacity: float, now: float) -> float:
+        # bucket = [tokens, updated_at, full_at]
+        shard = self._shards[hash(key) % len(self._shards)]
+        bucket = shard.get(key)
+        if bucket is None:
+            shard[key] = [capacity - 1, now, now + 1 / rate]
+            self._tick(now)
+            return 0.0
+
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            tokens -= 1
+            bucket[0] = tokens
+            bucket[2] = now + (capacity - tokens) / rate
+            self._tick(now)
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    def _tick(self, now: float):
+        self._calls += 1
+        if self._calls >= self._sweep_every:
+            self._calls = 0
+            self._sweep(self._next_sweep, now)
+            self._next_sweep = (self._next_sweep + 1) % len(self._shards)
+
+    def _sweep(self, index: int, now: float):
+        """Drop buckets that have refilled completely; they equal a fresh bucket"""
+        shard = self._shards[index]
+        idle = [key for key, bucket in shard.items() if bucket[2] <= now]
+        for key in idle:
+            del shard[key]
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+
+# Atomic refill-and-take; KEYS[1]=bucket, ARGV = rate, capacity, now
+_REDIS_TAKE = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Buckets shared by every worker, kept in Redis (needs the optional redis package)"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+        self._prefix = prefix
+
+    async def take(self, key: str, rate: float, capacity: float) -> float:
+        wait = await self._take(keys=[self._prefix + key], args=[rate, capacity, time.time()])
+        return float(wait)
+
+    def clear(self):
+        pass
 
-def setup_rate_limiter(app: FastAPI):
-    """Setup rate limiting for the app"""
-    app.state.limiter = limiter
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+class TokenCache:
+    """
+    Verified access token -> user id, so a limited request costs one dict
+    lookup instead of an HMAC check. Entries end with the token's expiry.
+    """
 
-# Decorator for rate limiting specific endpoints
-# Usage: @limiter.limit("100/minute")
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: Dict[str, Tuple[str, float]] = {}
+
+    def user_id(self, token: str) -> Optional[str]:
+        entry = self._entries.get(token)
+        if entry is not None:
+            if entry[1] > time.time():
+                return entry[0]
+            del self._entries[token]
+            return None
+
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        if payload.get("type") != "access" or not payload.get("sub"):
+            return None
+
+        if len(self._entries) >= self.maxsize:
+            # Oldest first; dicts keep insertion order
+            del self._entries[next(iter(self._entries))]
+        self._entries[token] = (payload["sub"], float(payload.get("exp", math.inf)))
+        return payload["sub"]
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI token-bucket limiter. Authenticated requests are keyed by
+    user, the login/register/refresh routes and anonymous requests by
+    client IP. Rejections are 429 with Retry-After, in the error format
+    of middleware.error_handler.
+    """
+
+    def __init__(
+        self,
+        app,
+        store,
+        per_minute: int,
+        auth_per_hour: int,
+        token_cache: Optional[TokenCache] = None
+    ):
+        self.app = app
+        self.store = store
+        self.rate = per_minute / 60
+        self.capacity = float(per_minute)
+        self.auth_rate = auth_per_hour / 3600
+        self.auth_capacity = float(auth_per_hour)
+        self.tokens = token_cache or TokenCache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in AUTH_PATHS:
+            key, rate, capacity = "auth:" + self._client_ip(scope), self.auth_rate, self.auth_capacity
+        else:
+            user_id = self._user_id(scope)
+            key = "user:" + user_id if user_id else "ip:" + self._client_ip(scope)
+            rate, capacity = self.rate, self.capacity
+
+        wait = await self.store.take(key, rate, capacity)
+        if wait:
+            await self._reject(send, wait)
+            return
+        await self.app(scope, receive, send)
+
+    def _user_id(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                if value[:7].lower() == b"bearer ":
+                    return self.tokens.user_id(value[7:].decode("latin-1"))
+                return None
+        return None
+
+    @staticmethod
+    def _client_ip(scope) -> str:
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def _reject(send, wait: float):
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(_RETRY_BODY)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": _RETRY_BODY})
+
+
+_store = None
+
+
+def get_rate_limit_store():
+    """Process-wide bucket store, chosen by RATE_LIMIT_BACKEND"""
+    global _store
+    if _store is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _store = RedisBucketStore(settings.REDIS_URL)
+        else:
+            _store = InMemoryBucketStore()
+    return _store
+
+
+def setup_rate_limiter(app: FastAPI):
+    """Register the middleware with the app"""
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=get_rate_limit_store(),
+        per_minute=settings.RATE_LIMIT_PER_MINUTE,
+        auth_per_hour=settings.LOGIN_RATE_LIMIT_PER_HOUR
+    )
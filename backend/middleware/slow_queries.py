@@ -0,0 +1,196 @@
+"""
+Slow-query log - statements over a threshold, with where they came from and their plan
+
+Every statement is timed (two perf_counter calls). One that takes at least
+SLOW_QUERY_MS is, with probability SLOW_QUERY_SAMPLE_RATE, written as a JSON
+line to a rotating file together with the service/router function that issued
+it and an `EXPLAIN` plan fetched afterwards on a separate connection. Bound
+parameters are logged as their types only.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional
+
+import greenlet
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+# Frames in these are plumbing, never the origin of a query
+_SKIP_PREFIXES = tuple(
+    _BACKEND_DIR + name for name in ("middleware", "database.py")
+)
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def redact(parameters: Any) -> Any:
+    """Replace bound values with their type names"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: one parameter set is representative
+            return [redact(parameters[0]), f"... {len(parameters)} sets"]
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def query_origin() -> Optional[str]:
+    """
+    Innermost application function on the stack. Under asyncio the driver call
+    runs in a greenlet whose stack stops at SQLAlchemy, so the search continues
+    in the parent greenlet, where the awaiting coroutines are.
+    """
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(_BACKEND_DIR) and not filename.startswith(_SKIP_PREFIXES):
+                module = filename[len(_BACKEND_DIR):]
+                return f"{frame.f_code.co_qualname} ({module}:{frame.f_lineno})"
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+class SlowQueryLog:
+    """Engine hooks that write slow statements to `log`"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        log: logging.Logger,
+        threshold_ms: float,
+        sample_rate: float = 1.0,
+        explain: bool = True,
+        explain_interval: float = 300.0
+    ):
+        self.engine = engine
+        self.log = log
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain = explain
+        # One plan per statement per interval, and one EXPLAIN at a time, so a
+        # slow database is never handed a stream of extra work
+        self.explain_interval = explain_interval
+        self._explained: Dict[str, float] = {}
+        self._explaining = False
+        self._tasks = set()
+
+    def install(self):
+        sync_engine = self.engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # On the execution context, so a statement that raises leaves nothing behind
+        context._slow_query_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_started
+        if elapsed < self.threshold or conn.info.get("slow_query_explaining"):
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+
+        entry = {
+            "ts": time.time(),
+            "duration_ms": round(elapsed * 1000, 1),
+            "origin": query_origin(),
+            "statement": " ".join(statement.split()),
+            "parameters": redact(parameters),
+            "plan": None,
+        }
+        if executemany or not self._should_explain(statement):
+            self._write(entry)
+            return
+        self._explaining = True
+        # A fresh context keeps the EXPLAIN out of the current request's DB stats
+        task = asyncio.get_running_loop().create_task(
+            self._explain_and_write(entry, statement, parameters), context=contextvars.Context()
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _should_explain(self, statement: str) -> bool:
+        if not self.explain or self._explaining:
+            return False
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return False
+        now = time.monotonic()
+        if now - self._explained.get(statement, -self.explain_interval) < self.explain_interval:
+            return False
+        if len(self._explained) >= 1000:
+            self._explained.clear()
+        self._explained[statement] = now
+        return True
+
+    async def _explain_and_write(self, entry: Dict, statement: str, parameters):
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execution_options(postgresql_readonly=True)
+                conn.sync_connection.info["slow_query_explaining"] = True
+                try:
+                    result = await conn.exec_driver_sql(
+                        "EXPLAIN (ANALYZE false, FORMAT TEXT) " + statement, parameters
+                    )
+                    entry["plan"] = "\n".join(row[0] for row in result)
+                finally:
+                    conn.sync_connection.info.pop("slow_query_explaining", None)
+                    await conn.rollback()
+        except Exception as e:
+            entry["plan_error"] = str(e)
+        finally:
+            self._explaining = False
+            self._write(entry)
+
+    def _write(self, entry: Dict):
+        self.log.warning(orjson.dumps(entry).decode())
+
+    async def drain(self):
+        """Wait for pending EXPLAINs (tests and shutdown)"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def install_slow_query_log(engine: AsyncEngine) -> Optional[SlowQueryLog]:
+    """Attach the slow-query log to an engine if SLOW_QUERY_MS is set"""
+    if settings.SLOW_QUERY_MS <= 0:
+        return None
+
+    log = logging.getLogger("ppas.slow_queries")
+    if not log.handlers:
+        directory = os.path.dirname(settings.SLOW_QUERY_LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            settings.SLOW_QUERY_LOG_FILE, maxBytes=10 * 1024 * 1024, backupCount=5
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+
+    slow_log = SlowQueryLog(
+        engine,
+        log,
+        threshold_ms=settings.SLOW_QUERY_MS,
+        sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+        explain=settings.SLOW_QUERY_EXPLAIN
+    )
+    slow_log.install()
+    logger.info(f"Slow-query log: >= {settings.SLOW_QUERY_MS}ms to {settings.SLOW_QUERY_LOG_FILE}")
+    return slow_log
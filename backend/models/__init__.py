@@ -2,6 +2,14 @@
 from models.user import User
 from models.habit import Habit
 from models.entry import DailyEntry
+from models.bitmap import HabitMonthBitmap
 from models.score import WeeklyScore, MonthlyScore
+from models.rollup import HabitRollup
+from models.heatmap import HeatmapYear
+from models.streak import HabitStreak
+from models.alert import AlertOutbox
 
-__all__ = ["User", "Habit", "DailyEntry", "WeeklyScore", "MonthlyScore"]
+__all__ = [
+    "User", "Habit", "DailyEntry", "HabitMonthBitmap", "WeeklyScore", "MonthlyScore",
+    "HabitRollup", "HeatmapYear", "HabitStreak", "AlertOutbox"
+]
@@ -0,0 +1,37 @@
+"""
+Alert outbox model - Goal-threshold crossings waiting to be dispatched
+
+Written in the same transaction as the entry change that caused them, so
+an alert exists exactly when the change was committed. The dispatcher
+deletes rows once a sink has accepted them.
+"""
+import uuid
+from datetime import date, datetime
+from sqlalchemy import BigInteger, Integer, Float, String, Date, DateTime, ForeignKey, Identity, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class AlertOutbox(Base):
+    __tablename__ = "alert_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    habit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("habits.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    week_start: Mapped[date] = mapped_column(Date, nullable=False)
+    kind: Mapped[str] = mapped_column(String(10), nullable=False)  # below | met
+    completion_rate: Mapped[float] = mapped_column(Float, nullable=False)
+    goal_threshold: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
@@ -0,0 +1,42 @@
+"""
+Habit month bitmap model - Compacted completion history
+
+One row folds a month of daily entries for a habit: bit (day - 1) of
+`bitmap` is set when the habit was completed on that day of the month.
+Notes are kept sparsely, keyed by day of month.
+"""
+import uuid
+from datetime import date
+from sqlalchemy import Integer, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class HabitMonthBitmap(Base):
+    __tablename__ = "habit_month_bitmaps"
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'habit_id', 'month_start', name='unique_user_habit_month'),
+    )
+    
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        primary_key=True, 
+        default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    habit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("habits.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    month_start: Mapped[date] = mapped_column(Date, nullable=False)
+    bitmap: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # {"<day of month>": "<note>"}, only for days that had a note
+    notes: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
@@ -1,9 +1,13 @@
 """
 Daily Entry model - One entry per user per habit per day
+
+The table is range-partitioned by month on entry_date. Monthly partitions are
+created ahead of time by services.partition_manager; rows outside any managed
+month land in the default partition.
 """
 import uuid
 from datetime import datetime, date
-from sqlalchemy import String, Boolean, Date, DateTime, ForeignKey, func, UniqueConstraint
+from sqlalchemy import String, Boolean, Date, DateTime, ForeignKey, func, UniqueConstraint, DDL, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base
@@ -14,6 +18,7 @@ class DailyEntry(Base):
     
     __table_args__ = (
         UniqueConstraint('user_id', 'habit_id', 'entry_date', name='unique_user_habit_date'),
+        {"postgresql_partition_by": "RANGE (entry_date)"},
     )
     
     id: Mapped[uuid.UUID] = mapped_column(
@@ -33,7 +38,8 @@ class DailyEntry(Base):
         nullable=False,
         index=True
     )
-    entry_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    # Part of the primary key: a partitioned table's keys must include the partition column
+    entry_date: Mapped[date] = mapped_column(Date, primary_key=True, index=True)
     completed: Mapped[bool] = mapped_column(Boolean, default=False)
     notes: Mapped[str | None] = mapped_column(String(500), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -44,3 +50,11 @@ class DailyEntry(Base):
     # Relationships
     user = relationship("User", back_populates="entries")
     habit = relationship("Habit", back_populates="entries")
+
+
+# Catch-all partition so inserts never fail for months without a partition yet
+event.listen(
+    DailyEntry.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS daily_entries_default PARTITION OF daily_entries DEFAULT")
+)
@@ -0,0 +1,27 @@
+"""
+Heatmap model - Cached year calendars of daily weighted completion
+
+One row per user and year: `cells[n]` is the summed weight of the active
+habits completed on day n of the year, `total_weight` the weight of all
+active habits. The row is valid for the user's `data_version` it carries;
+entry writes patch the affected cell and move the version along.
+"""
+import uuid
+from sqlalchemy import Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class HeatmapYear(Base):
+    __tablename__ = "heatmap_years"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_weight: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cells: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
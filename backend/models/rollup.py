@@ -0,0 +1,39 @@
+"""
+Habit rollup model - Running completion aggregates per habit
+
+Checkpoint rows, one per habit and day on which the habit's history
+changed: `completed_total` counts completed days up to and including `day`
+and the `ewma_*` columns hold the exponentially weighted completion rate on
+`day`. Between checkpoints the total stays flat and the averages decay, so
+any day's value comes from the nearest checkpoint at or before it.
+"""
+import uuid
+from datetime import date
+from sqlalchemy import Integer, Float, Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class HabitRollup(Base):
+    __tablename__ = "habit_rollups"
+    
+    __table_args__ = (
+        Index("ix_habit_rollups_user_day", "user_id", "day"),
+    )
+    
+    habit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("habits.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    completed_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ewma_7: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    ewma_30: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    ewma_90: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
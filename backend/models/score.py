@@ -3,7 +3,7 @@ Score models - Weekly and Monthly aggregations
 """
 import uuid
 from datetime import datetime, date
-from sqlalchemy import Integer, Float, String, Date, DateTime, ForeignKey, func
+from sqlalchemy import Integer, Float, String, Date, DateTime, ForeignKey, func, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base
@@ -12,6 +12,10 @@ from database import Base
 class WeeklyScore(Base):
     __tablename__ = "weekly_scores"
     
+    __table_args__ = (
+        UniqueConstraint('user_id', 'week_start', name='unique_user_week'),
+    )
+    
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), 
         primary_key=True, 
@@ -47,6 +51,10 @@ class WeeklyScore(Base):
 class MonthlyScore(Base):
     __tablename__ = "monthly_scores"
     
+    __table_args__ = (
+        UniqueConstraint('user_id', 'year', 'month', name='unique_user_month'),
+    )
+    
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), 
         primary_key=True, 
@@ -0,0 +1,34 @@
+"""
+Habit streak model - Runs of consecutive completed days
+
+One row per maximal run: the habit was completed on every day from
+`start_day` to `end_day` (inclusive) and on neither neighbouring day.
+"""
+import uuid
+from datetime import date
+from sqlalchemy import Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+class HabitStreak(Base):
+    __tablename__ = "habit_streaks"
+
+    __table_args__ = (
+        Index("ix_habit_streaks_habit_end", "habit_id", "end_day", unique=True),
+        Index("ix_habit_streaks_user", "user_id"),
+    )
+
+    habit_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("habits.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    start_day: Mapped[date] = mapped_column(Date, primary_key=True)
+    end_day: Mapped[date] = mapped_column(Date, nullable=False)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
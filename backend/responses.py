@@ -0,0 +1,64 @@
+"""
+Response classes - orjson-backed JSON rendering
+"""
+from functools import lru_cache
+from typing import Any, Optional
+from uuid import UUID
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from config import settings
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. Dates, datetimes and UUIDs are
+    serialized natively, so payloads need no jsonable_encoder pass first.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _default(obj: Any) -> Any:
+    # asyncpg returns its own UUID subclass, which orjson does not pick up natively
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def trusted_response(
+    schema: Any,
+    content: Any,
+    response: Optional[Response] = None
+) -> FastJSONResponse:
+    """
+    Render content the service layer just built (plain dicts and lists shaped
+    like `schema`) without validating it again. Returning a Response skips
+    FastAPI's response_model pass, so the route's response_model only
+    documents the shape.
+
+    With VALIDATE_RESPONSES on, content is validated against `schema` first,
+    so shape drift fails loudly in development and tests.
+
+    Headers set on the endpoint's injected `response` (ETag, Cache-Control)
+    are copied over; FastAPI drops them when a Response is returned directly.
+    """
+    if settings.VALIDATE_RESPONSES:
+        adapter = _adapter(schema)
+        content = adapter.dump_python(adapter.validate_python(content), mode="json")
+
+    rendered = FastJSONResponse(content)
+    if response is not None:
+        if response.status_code:
+            rendered.status_code = response.status_code
+        rendered.headers.raw.extend(response.headers.raw)
+    return rendered
@@ -1,171 +1,441 @@
 """
 Analytics router - Performance metrics and reports
 """
-from fastapi import APIRouter, Depends
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
 from datetime import date, timedelta
-from typing import Optional
+from typing import Dict, List, Optional
 
-from database import get_db
-from dependencies import get_current_user
+from database import get_db, get_read_db, get_analytics_db, release
+from dependencies import get_current_user_read, get_current_user_analytics, conditional_user
 from models.user import User
-from schemas.analytics import TodayStats, WeeklyAnalytics, MonthlyAnalytics, TrendData
+from models.habit import Habit
+from models.entry import DailyEntry
+from schemas.analytics import (
+    TodayStats, WeeklyAnalytics, MonthlyAnalytics, TrendData, DashboardData,
+    RollingMetrics, YearHeatmap, HabitCorrelations,
+    SimulationRequest, SimulationResult, WeekdayProfile, Seasonality,
+    StreakReport, RangeAnalytics, PeriodComparison
+)
+from responses import trusted_response
 from services.score_engine import ScoreEngine
-from services.explainer import Explainer
+from services.explainer import Explainer, PERIODS
 from services.aggregator import Aggregator
+from services.entry_store import EntryStore
+from services.trend_engine import TrendEngine
+from services.rollups import Rollups, WINDOWS
+from services.heatmap import Heatmap
+from services.correlations import Correlations
+from services.simulator import Simulator, UnknownHabit
+from services.calendar_profile import CalendarProfile
+from services.streaks import Streaks
+from services.range_engine import RangeEngine
+from routers.entries import build_day_entries
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# Five years of weeks (or 21 of months); bounds the trend range reads and their date arithmetic
+MAX_TREND_LOOKBACK = 260
+
+
+def _week_end(params) -> date:
+    return date.fromisoformat(params["week_start"]) + timedelta(days=6)
+
+
+def _month_end(params) -> date:
+    """Sunday of the month's last week; weekly scores reach past the 1st of the next month"""
+    _, last_day = Aggregator._month_bounds(int(params["year"]), int(params["month"]))
+    return last_day + timedelta(days=6 - last_day.weekday())
+
+
+# ETag/304 handling; see dependencies.conditional_user
+today_user = conditional_user(get_current_user_read)
+analytics_user = conditional_user(get_current_user_analytics)
+week_user = conditional_user(get_current_user_analytics, _week_end)
+month_user = conditional_user(get_current_user_analytics, _month_end)
+
 
 @router.get("/today", response_model=TodayStats)
 async def get_today_stats(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(today_user)
 ):
     """Get quick stats for today"""
     today = date.today()
     
-    daily_score = await ScoreEngine.calculate_daily_score(db, current_user.id, today)
-    streak = await ScoreEngine.calculate_streak(db, current_user.id)
-    
-    # Check physical activity
-    from services.rule_engine import RuleEngine
-    physical_entry = await RuleEngine.get_physical_entry_for_date(db, current_user.id, today)
-    
-    return TodayStats(
-        date=today,
-        completed=daily_score["completed"],
-        total=daily_score["total"],
-        completion_rate=daily_score["completion_rate"],
-        streak_days=streak,
-        physical_done=physical_entry is not None
+    # One read covers today's score, the streak window and the physical check
+    habits = await ScoreEngine.get_active_habits(db, current_user.id)
+    entries = await EntryStore.get_completed(
+        db, current_user.id, ScoreEngine.streak_window_start(today), today
     )
+    await release(db)
+    
+    return trusted_response(TodayStats, _today_content(habits, entries, today), response)
 
 
 @router.get("/week", response_model=WeeklyAnalytics)
 async def get_current_week_analytics(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
 ):
     """Get analytics for current week"""
     week_start, _ = ScoreEngine.get_week_bounds(date.today())
-    return await _get_week_analytics(db, current_user.id, week_start)
+    content = await _get_week_analytics(db, current_user.id, week_start)
+    return trusted_response(WeeklyAnalytics, content, response)
 
 
 @router.get("/week/{week_start}", response_model=WeeklyAnalytics)
 async def get_week_analytics(
     week_start: date,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(week_user)
 ):
     """Get analytics for a specific week"""
-    return await _get_week_analytics(db, current_user.id, week_start)
+    content = await _get_week_analytics(db, current_user.id, week_start)
+    return trusted_response(WeeklyAnalytics, content, response)
 
 
 @router.get("/month", response_model=MonthlyAnalytics)
 async def get_current_month_analytics(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
 ):
     """Get analytics for current month"""
     today = date.today()
-    return await _get_month_analytics(db, current_user.id, today.year, today.month)
+    content = await _get_month_analytics(db, current_user.id, today.year, today.month)
+    return trusted_response(MonthlyAnalytics, content, response)
 
 
 @router.get("/month/{year}/{month}", response_model=MonthlyAnalytics)
 async def get_month_analytics(
     year: int,
     month: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(month_user)
 ):
     """Get analytics for a specific month"""
-    return await _get_month_analytics(db, current_user.id, year, month)
+    content = await _get_month_analytics(db, current_user.id, year, month)
+    return trusted_response(MonthlyAnalytics, content, response)
 
 
 @router.get("/trends", response_model=TrendData)
 async def get_trends(
+    response: Response,
     period: str = "weekly",
-    lookback: int = 8,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get trend data for charts"""
-    labels = []
-    completion_rates = []
-    weighted_scores = []
-    consistency_scores = []
-    
+    lookback: int = Query(8, ge=1, le=MAX_TREND_LOOKBACK),
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """Get trend data for charts (one aggregation query for any lookback)"""
     today = date.today()
-    
     if period == "weekly":
-        current_week, _ = ScoreEngine.get_week_bounds(today)
-        
-        for i in range(lookback - 1, -1, -1):
-            week_start = current_week - timedelta(weeks=i)
-            score = await ScoreEngine.calculate_weekly_score(db, current_user.id, week_start)
-            
-            labels.append(week_start.strftime("%b %d"))
-            completion_rates.append(score["completion_rate"])
-            weighted_scores.append(score["weighted_score"])
-            consistency_scores.append(score["consistency_score"])
+        content = await TrendEngine.weekly_trends(db, current_user.id, today, lookback)
     else:
-        # Monthly
-        current_month = today.month
-        current_year = today.year
-        
-        for i in range(lookback - 1, -1, -1):
-            month = current_month - i
-            year = current_year
-            while month <= 0:
-                month += 12
-                year -= 1
-            
-            report = await Aggregator.generate_monthly_report(db, current_user.id, year, month)
-            
-            labels.append(date(year, month, 1).strftime("%b %Y"))
-            completion_rates.append(report.avg_completion_rate)
-            weighted_scores.append(report.avg_weighted_score)
-            consistency_scores.append(50 + report.consistency_trend)  # Normalize
-    
-    return TrendData(
-        period=period,
-        labels=labels,
-        completion_rates=completion_rates,
-        weighted_scores=weighted_scores,
-        consistency_scores=consistency_scores
+        content = await TrendEngine.monthly_trends(db, current_user.id, today, lookback)
+    await release(db)
+    return trusted_response(TrendData, content, response)
+
+
+@router.get("/rolling", response_model=RollingMetrics)
+async def get_rolling(
+    response: Response,
+    days: int = Query(90, ge=1, le=730),
+    window: Optional[int] = None,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """
+    7/30/90-day rolling completion, weighted score and EWMA for the last
+    `days` days, overall and per habit, read from the running rollups
+    """
+    if window is not None and window not in WINDOWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"window must be one of {', '.join(map(str, WINDOWS))}"
+        )
+    end = date.today()
+    content = await Rollups.get_series(
+        db, current_user.id, end - timedelta(days=days - 1), end,
+        windows=(window,) if window else WINDOWS
+    )
+    await release(db)
+    return trusted_response(RollingMetrics, content, response)
+
+
+@router.get("/range", response_model=RangeAnalytics)
+async def get_range(
+    response: Response,
+    start: date,
+    end: date,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """Completion, weighted and consistency scores for any span of days (inclusive)"""
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
+        )
+    content = await RangeEngine.score_range(db, current_user.id, start, end)
+    await release(db)
+    return trusted_response(RangeAnalytics, content, response)
+
+
+@router.get("/compare", response_model=PeriodComparison)
+async def get_comparison(
+    response: Response,
+    period: str = "week",
+    anchor: Optional[date] = Query(None, alias="date"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """
+    Explain the change from the previous period to the week, month or
+    quarter containing `date` (default today), or to a custom start..end
+    compared with the same number of days just before it
+    """
+    if period == "custom":
+        if start is None or end is None or end < start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="custom periods need start and end, with end not before start"
+            )
+    elif period not in PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"period must be one of {', '.join(PERIODS)}, custom"
+        )
+    try:
+        current = (start, end) if period == "custom" else Explainer.period_bounds(period, anchor or date.today())
+        previous = Explainer.previous_period(period, current)
+    except (ValueError, OverflowError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="both periods must fall between 0001-01-01 and 9999-12-31"
+        )
+    content = await Explainer.explain(
+        db, current_user.id, previous, current,
+        label=period if period in PERIODS else "period"
     )
+    await release(db)
+    return trusted_response(PeriodComparison, content, response)
+
+
+@router.get("/heatmap", response_model=YearHeatmap)
+async def get_heatmap(
+    response: Response,
+    year: Optional[int] = Query(None, ge=1, le=9999),
+    db: AsyncSession = Depends(get_analytics_db),
+    cache_db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(analytics_user)
+):
+    """
+    Daily weighted scores for a calendar year (default: this year), served
+    from the per-user year cache; `cache_db` only connects on a miss
+    """
+    content = await Heatmap.get_year(db, cache_db, current_user, year or date.today().year)
+    await release(db)
+    return trusted_response(YearHeatmap, content, response)
+
+
+@router.get("/correlations", response_model=HabitCorrelations)
+async def get_correlations(
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """Which active habits are completed together and which crowd each other out"""
+    content = await Correlations.get(db, current_user, date.today())
+    await release(db)
+    return trusted_response(HabitCorrelations, content, response)
+
+
+@router.get("/weekday-profile", response_model=WeekdayProfile)
+async def get_weekday_profile(
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """Average completion per weekday, overall and per habit, and the weakest day"""
+    content = await CalendarProfile.weekday_profile(db, current_user, date.today())
+    await release(db)
+    return trusted_response(WeekdayProfile, content, response)
+
+
+@router.get("/seasonality", response_model=Seasonality)
+async def get_seasonality(
+    response: Response,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """Average completion per month of the year, overall and per habit"""
+    content = await CalendarProfile.seasonality(db, current_user, date.today())
+    await release(db)
+    return trusted_response(Seasonality, content, response)
+
+
+@router.get("/streaks", response_model=StreakReport)
+async def get_streaks(
+    response: Response,
+    history: int = Query(10, ge=0, le=100),
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(analytics_user)
+):
+    """Current and best streak per habit, with the `history` most recent runs"""
+    content = await Streaks.get_report(db, current_user.id, date.today(), history)
+    await release(db)
+    return trusted_response(StreakReport, content, response)
+
+
+@router.post("/simulate", response_model=SimulationResult)
+async def simulate(
+    request: SimulationRequest,
+    db: AsyncSession = Depends(get_analytics_db),
+    current_user: User = Depends(get_current_user_analytics)
+):
+    """Re-score the last `weeks` weeks with proposed habit settings; nothing is saved"""
+    changes = {
+        change.habit_id: change.model_dump(exclude={"habit_id"}, exclude_none=True)
+        for change in request.habits
+    }
+    try:
+        content = await Simulator.simulate(db, current_user.id, changes, request.weeks, date.today())
+    except UnknownHabit:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Habit not found"
+        )
+    await release(db)
+    return trusted_response(SimulationResult, content)
+
+
+@router.get("/dashboard", response_model=DashboardData)
+async def get_dashboard(
+    response: Response,
+    lookback: int = Query(8, ge=1, le=MAX_TREND_LOOKBACK),
+    db: AsyncSession = Depends(get_analytics_db),
+    entries_db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(analytics_user)
+):
+    """
+    Today's stats, this week, weekly trends and today's entries in one call.
+    Habits and completed entries are read once for today and this week, the
+    trends come from TrendEngine as on /trends; today's entry rows load
+    concurrently on a second pooled connection.
+    """
+    today = date.today()
+    week_start, _ = ScoreEngine.get_week_bounds(today)
+    # One completed-entries range covers the streak window and last week
+    start = min(ScoreEngine.streak_window_start(today), week_start - timedelta(weeks=1))
+    
+    async def read_scores():
+        habits = await ScoreEngine.get_active_habits(db, current_user.id)
+        entries = await EntryStore.get_completed(db, current_user.id, start, today)
+        trends = await TrendEngine.weekly_trends(db, current_user.id, today, lookback)
+        return habits, entries, trends
+    
+    async def read_today_rows():
+        # Today is never compacted, so live rows are the whole picture
+        result = await entries_db.execute(
+            select(DailyEntry).where(
+                and_(DailyEntry.user_id == current_user.id, DailyEntry.entry_date == today)
+            )
+        )
+        return result.scalars().all()
+    
+    if entries_db is db:
+        # Dependency overrides can hand both parameters the same session,
+        # which cannot run two statements at once
+        habits, entries, trends = await read_scores()
+        today_rows = await read_today_rows()
+    else:
+        (habits, entries, trends), today_rows = await asyncio.gather(read_scores(), read_today_rows())
+    await release(db)
+    await release(entries_db)
+    
+    return trusted_response(DashboardData, {
+        "today": _today_content(habits, entries, today),
+        "week": _week_content(habits, entries, week_start),
+        "trends": trends,
+        "entries": build_day_entries(
+            habits, {e.habit_id: e for e in today_rows}, today
+        )
+    }, response)
 
 
 async def _get_week_analytics(
     db: AsyncSession,
     user_id,
     week_start: date
-) -> WeeklyAnalytics:
-    """Build weekly analytics response"""
-    score = await ScoreEngine.calculate_weekly_score(db, user_id, week_start)
-    insights = await Explainer.explain_weekly_change(db, user_id, week_start)
+) -> Dict:
+    """Build weekly analytics content (WeeklyAnalytics shape)"""
+    # This week and last week (for comparison and insights) in one range read
+    last_week_start = week_start - timedelta(days=7)
+    habits = await ScoreEngine.get_active_habits(db, user_id)
+    entries = []
+    if habits:
+        entries = await EntryStore.get_completed(
+            db, user_id, last_week_start, week_start + timedelta(days=6)
+        )
+    await release(db)
+    
+    return _week_content(habits, entries, week_start)
+
+
+def _today_content(habits: List[Habit], entries: List, today: date) -> Dict:
+    """Today's stats (TodayStats shape); entries must reach back to the streak window"""
+    daily_score = ScoreEngine.score_day(habits, entries, today)
+    streak = ScoreEngine.streak_from(entries, today)
+    
+    # Check physical activity
+    physical_ids = {h.id for h in habits if h.is_physical}
+    physical_done = any(
+        e.habit_id in physical_ids and e.entry_date == today for e in entries
+    )
     
-    # Get last week for comparison
+    return {
+        "date": today,
+        "completed": daily_score["completed"],
+        "total": daily_score["total"],
+        "completion_rate": daily_score["completion_rate"],
+        "streak_days": streak,
+        "physical_done": physical_done
+    }
+
+
+def _week_content(habits: List[Habit], entries: List, week_start: date) -> Dict:
+    """Weekly analytics (WeeklyAnalytics shape); entries must include the previous week"""
     last_week_start = week_start - timedelta(days=7)
-    last_week_score = await ScoreEngine.calculate_weekly_score(db, user_id, last_week_start)
+    score = ScoreEngine.score_week(habits, entries, week_start)
+    last_week_score = ScoreEngine.score_week(habits, entries, last_week_start)
+    insights = Explainer.compare_weeks(score, last_week_score)
+    
     comparison = None
     if last_week_score["total_possible"] > 0:
         comparison = score["completion_rate"] - last_week_score["completion_rate"]
     
-    return WeeklyAnalytics(
-        week_start=week_start,
-        week_end=week_start + timedelta(days=6),
-        completion_rate=score["completion_rate"],
-        weighted_score=score["weighted_score"],
-        consistency_score=score["consistency_score"],
-        total_completed=score["total_completed"],
-        total_possible=score["total_possible"],
-        habit_breakdown=score["habit_breakdown"],
-        insights=insights,
-        daily_rates=score["daily_rates"],
-        comparison_to_last_week=round(comparison, 1) if comparison else None
-    )
+    return {
+        "week_start": week_start,
+        "week_end": week_start + timedelta(days=6),
+        "completion_rate": score["completion_rate"],
+        "weighted_score": score["weighted_score"],
+        "consistency_score": score["consistency_score"],
+        "total_completed": score["total_completed"],
+        "total_possible": score["total_possible"],
+        "habit_breakdown": score["habit_breakdown"],
+        "insights": insights,
+        "daily_rates": score["daily_rates"],
+        "comparison_to_last_week": round(comparison, 1) if comparison else None
+    }
 
 
 async def _get_month_analytics(
@@ -173,33 +443,25 @@ async def _get_month_analytics(
     user_id,
     year: int,
     month: int
-) -> MonthlyAnalytics:
-    """Build monthly analytics response"""
-    report = await Aggregator.generate_monthly_report(db, user_id, year, month)
-    
-    # Get weekly scores for the month
-    first_day = date(year, month, 1)
-    if month == 12:
-        last_day = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_day = date(year, month + 1, 1) - timedelta(days=1)
+) -> Dict:
+    """Build monthly analytics content (MonthlyAnalytics shape)"""
+    month_data = await Aggregator.fetch_month(db, user_id, year, month)
+    await release(db)
     
-    weekly_scores = []
-    current = first_day - timedelta(days=first_day.weekday())
-    while current <= last_day:
-        score = await ScoreEngine.calculate_weekly_score(db, user_id, current)
-        weekly_scores.append(score["weighted_score"])
-        current += timedelta(days=7)
+    # Every week overlapping the month, starting from the Monday before the 1st
+    weeks = Aggregator.month_weeks(month_data)
+    report, _ = Aggregator.summarize_month_data(month_data, weeks)
+    weekly_scores = [w["weighted_score"] for w in weeks]
     
-    return MonthlyAnalytics(
-        month=month,
-        year=year,
-        avg_completion_rate=report.avg_completion_rate,
-        avg_weighted_score=report.avg_weighted_score,
-        consistency_trend=report.consistency_trend,
-        performance_grade=report.performance_grade,
-        top_habits=report.top_habits,
-        struggling_habits=report.struggling_habits,
-        weekly_scores=weekly_scores,
-        score_explanation=report.score_explanation
-    )
+    return {
+        "month": month,
+        "year": year,
+        "avg_completion_rate": report["avg_completion_rate"],
+        "avg_weighted_score": report["avg_weighted_score"],
+        "consistency_trend": report["consistency_trend"],
+        "performance_grade": report["performance_grade"],
+        "top_habits": report["top_habits"],
+        "struggling_habits": report["struggling_habits"],
+        "weekly_scores": weekly_scores,
+        "score_explanation": report["score_explanation"]
+    }
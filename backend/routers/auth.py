@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
-from dependencies import get_current_user as require_user
+from dependencies import get_current_user_read as require_user
 from schemas.user import UserCreate, UserLogin, UserResponse, TokenResponse, TokenRefresh
 from services.auth_service import AuthService
 from config import settings
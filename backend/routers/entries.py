@@ -1,56 +1,74 @@
 """
 Entries router - Daily habit entries
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 from uuid import UUID
 from datetime import date, timedelta
-from typing import List
+from typing import Dict, List, Optional
 
-from database import get_db
-from dependencies import get_current_user
+from database import get_db, get_read_db, release
+from dependencies import get_current_user, get_current_user_read, conditional_user
 from models.user import User
 from models.habit import Habit
 from models.entry import DailyEntry
-from schemas.entry import EntryCreate, EntryUpdate, EntryResponse, DayEntriesResponse, HabitEntryStatus
+from schemas.entry import EntryCreate, EntryUpdate, EntryResponse, DayEntriesResponse
 from services.rule_engine import RuleEngine
+from services.entry_store import EntryStore
+from services.change_events import ChangeEvents
+from responses import trusted_response
 
 router = APIRouter(prefix="/entries", tags=["Entries"])
 
+# ETag/304 handling; past dates and weeks are also cacheable
+entries_user = conditional_user(get_current_user_read)
+date_user = conditional_user(
+    get_current_user_read,
+    lambda params: date.fromisoformat(params["entry_date"])
+)
+week_user = conditional_user(
+    get_current_user_read,
+    lambda params: date.fromisoformat(params["week_start"]) + timedelta(days=6)
+)
+
 
 @router.get("/today", response_model=DayEntriesResponse)
 async def get_today_entries(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(entries_user)
 ):
     """Get all habit entries for today"""
-    return await _get_day_entries(db, current_user.id, date.today())
+    today = date.today()
+    days = await _get_range_entries(db, current_user.id, today, today)
+    return trusted_response(DayEntriesResponse, days[0], response)
 
 
 @router.get("/date/{entry_date}", response_model=DayEntriesResponse)
 async def get_date_entries(
     entry_date: date,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(date_user)
 ):
     """Get all habit entries for a specific date"""
-    return await _get_day_entries(db, current_user.id, entry_date)
+    days = await _get_range_entries(db, current_user.id, entry_date, entry_date)
+    return trusted_response(DayEntriesResponse, days[0], response)
 
 
 @router.get("/week/{week_start}", response_model=List[DayEntriesResponse])
 async def get_week_entries(
     week_start: date,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(week_user)
 ):
     """Get all entries for a week (starting from week_start)"""
-    days = []
-    for i in range(7):
-        day = week_start + timedelta(days=i)
-        day_entries = await _get_day_entries(db, current_user.id, day)
-        days.append(day_entries)
-    return days
+    days = await _get_range_entries(
+        db, current_user.id, week_start, week_start + timedelta(days=6)
+    )
+    return trusted_response(List[DayEntriesResponse], days, response)
 
 
 @router.post("", response_model=EntryResponse, status_code=status.HTTP_201_CREATED)
@@ -81,6 +99,9 @@ async def create_or_update_entry(
         existing.completed = entry_data.completed
         if entry_data.notes is not None:
             existing.notes = entry_data.notes
+        await ChangeEvents.entry_changed(
+            db, current_user.id, existing.habit_id, existing.entry_date, existing.completed
+        )
         await db.flush()
         await db.refresh(existing)
         return existing
@@ -94,6 +115,9 @@ async def create_or_update_entry(
         notes=entry_data.notes
     )
     db.add(entry)
+    await ChangeEvents.entry_changed(
+        db, current_user.id, entry.habit_id, entry.entry_date, entry.completed
+    )
     await db.flush()
     await db.refresh(entry)
     return entry
@@ -103,16 +127,12 @@ async def create_or_update_entry(
 async def update_entry(
     entry_id: UUID,
     entry_data: EntryUpdate,
+    entry_date: Optional[date] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Update an existing entry"""
-    result = await db.execute(
-        select(DailyEntry).where(
-            and_(DailyEntry.id == entry_id, DailyEntry.user_id == current_user.id)
-        )
-    )
-    entry = result.scalar_one_or_none()
+    """Update an existing entry (pass entry_date to look up a single partition)"""
+    entry = await _get_entry(db, current_user.id, entry_id, entry_date)
     
     if not entry:
         raise HTTPException(
@@ -125,6 +145,9 @@ async def update_entry(
     if entry_data.notes is not None:
         entry.notes = entry_data.notes
     
+    await ChangeEvents.entry_changed(
+        db, current_user.id, entry.habit_id, entry.entry_date, entry.completed
+    )
     await db.flush()
     await db.refresh(entry)
     return entry
@@ -133,16 +156,12 @@ async def update_entry(
 @router.delete("/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_entry(
     entry_id: UUID,
+    entry_date: Optional[date] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Delete an entry"""
-    result = await db.execute(
-        select(DailyEntry).where(
-            and_(DailyEntry.id == entry_id, DailyEntry.user_id == current_user.id)
-        )
-    )
-    entry = result.scalar_one_or_none()
+    """Delete an entry (pass entry_date to look up a single partition)"""
+    entry = await _get_entry(db, current_user.id, entry_id, entry_date)
     
     if not entry:
         raise HTTPException(
@@ -151,15 +170,37 @@ async def delete_entry(
         )
     
     await db.delete(entry)
+    # Without its live row the day falls back to its compacted bit, if any
+    completed = await EntryStore.is_compacted_completed(
+        db, current_user.id, entry.habit_id, entry.entry_date
+    )
+    await ChangeEvents.entry_changed(
+        db, current_user.id, entry.habit_id, entry.entry_date, completed
+    )
     await db.flush()
 
 
-async def _get_day_entries(
+async def _get_entry(
     db: AsyncSession,
     user_id: UUID,
-    target_date: date
-) -> DayEntriesResponse:
-    """Get all habit statuses for a specific day"""
+    entry_id: UUID,
+    entry_date: Optional[date]
+) -> DailyEntry | None:
+    """Fetch one entry by id; the optional date lets Postgres prune to one partition"""
+    conditions = [DailyEntry.id == entry_id, DailyEntry.user_id == user_id]
+    if entry_date is not None:
+        conditions.append(DailyEntry.entry_date == entry_date)
+    result = await db.execute(select(DailyEntry).where(and_(*conditions)))
+    return result.scalar_one_or_none()
+
+
+async def _get_range_entries(
+    db: AsyncSession,
+    user_id: UUID,
+    start_date: date,
+    end_date: date
+) -> List[Dict]:
+    """Get all habit statuses for each day in [start_date, end_date] (DayEntriesResponse shape)"""
     # Get active habits
     habits_result = await db.execute(
         select(Habit)
@@ -168,17 +209,36 @@ async def _get_day_entries(
     )
     habits = habits_result.scalars().all()
     
-    # Get entries for the date
+    # One range read covers every day and touches only the matching month partitions
     entries_result = await db.execute(
         select(DailyEntry).where(
             and_(
                 DailyEntry.user_id == user_id,
-                DailyEntry.entry_date == target_date
+                DailyEntry.entry_date >= start_date,
+                DailyEntry.entry_date <= end_date
             )
         )
     )
-    entries = {e.habit_id: e for e in entries_result.scalars().all()}
+    # Compacted history first, so live rows override it for the same habit and day
+    entries_by_day = await EntryStore.get_compacted_days(db, user_id, start_date, end_date)
+    for entry in entries_result.scalars().all():
+        entries_by_day.setdefault(entry.entry_date, {})[entry.habit_id] = entry
+    await release(db)
     
+    days = []
+    day = start_date
+    while day <= end_date:
+        days.append(build_day_entries(habits, entries_by_day.get(day, {}), day))
+        day += timedelta(days=1)
+    return days
+
+
+def build_day_entries(
+    habits: List[Habit],
+    entries: dict,
+    target_date: date
+) -> Dict:
+    """Build habit statuses for a specific day"""
     # Build response
     habit_statuses = []
     completion_count = 0
@@ -193,24 +253,24 @@ async def _get_day_entries(
             if habit.is_physical:
                 physical_completed = True
         
-        habit_statuses.append(HabitEntryStatus(
-            habit_id=habit.id,
-            habit_name=habit.name,
-            category=habit.category,
-            is_physical=habit.is_physical,
-            completed=completed,
-            entry_id=entry.id if entry else None,
-            notes=entry.notes if entry else None
-        ))
+        habit_statuses.append({
+            "habit_id": habit.id,
+            "habit_name": habit.name,
+            "category": habit.category,
+            "is_physical": habit.is_physical,
+            "completed": completed,
+            "entry_id": entry.id if entry else None,
+            "notes": entry.notes if entry else None
+        })
     
     total = len(habits)
     rate = (completion_count / total * 100) if total > 0 else 0
     
-    return DayEntriesResponse(
-        date=target_date,
-        habits=habit_statuses,
-        completion_count=completion_count,
-        total_habits=total,
-        completion_rate=round(rate, 1),
-        physical_completed=physical_completed
-    )
+    return {
+        "date": target_date,
+        "habits": habit_statuses,
+        "completion_count": completion_count,
+        "total_habits": total,
+        "completion_rate": round(rate, 1),
+        "physical_completed": physical_completed
+    }
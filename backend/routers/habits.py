@@ -7,11 +7,12 @@ from sqlalchemy import select, and_
 from uuid import UUID
 from typing import List
 
-from database import get_db
-from dependencies import get_current_user
+from database import get_db, get_read_db
+from dependencies import get_current_user, get_current_user_read
 from models.user import User
 from models.habit import Habit
 from schemas.habit import HabitCreate, HabitUpdate, HabitResponse
+from services.change_events import ChangeEvents
 
 router = APIRouter(prefix="/habits", tags=["Habits"])
 
@@ -19,8 +20,8 @@ router = APIRouter(prefix="/habits", tags=["Habits"])
 @router.get("", response_model=List[HabitResponse])
 async def list_habits(
     active_only: bool = True,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read)
 ):
     """List all habits for current user"""
     query = select(Habit).where(Habit.user_id == current_user.id)
@@ -59,6 +60,7 @@ async def create_habit(
         display_order=max_order + 1
     )
     db.add(habit)
+    await ChangeEvents.habits_changed(db, current_user.id)
     await db.flush()
     await db.refresh(habit)
     return habit
@@ -67,8 +69,8 @@ async def create_habit(
 @router.get("/{habit_id}", response_model=HabitResponse)
 async def get_habit(
     habit_id: UUID,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read)
 ):
     """Get a specific habit"""
     result = await db.execute(
@@ -113,6 +115,7 @@ async def update_habit(
     for field, value in update_data.items():
         setattr(habit, field, value)
     
+    await ChangeEvents.habits_changed(db, current_user.id)
     await db.flush()
     await db.refresh(habit)
     return habit
@@ -139,6 +142,7 @@ async def delete_habit(
         )
     
     habit.is_active = False
+    await ChangeEvents.habits_changed(db, current_user.id)
     await db.flush()
 
 
@@ -164,5 +168,6 @@ async def reorder_habit(
         )
     
     habit.display_order = new_order
+    await ChangeEvents.habits_changed(db, current_user.id)
     await db.flush()
     return {"message": "Order updated", "new_order": new_order}
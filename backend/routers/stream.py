@@ -0,0 +1,101 @@
+"""
+Stream router - Server-sent score updates after entry writes
+"""
+import asyncio
+from datetime import date
+from typing import AsyncIterator, Dict
+from uuid import UUID
+import orjson
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import get_read_db, release
+from dependencies import get_current_user_stream
+from models.user import User
+from services.entry_store import EntryStore
+from services.events import get_broker
+from services.live_scores import LiveScoreState
+from services.score_engine import ScoreEngine
+
+router = APIRouter(tags=["Stream"])
+
+
+@router.get("/stream")
+async def stream_scores(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_stream)
+):
+    """
+    Server-sent events for the current user:
+    - `snapshot`: today's completion, streak and week score on connect
+    - `score`: the same fields after each entry write
+    - `resync`: habits changed, the day rolled over or events were dropped;
+      refetch and reconnect (the stream closes after it)
+    """
+    user_id = current_user.id
+    broker = get_broker()
+    # Subscribe before seeding so no write slips in between; replaying one
+    # the seed already saw is a no-op
+    queue = broker.subscribe(user_id)
+    try:
+        today = date.today()
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        entries = await EntryStore.get_completed(
+            db, user_id, LiveScoreState.window_start(today), today
+        )
+        # A stream can stay open for hours; never hold the connection
+        await release(db)
+    except BaseException:
+        broker.unsubscribe(user_id, queue)
+        raise
+
+    state = LiveScoreState(habits, entries, today)
+    return StreamingResponse(
+        _event_stream(request, user_id, queue, state),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _event_stream(
+    request: Request,
+    user_id: UUID,
+    queue: asyncio.Queue,
+    state: LiveScoreState
+) -> AsyncIterator[bytes]:
+    try:
+        yield _sse("snapshot", state.snapshot())
+        while True:
+            try:
+                change = await asyncio.wait_for(
+                    queue.get(), timeout=settings.STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                if state.is_stale():
+                    yield _sse("resync", {"reason": "day"})
+                    break
+                yield b": keepalive\n\n"
+                continue
+
+            if change["type"] != "entry" or state.is_stale():
+                yield _sse("resync", {"reason": change["type"]})
+                break
+
+            snapshot = state.apply(
+                UUID(change["habit_id"]),
+                date.fromisoformat(change["entry_date"]),
+                change["completed"]
+            )
+            if snapshot is not None:
+                yield _sse("score", snapshot)
+    finally:
+        get_broker().unsubscribe(user_id, queue)
+
+
+def _sse(event: str, data: Dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
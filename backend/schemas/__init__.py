@@ -4,7 +4,9 @@ from schemas.habit import HabitCreate, HabitUpdate, HabitResponse
 from schemas.entry import EntryCreate, EntryResponse, DayEntriesResponse
 from schemas.analytics import (
     TodayStats, WeeklyAnalytics, MonthlyAnalytics, 
-    ScoreExplanation, TrendData
+    ScoreExplanation, TrendData, DashboardData, RollingMetrics, YearHeatmap,
+    HabitCorrelations, SimulationRequest, SimulationResult,
+    WeekdayProfile, Seasonality, StreakReport, RangeAnalytics, PeriodComparison
 )
 
 __all__ = [
@@ -12,5 +14,8 @@ __all__ = [
     "HabitCreate", "HabitUpdate", "HabitResponse",
     "EntryCreate", "EntryResponse", "DayEntriesResponse",
     "TodayStats", "WeeklyAnalytics", "MonthlyAnalytics",
-    "ScoreExplanation", "TrendData"
+    "ScoreExplanation", "TrendData", "DashboardData", "RollingMetrics", "YearHeatmap",
+    "HabitCorrelations", "SimulationRequest", "SimulationResult",
+    "WeekdayProfile", "Seasonality", "StreakReport", "RangeAnalytics",
+    "PeriodComparison"
 ]
@@ -1,9 +1,12 @@
 """
 Analytics schemas
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 from typing import Optional
+from uuid import UUID
+
+from schemas.entry import DayEntriesResponse
 
 
 class TodayStats(BaseModel):
@@ -29,6 +32,15 @@ class HabitBreakdown(BaseModel):
     is_below_threshold: bool
 
 
+class HabitSummary(BaseModel):
+    """Per-habit average over a month"""
+    habit_id: str
+    habit_name: str
+    category: str
+    completion_rate: float
+    weight: int
+
+
 class ScoreExplanation(BaseModel):
     """Why score changed"""
     icon: str  # emoji
@@ -59,8 +71,8 @@ class MonthlyAnalytics(BaseModel):
     avg_weighted_score: float
     consistency_trend: float
     performance_grade: str
-    top_habits: list[HabitBreakdown]
-    struggling_habits: list[HabitBreakdown]
+    top_habits: list[HabitSummary]
+    struggling_habits: list[HabitSummary]
     weekly_scores: list[float]
     score_explanation: list[ScoreExplanation]
 
@@ -72,3 +84,210 @@ class TrendData(BaseModel):
     completion_rates: list[float]
     weighted_scores: list[float]
     consistency_scores: list[float]
+
+
+class RollingWindow(BaseModel):
+    """Overall series for one rolling window, one value per date"""
+    window: int
+    completion_rates: list[float]
+    weighted_scores: list[float]
+    ewma_completion_rates: list[float]
+    ewma_weighted_scores: list[float]
+
+
+class HabitRollingWindow(BaseModel):
+    """One habit's series for one rolling window"""
+    window: int
+    completion_rates: list[float]
+    ewma_completion_rates: list[float]
+
+
+class HabitRolling(BaseModel):
+    habit_id: UUID
+    habit_name: str
+    windows: list[HabitRollingWindow]
+
+
+class RollingMetrics(BaseModel):
+    """Rolling and exponentially weighted completion per day"""
+    start: date
+    end: date
+    dates: list[date]
+    overall: list[RollingWindow]
+    habits: list[HabitRolling]
+
+
+class YearHeatmap(BaseModel):
+    """Daily weighted scores of one year; weighted_scores[i] is start + i days"""
+    year: int
+    start: date
+    end: date
+    weighted_scores: list[float]
+
+
+class CorrelatedHabit(BaseModel):
+    habit_id: UUID
+    habit_name: str
+    is_physical: bool
+    completed_days: int
+
+
+class HabitPair(BaseModel):
+    habit_a: UUID
+    habit_b: UUID
+    phi: float
+    jaccard: float
+    together_days: int
+
+
+class HabitCorrelations(BaseModel):
+    """
+    Pairwise co-occurrence over the user's history; matrices follow the order
+    of `habits`, and phi is None for a habit completed on every day or none
+    """
+    start: date
+    end: date
+    days: int
+    habits: list[CorrelatedHabit]
+    phi: list[list[Optional[float]]]
+    jaccard: list[list[float]]
+    together_days: list[list[int]]
+    strongest_pairs: list[HabitPair]
+    weakest_pairs: list[HabitPair]
+
+
+class HabitSettingsChange(BaseModel):
+    """Settings to try for one active habit; omitted fields keep their value"""
+    habit_id: UUID
+    weight: Optional[int] = Field(None, ge=1, le=10)
+    target_per_week: Optional[int] = Field(None, ge=1, le=7)
+    goal_threshold: Optional[int] = Field(None, ge=0, le=100)
+
+
+class SimulationRequest(BaseModel):
+    weeks: int = Field(12, ge=1, le=260)
+    habits: list[HabitSettingsChange]
+
+
+class HabitSettings(BaseModel):
+    weight: int
+    target_per_week: int
+    goal_threshold: int
+
+
+class SimulatedSeries(BaseModel):
+    completion_rates: list[float]
+    weighted_scores: list[float]
+    habits_below_threshold: list[int]
+
+
+class SimulatedHabitSeries(BaseModel):
+    completion_rates: list[float]
+    weeks_below_threshold: int
+
+
+class SimulatedHabit(BaseModel):
+    habit_id: UUID
+    habit_name: str
+    current_settings: HabitSettings
+    simulated_settings: HabitSettings
+    current: SimulatedHabitSeries
+    simulated: SimulatedHabitSeries
+
+
+class SimulationResult(BaseModel):
+    """Past weekly scores with the current settings and with the proposed ones"""
+    week_starts: list[date]
+    current: SimulatedSeries
+    simulated: SimulatedSeries
+    habits: list[SimulatedHabit]
+
+
+class HabitWeekdayProfile(BaseModel):
+    habit_id: UUID
+    habit_name: str
+    completion_rates: list[Optional[float]]
+    weakest_day: Optional[str]
+
+
+class WeekdayProfile(BaseModel):
+    """Average completion per weekday (Monday first) over the full history"""
+    start: Optional[date]
+    end: date
+    days: list[str]
+    completion_rates: list[Optional[float]]
+    weighted_scores: list[Optional[float]]
+    weakest_day: Optional[str]
+    habits: list[HabitWeekdayProfile]
+
+
+class HabitSeasonality(BaseModel):
+    habit_id: UUID
+    habit_name: str
+    completion_rates: list[Optional[float]]
+    weakest_month: Optional[str]
+
+
+class Seasonality(BaseModel):
+    """Average completion per month of the year over the full history"""
+    start: Optional[date]
+    end: date
+    months: list[str]
+    completion_rates: list[Optional[float]]
+    weighted_scores: list[Optional[float]]
+    weakest_month: Optional[str]
+    habits: list[HabitSeasonality]
+
+
+class StreakRun(BaseModel):
+    start: date
+    end: date
+    length: int
+
+
+class HabitStreaks(BaseModel):
+    habit_id: UUID
+    habit_name: str
+    current_streak: int
+    best_streak: int
+    best_run: Optional[StreakRun]
+    history: list[StreakRun]  # most recent first
+
+
+class StreakReport(BaseModel):
+    """Per-habit streaks; a current streak is a run that includes today"""
+    as_of: date
+    habits: list[HabitStreaks]
+
+
+class RangeHabitBreakdown(HabitBreakdown):
+    """Per-habit analytics with the weekly target pro-rated to the range"""
+    target_count: float
+
+
+class RangeAnalytics(BaseModel):
+    """Weekly scoring applied to an arbitrary span of days"""
+    start: date
+    end: date
+    days: int
+    completion_rate: float
+    weighted_score: float
+    consistency_score: float
+    total_completed: int
+    total_possible: float
+    habit_breakdown: list[RangeHabitBreakdown]
+
+
+class PeriodComparison(BaseModel):
+    """Two periods' scores and the insights explaining the change between them"""
+    previous: RangeAnalytics
+    current: RangeAnalytics
+    insights: list[ScoreExplanation]
+
+
+class DashboardData(BaseModel):
+    """Everything the dashboard shows on load, from one shared fetch"""
+    today: TodayStats
+    week: WeeklyAnalytics
+    trends: TrendData
+    entries: DayEntriesResponse
@@ -3,80 +3,163 @@ Aggregator - Weekly and monthly data aggregation
 """
 from datetime import date, timedelta
 from uuid import UUID
+from typing import Dict, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, func
+from sqlalchemy.dialects.postgresql import insert
 
 from models.score import WeeklyScore, MonthlyScore
 from services.score_engine import ScoreEngine
 from services.explainer import Explainer
+from services.entry_store import EntryStore
+
+
+_WEEKLY_FIELDS = (
+    "completion_rate", "weighted_score", "consistency_score",
+    "total_completed", "total_possible", "habit_breakdown", "insights"
+)
+_MONTHLY_FIELDS = (
+    "avg_completion_rate", "avg_weighted_score", "consistency_trend",
+    "performance_grade", "top_habits", "struggling_habits", "score_explanation"
+)
 
 
 class Aggregator:
     """Handles weekly and monthly data aggregation"""
     
     @staticmethod
-    async def generate_weekly_report(
+    async def upsert_weekly_scores(
         db: AsyncSession,
-        user_id: UUID,
-        week_start: date
-    ) -> WeeklyScore:
-        """Generate and store weekly report"""
-        # Calculate scores
-        score_data = await ScoreEngine.calculate_weekly_score(db, user_id, week_start)
-        insights = await Explainer.explain_weekly_change(db, user_id, week_start)
+        rows: List[Dict]
+    ) -> List[WeeklyScore]:
+        """
+        Insert or update weekly scores in a single INSERT ... ON CONFLICT statement.
+        Rows may belong to different users; the last row wins for a repeated
+        (user_id, week_start).
+        """
+        unique_rows = {(r["user_id"], r["week_start"]): r for r in rows}
+        if not unique_rows:
+            return []
         
-        # Check if report already exists
-        existing = await db.execute(
-            select(WeeklyScore).where(
-                and_(
-                    WeeklyScore.user_id == user_id,
-                    WeeklyScore.week_start == week_start
-                )
-            )
+        stmt = insert(WeeklyScore).values(list(unique_rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_user_week",
+            set_={
+                **{field: stmt.excluded[field] for field in _WEEKLY_FIELDS},
+                "calculated_at": func.now()
+            }
+        ).returning(WeeklyScore)
+        result = await db.execute(
+            select(WeeklyScore).from_statement(stmt),
+            execution_options={"populate_existing": True}
         )
-        weekly_score = existing.scalar_one_or_none()
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def upsert_monthly_scores(
+        db: AsyncSession,
+        rows: List[Dict]
+    ) -> List[MonthlyScore]:
+        """Insert or update monthly scores in a single INSERT ... ON CONFLICT statement"""
+        unique_rows = {(r["user_id"], r["year"], r["month"]): r for r in rows}
+        if not unique_rows:
+            return []
         
-        if weekly_score:
-            # Update existing
-            weekly_score.completion_rate = score_data["completion_rate"]
-            weekly_score.weighted_score = score_data["weighted_score"]
-            weekly_score.consistency_score = score_data["consistency_score"]
-            weekly_score.total_completed = score_data["total_completed"]
-            weekly_score.total_possible = score_data["total_possible"]
-            weekly_score.habit_breakdown = score_data["habit_breakdown"]
-            weekly_score.insights = insights
-        else:
-            # Create new
-            weekly_score = WeeklyScore(
-                user_id=user_id,
-                week_start=week_start,
-                completion_rate=score_data["completion_rate"],
-                weighted_score=score_data["weighted_score"],
-                consistency_score=score_data["consistency_score"],
-                total_completed=score_data["total_completed"],
-                total_possible=score_data["total_possible"],
-                habit_breakdown=score_data["habit_breakdown"],
-                insights=insights
+        stmt = insert(MonthlyScore).values(list(unique_rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            constraint="unique_user_month",
+            set_={
+                **{field: stmt.excluded[field] for field in _MONTHLY_FIELDS},
+                "calculated_at": func.now()
+            }
+        ).returning(MonthlyScore)
+        result = await db.execute(
+            select(MonthlyScore).from_statement(stmt),
+            execution_options={"populate_existing": True}
+        )
+        return list(result.scalars().all())
+    
+    @staticmethod
+    async def build_weekly_row(
+        db: AsyncSession,
+        user_id: UUID,
+        week_start: date
+    ) -> Dict:
+        """Calculate the column values of a weekly report"""
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        entries = []
+        if habits:
+            # The previous week is needed for the insights
+            entries = await EntryStore.get_completed(
+                db, user_id, week_start - timedelta(days=7), week_start + timedelta(days=6)
             )
-            db.add(weekly_score)
+        return Aggregator.weekly_row(user_id, habits, entries, week_start)
+    
+    @staticmethod
+    def weekly_row(
+        user_id: UUID,
+        habits: List,
+        entries: List,
+        week_start: date
+    ) -> Dict:
+        """Weekly report row from already-fetched habits and completed entries"""
+        score_data = ScoreEngine.score_week(habits, entries, week_start)
+        previous_score = ScoreEngine.score_week(habits, entries, week_start - timedelta(days=7))
         
-        await db.flush()
-        return weekly_score
+        row = {field: score_data[field] for field in _WEEKLY_FIELDS if field in score_data}
+        row.update(
+            user_id=user_id,
+            week_start=week_start,
+            insights=Explainer.compare_weeks(score_data, previous_score)
+        )
+        return row
     
     @staticmethod
-    async def generate_monthly_report(
+    async def generate_weekly_report(
         db: AsyncSession,
         user_id: UUID,
-        year: int,
-        month: int
-    ) -> MonthlyScore:
-        """Generate and store monthly report"""
-        # Get all weekly scores for the month
+        week_start: date
+    ) -> WeeklyScore:
+        """Generate and store weekly report"""
+        row = await Aggregator.build_weekly_row(db, user_id, week_start)
+        weekly_scores = await Aggregator.upsert_weekly_scores(db, [row])
+        return weekly_scores[0]
+    
+    @staticmethod
+    async def generate_weekly_reports(
+        db: AsyncSession,
+        user_ids: List[UUID],
+        week_start: date
+    ) -> List[WeeklyScore]:
+        """Generate weekly reports for many users and store them in one statement"""
+        rows = [
+            await Aggregator.build_weekly_row(db, user_id, week_start)
+            for user_id in user_ids
+        ]
+        return await Aggregator.upsert_weekly_scores(db, rows)
+    
+    @staticmethod
+    def _month_bounds(year: int, month: int) -> tuple[date, date]:
         first_day = date(year, month, 1)
         if month == 12:
             last_day = date(year + 1, 1, 1) - timedelta(days=1)
         else:
             last_day = date(year, month + 1, 1) - timedelta(days=1)
+        return first_day, last_day
+    
+    @staticmethod
+    async def fetch_month(
+        db: AsyncSession,
+        user_id: UUID,
+        year: int,
+        month: int
+    ) -> Dict:
+        """
+        Fetch everything a monthly report needs (stored weekly reports, habits
+        and completed entries) so the calculation can run without a connection.
+        """
+        first_day, last_day = Aggregator._month_bounds(year, month)
+        first_week = first_day - timedelta(days=first_day.weekday())  # Monday
         
         result = await db.execute(
             select(WeeklyScore).where(
@@ -87,43 +170,118 @@ class Aggregator:
                 )
             ).order_by(WeeklyScore.week_start)
         )
-        weekly_scores = result.scalars().all()
+        stored_weeks = [
+            {"week_start": w.week_start, **{f: getattr(w, f) for f in _WEEKLY_FIELDS}}
+            for w in result.scalars().all()
+        ]
         
-        if not weekly_scores:
-            # Generate weekly reports first
-            current = first_day - timedelta(days=first_day.weekday())  # Monday
-            while current <= last_day:
-                await Aggregator.generate_weekly_report(db, user_id, current)
-                current += timedelta(days=7)
-            
-            # Fetch again
-            result = await db.execute(
-                select(WeeklyScore).where(
-                    and_(
-                        WeeklyScore.user_id == user_id,
-                        WeeklyScore.week_start >= first_day,
-                        WeeklyScore.week_start <= last_day
-                    )
-                ).order_by(WeeklyScore.week_start)
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        entries = []
+        if habits:
+            # From the week before the first Monday, for that week's insights
+            entries = await EntryStore.get_completed(
+                db, user_id, first_week - timedelta(days=7), last_day + timedelta(days=6)
             )
-            weekly_scores = result.scalars().all()
         
+        return {
+            "user_id": user_id,
+            "year": year,
+            "month": month,
+            "first_day": first_day,
+            "last_day": last_day,
+            "stored_weeks": stored_weeks,
+            "habits": habits,
+            "entries": entries
+        }
+    
+    @staticmethod
+    def month_weeks(month_data: Dict) -> List[Dict]:
+        """Weekly report rows for every week that overlaps the month"""
+        first_day = month_data["first_day"]
+        rows = []
+        current = first_day - timedelta(days=first_day.weekday())  # Monday
+        while current <= month_data["last_day"]:
+            rows.append(Aggregator.weekly_row(
+                month_data["user_id"], month_data["habits"], month_data["entries"], current
+            ))
+            current += timedelta(days=7)
+        return rows
+    
+    @staticmethod
+    def summarize_month_data(
+        month_data: Dict,
+        weeks: List[Dict] | None = None
+    ) -> tuple[Dict, List[Dict]]:
+        """
+        Monthly report row from fetched month data. Stored weekly reports are
+        used when present; otherwise the weeks are calculated and also returned
+        so the caller can store them.
+        """
+        first_day, last_day = month_data["first_day"], month_data["last_day"]
+        if month_data["stored_weeks"]:
+            weekly_scores, generated = month_data["stored_weeks"], []
+        else:
+            generated = weeks if weeks is not None else Aggregator.month_weeks(month_data)
+            weekly_scores = [w for w in generated if first_day <= w["week_start"] <= last_day]
+        
+        row = Aggregator._summarize_month(
+            month_data["user_id"], month_data["year"], month_data["month"], weekly_scores
+        )
+        return row, generated
+    
+    @staticmethod
+    async def build_monthly_row(
+        db: AsyncSession,
+        user_id: UUID,
+        year: int,
+        month: int
+    ) -> Dict:
+        """Calculate the column values of a monthly report without writing anything"""
+        month_data = await Aggregator.fetch_month(db, user_id, year, month)
+        row, _ = Aggregator.summarize_month_data(month_data)
+        return row
+    
+    @staticmethod
+    async def generate_monthly_report(
+        db: AsyncSession,
+        user_id: UUID,
+        year: int,
+        month: int
+    ) -> MonthlyScore:
+        """Generate and store monthly report"""
+        month_data = await Aggregator.fetch_month(db, user_id, year, month)
+        row, generated = Aggregator.summarize_month_data(month_data)
+        if generated:
+            # Store the weekly reports calculated on the way, in one upsert
+            await Aggregator.upsert_weekly_scores(db, generated)
+        
+        monthly_scores = await Aggregator.upsert_monthly_scores(db, [row])
+        return monthly_scores[0]
+    
+    @staticmethod
+    def _summarize_month(
+        user_id: UUID,
+        year: int,
+        month: int,
+        weekly_scores: List[Dict]
+    ) -> Dict:
+        """Monthly report row from the month's weekly report rows"""
         # Calculate monthly aggregates
         if weekly_scores:
-            avg_completion = sum(w.completion_rate for w in weekly_scores) / len(weekly_scores)
-            avg_weighted = sum(w.weighted_score for w in weekly_scores) / len(weekly_scores)
+            avg_completion = sum(w["completion_rate"] for w in weekly_scores) / len(weekly_scores)
+            avg_weighted = sum(w["weighted_score"] for w in weekly_scores) / len(weekly_scores)
             
             # Consistency trend
             if len(weekly_scores) > 1:
                 first_half = weekly_scores[:len(weekly_scores)//2]
                 second_half = weekly_scores[len(weekly_scores)//2:]
-                first_avg = sum(w.consistency_score for w in first_half) / len(first_half)
-                second_avg = sum(w.consistency_score for w in second_half) / len(second_half)
+                first_avg = sum(w["consistency_score"] for w in first_half) / len(first_half)
+                second_avg = sum(w["consistency_score"] for w in second_half) / len(second_half)
                 consistency_trend = second_avg - first_avg
             else:
                 consistency_trend = 0
             
-            weekly_rates = [w.completion_rate for w in weekly_scores]
+            weekly_rates = [w["completion_rate"] for w in weekly_scores]
         else:
             avg_completion = 0
             avg_weighted = 0
@@ -135,7 +293,7 @@ class Aggregator:
         # Aggregate habit performance across weeks
         habit_totals = {}
         for week in weekly_scores:
-            for habit in week.habit_breakdown:
+            for habit in week["habit_breakdown"]:
                 hid = habit["habit_id"]
                 if hid not in habit_totals:
                     habit_totals[hid] = {
@@ -199,40 +357,15 @@ class Aggregator:
                 "impact": consistency_trend / 10
             })
         
-        # Check if exists
-        existing = await db.execute(
-            select(MonthlyScore).where(
-                and_(
-                    MonthlyScore.user_id == user_id,
-                    MonthlyScore.year == year,
-                    MonthlyScore.month == month
-                )
-            )
-        )
-        monthly_score = existing.scalar_one_or_none()
-        
-        if monthly_score:
-            monthly_score.avg_completion_rate = avg_completion
-            monthly_score.avg_weighted_score = avg_weighted
-            monthly_score.consistency_trend = consistency_trend
-            monthly_score.performance_grade = grade
-            monthly_score.top_habits = top_habits
-            monthly_score.struggling_habits = struggling_habits
-            monthly_score.score_explanation = explanations
-        else:
-            monthly_score = MonthlyScore(
-                user_id=user_id,
-                month=month,
-                year=year,
-                avg_completion_rate=avg_completion,
-                avg_weighted_score=avg_weighted,
-                consistency_trend=consistency_trend,
-                performance_grade=grade,
-                top_habits=top_habits,
-                struggling_habits=struggling_habits,
-                score_explanation=explanations
-            )
-            db.add(monthly_score)
-        
-        await db.flush()
-        return monthly_score
+        return {
+            "user_id": user_id,
+            "month": month,
+            "year": year,
+            "avg_completion_rate": avg_completion,
+            "avg_weighted_score": avg_weighted,
+            "consistency_trend": consistency_trend,
+            "performance_grade": grade,
+            "top_habits": top_habits,
+            "struggling_habits": struggling_habits,
+            "score_explanation": explanations
+        }
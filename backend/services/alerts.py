@@ -0,0 +1,185 @@
+"""
+Alerts - Goal-threshold crossings, queued in an outbox and sent in batches
+"""
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.score_engine import ScoreEngine
+
+logger = logging.getLogger(__name__)
+
+# After Rollups.apply has recorded a change of `delta` on a day of the week,
+# compare the habit's weekly rate (score_week's formula) before and after it
+# and queue an alert if it crossed goal_threshold. The week's count is the
+# difference of two rollup checkpoints, so no entries are read.
+_EVALUATE_SQL = text("""
+WITH week AS (
+    SELECT coalesce((
+        SELECT completed_total FROM habit_rollups
+        WHERE habit_id = :habit_id AND day <= CAST(:week_end AS date)
+        ORDER BY day DESC LIMIT 1
+    ), 0) - coalesce((
+        SELECT completed_total FROM habit_rollups
+        WHERE habit_id = :habit_id AND day < CAST(:week_start AS date)
+        ORDER BY day DESC LIMIT 1
+    ), 0) AS completed
+), rates AS (
+    SELECT h.user_id, h.id AS habit_id, h.goal_threshold,
+        least(week.completed * 100.0 / h.target_per_week, 100) AS rate,
+        least((week.completed - :delta) * 100.0 / h.target_per_week, 100) AS previous_rate
+    FROM habits AS h, week
+    WHERE h.id = :habit_id AND h.is_active AND h.target_per_week > 0
+)
+INSERT INTO alert_outbox (user_id, habit_id, week_start, kind, completion_rate, goal_threshold)
+SELECT user_id, habit_id, CAST(:week_start AS date),
+    CASE WHEN rate < goal_threshold THEN 'below' ELSE 'met' END,
+    round(rate, 1), goal_threshold
+FROM rates
+WHERE (rate < goal_threshold) <> (previous_rate < goal_threshold)
+""")
+
+# Take the oldest batch; SKIP LOCKED lets several dispatchers drain at once
+_CLAIM_SQL = text("""
+DELETE FROM alert_outbox
+WHERE id IN (
+    SELECT id FROM alert_outbox ORDER BY id LIMIT :limit FOR UPDATE SKIP LOCKED
+)
+RETURNING id, user_id, habit_id, week_start, kind, completion_rate, goal_threshold, created_at
+""")
+
+
+class AlertSink(ABC):
+    """Interface for delivering alerts; `send` gets a batch of JSON-compatible dicts in order"""
+
+    @abstractmethod
+    async def send(self, alerts: List[Dict]) -> None:
+        ...
+
+
+class LogSink(AlertSink):
+    """Writes alerts to the application log"""
+
+    async def send(self, alerts: List[Dict]) -> None:
+        for alert in alerts:
+            logger.info(f"Alert: {json.dumps(alert)}")
+
+
+class FileSink(AlertSink):
+    """Appends alerts to a file as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def send(self, alerts: List[Dict]) -> None:
+        lines = "".join(json.dumps(alert) + "\n" for alert in alerts)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: str) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class Alerts:
+    """
+    Re-evaluates goal_threshold for the one habit and week an entry write
+    touched, inside the writing transaction, and records crossings (below
+    the goal, or back to meeting it) in alert_outbox. Sinks only see
+    alerts of committed writes, at least once.
+    """
+
+    @staticmethod
+    async def apply(
+        db: AsyncSession,
+        habit_id: UUID,
+        day: date,
+        delta: int
+    ) -> None:
+        """Follow an entry write; `delta` is the completion change from Rollups.apply"""
+        if delta == 0:
+            return
+        week_start, week_end = ScoreEngine.get_week_bounds(day)
+        await db.execute(_EVALUATE_SQL, {
+            "habit_id": habit_id,
+            "week_start": week_start,
+            "week_end": week_end,
+            "delta": delta,
+        })
+
+    @staticmethod
+    async def drain(db: AsyncSession, sink: AlertSink, batch_size: int = 500) -> int:
+        """
+        Send the oldest batch of queued alerts; they leave the outbox when
+        the caller commits, so a failed send leaves them for the next run
+        """
+        result = await db.execute(_CLAIM_SQL, {"limit": batch_size})
+        rows = sorted(result.mappings().all(), key=lambda row: row["id"])
+        if not rows:
+            return 0
+        await sink.send([
+            {
+                "id": row["id"],
+                "user_id": str(row["user_id"]),
+                "habit_id": str(row["habit_id"]),
+                "week_start": row["week_start"].isoformat(),
+                "kind": row["kind"],
+                "completion_rate": row["completion_rate"],
+                "goal_threshold": row["goal_threshold"],
+                "created_at": row["created_at"].isoformat(),
+            }
+            for row in rows
+        ])
+        return len(rows)
+
+
+_sink: Optional[AlertSink] = None
+
+
+def get_sink() -> AlertSink:
+    """Process-wide sink, chosen by ALERT_SINK unless one was set"""
+    global _sink
+    if _sink is None:
+        from config import settings
+        if settings.ALERT_SINK == "file":
+            _sink = FileSink(settings.ALERT_FILE)
+        else:
+            _sink = LogSink()
+    return _sink
+
+
+def set_sink(sink: Optional[AlertSink]) -> None:
+    """Plug in another sink (None goes back to ALERT_SINK)"""
+    global _sink
+    _sink = sink
+
+
+async def run_alert_dispatch():
+    """Scheduled job: drain the outbox batch by batch, one transaction each"""
+    from config import settings
+    from database import get_session_factory
+
+    factory = get_session_factory()
+    sent = 0
+    while True:
+        async with factory() as session:
+            try:
+                count = await Alerts.drain(session, get_sink(), settings.ALERT_BATCH_SIZE)
+            except Exception as e:
+                logger.warning(f"Alert dispatch failed, retrying next run: {e}")
+                break
+            await session.commit()
+        sent += count
+        if count < settings.ALERT_BATCH_SIZE:
+            break
+    if sent:
+        logger.info(f"Dispatched {sent} alerts")
@@ -0,0 +1,65 @@
+"""
+Backfill - Per-user tables derived from the full completion history
+"""
+import logging
+from datetime import date
+from typing import Callable, Dict, List, Sequence
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert, exists, and_, or_
+
+from models.bitmap import HabitMonthBitmap
+from models.entry import DailyEntry
+from models.user import User
+from services.entry_store import EntryStore
+
+logger = logging.getLogger(__name__)
+
+# Builds a derived table's rows (without user_id) from (habit_id, entry_date) rows
+RowBuilder = Callable[[Sequence], List[Dict]]
+
+
+class Backfill:
+    """Rebuilds tables such as habit_rollups and habit_streaks that carry a user_id per row"""
+
+    @staticmethod
+    async def rebuild(
+        db: AsyncSession,
+        model,
+        user_id: UUID,
+        build_rows: RowBuilder,
+        chunk_size: int = 1000
+    ) -> int:
+        """Replace a user's rows of `model` with build_rows(full completion history)"""
+        completed = await EntryStore.get_completed(db, user_id, date.min, date.today())
+        rows = build_rows(completed)
+        await db.execute(delete(model).where(model.user_id == user_id))
+        for i in range(0, len(rows), chunk_size):
+            chunk = [{**row, "user_id": user_id} for row in rows[i:i + chunk_size]]
+            await db.execute(insert(model), chunk)
+        return len(rows)
+
+
+async def run_backfill(model, build_rows: RowBuilder, label: str):
+    """Build `model` rows for users whose history predates the table (run at startup)"""
+    from database import get_session_factory
+
+    has_history = or_(
+        exists().where(and_(DailyEntry.user_id == User.id, DailyEntry.completed == True)),
+        exists().where(HabitMonthBitmap.user_id == User.id)
+    )
+    factory = get_session_factory()
+    async with factory() as session:
+        result = await session.execute(
+            select(User.id).where(
+                and_(~exists().where(model.user_id == User.id), has_history)
+            )
+        )
+        user_ids = list(result.scalars().all())
+
+    for user_id in user_ids:
+        async with factory() as session:
+            await Backfill.rebuild(session, model, user_id, build_rows)
+            await session.commit()
+    if user_ids:
+        logger.info(f"{label} built for {len(user_ids)} users")
@@ -0,0 +1,167 @@
+"""
+Calendar Profile - Completion by weekday and by month of year over the full history
+"""
+import calendar
+from collections import namedtuple
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, extract, func
+
+from models.habit import Habit
+from models.user import User
+from services.data_version import VersionCache
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+
+_cache = VersionCache()
+
+WEEKDAYS = list(calendar.day_name)
+MONTHS = list(calendar.month_name)[1:]
+
+# What the reports need of a habit; cached, so no ORM objects
+ProfiledHabit = namedtuple("ProfiledHabit", "id name weight")
+
+
+def occurrences(start: date, end: date) -> np.ndarray:
+    """
+    How often each (weekday, month) cell occurs from start to end: one
+    calendar span per month, so the cost follows months rather than days
+    """
+    months = np.arange(np.datetime64(start, "M"), np.datetime64(end, "M") + 1)
+    first = np.maximum(months.astype("datetime64[D]"), np.datetime64(start, "D"))
+    last = np.minimum((months + 1).astype("datetime64[D]") - 1, np.datetime64(end, "D"))
+    length = (last - first).astype(np.int64) + 1
+    weekday = (first.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    # A run of n days starting on weekday w holds n // 7 of every weekday,
+    # plus one more of the n % 7 weekdays from w on
+    offset = (np.arange(7)[None, :] - weekday[:, None]) % 7
+    per_weekday = length[:, None] // 7 + (offset < (length % 7)[:, None])
+    by_month = np.zeros((12, 7), dtype=np.int64)
+    np.add.at(by_month, months.astype(np.int64) % 12, per_weekday)
+    return by_month.T
+
+
+class CalendarCounts:
+    """Completions per active habit, weekday and month, and the days each habit could have been done"""
+
+    def __init__(
+        self,
+        habits: Sequence[ProfiledHabit],
+        counts: np.ndarray,
+        starts: List[Optional[date]],
+        today: date
+    ):
+        self.habits = habits
+        self.counts = counts  # habit x weekday (Monday = 0) x month (January = 0)
+        self.starts = starts
+        self.today = today
+        # Occurrences of each cell from the habit's first completed day to
+        # today: the denominators of every rate
+        self.occurrences = np.zeros(counts.shape, dtype=np.int64)
+        for i, start in enumerate(starts):
+            if start is not None:
+                self.occurrences[i] = occurrences(start, today)
+
+
+def _rates(completed: np.ndarray, possible: np.ndarray) -> List[Optional[float]]:
+    """Percentages with 1 decimal; None where nothing was possible"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.round(completed / possible * 100, 1)
+    return [None if p == 0 else float(r) for r, p in zip(rates, possible)]
+
+
+def _weakest(labels: List[str], rates: List[Optional[float]]) -> Optional[str]:
+    known = [(rate, i) for i, rate in enumerate(rates) if rate is not None]
+    return labels[min(known)[1]] if known else None
+
+
+class CalendarProfile:
+    """
+    Both reports come from one GROUP BY habit, ISO weekday and month pass
+    over the completed days, cached per (data version, today). A rate is
+    completions over the days the habit could have been done, counted from
+    the habit's first completion so newer habits are not diluted.
+    """
+
+    @staticmethod
+    async def get_counts(db: AsyncSession, user: User, today: date) -> CalendarCounts:
+        version = (user.data_version, today)
+        cached = _cache.get(user.id, version)
+        if cached is not None:
+            return cached
+
+        habits = [
+            ProfiledHabit(h.id, h.name, h.weight)
+            for h in await ScoreEngine.get_active_habits(db, user.id)
+        ]
+        index = {habit.id: i for i, habit in enumerate(habits)}
+        counts = np.zeros((len(habits), 7, 12), dtype=np.int64)
+        starts: List[Optional[date]] = [None] * len(habits)
+        if habits:
+            completed = EntryStore.completed_query(user.id, date.min, today).subquery("completed")
+            weekday = extract("isodow", completed.c.entry_date)
+            month = extract("month", completed.c.entry_date)
+            result = await db.execute(
+                select(
+                    completed.c.habit_id,
+                    weekday.label("weekday"),
+                    month.label("month"),
+                    func.count().label("completed"),
+                    func.min(completed.c.entry_date).label("first_day")
+                ).join(Habit, Habit.id == completed.c.habit_id).where(
+                    and_(Habit.user_id == user.id, Habit.is_active == True)
+                ).group_by(completed.c.habit_id, weekday, month)
+            )
+            for row in result.all():
+                i = index[row.habit_id]
+                counts[i, int(row.weekday) - 1, int(row.month) - 1] = row.completed
+                if starts[i] is None or row.first_day < starts[i]:
+                    starts[i] = row.first_day
+
+        content = CalendarCounts(habits, counts, starts, today)
+        _cache.put(user.id, version, content)
+        return content
+
+    @staticmethod
+    def _report(data: CalendarCounts, axis: int, labels: List[str], key: str) -> Dict:
+        """Collapse the (weekday, month) cells onto one axis and rate each bucket"""
+        other = 2 if axis == 1 else 1
+        completed = data.counts.sum(axis=other)
+        possible = data.occurrences.sum(axis=other)
+        weights = np.array([h.weight for h in data.habits], dtype=np.float64)[:, None]
+
+        overall = _rates(completed.sum(axis=0), possible.sum(axis=0))
+        weighted = _rates((completed * weights).sum(axis=0), (possible * weights).sum(axis=0))
+        known = [s for s in data.starts if s is not None]
+        habits = []
+        for i, habit in enumerate(data.habits):
+            rates = _rates(completed[i], possible[i])
+            habits.append({
+                "habit_id": habit.id,
+                "habit_name": habit.name,
+                "completion_rates": rates,
+                f"weakest_{key}": _weakest(labels, rates),
+            })
+        return {
+            "start": min(known) if known else None,
+            "end": data.today,
+            f"{key}s": labels,
+            "completion_rates": overall,
+            "weighted_scores": weighted,
+            f"weakest_{key}": _weakest(labels, weighted),
+            "habits": habits,
+        }
+
+    @staticmethod
+    async def weekday_profile(db: AsyncSession, user: User, today: date) -> Dict:
+        """Average completion per weekday, overall and per active habit"""
+        data = await CalendarProfile.get_counts(db, user, today)
+        return CalendarProfile._report(data, 1, WEEKDAYS, "day")
+
+    @staticmethod
+    async def seasonality(db: AsyncSession, user: User, today: date) -> Dict:
+        """Average completion per month of the year, overall and per active habit"""
+        data = await CalendarProfile.get_counts(db, user, today)
+        return CalendarProfile._report(data, 2, MONTHS, "month")
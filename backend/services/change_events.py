@@ -0,0 +1,87 @@
+"""
+Change Events - One hook for every habit/entry write
+"""
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, List, Tuple
+from uuid import UUID
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from services.alerts import Alerts
+from services.data_version import DataVersion
+from services.events import get_broker
+from services.heatmap import Heatmap
+from services.rollups import Rollups
+from services.streaks import Streaks
+
+logger = logging.getLogger(__name__)
+
+_PENDING = "pending_change_events"
+_tasks = set()
+
+
+class ChangeEvents:
+    """
+    Routers call these inside the writing transaction. The user's data
+    version is bumped right away; stream events are queued on the session
+    and published only once the transaction commits, so subscribers never
+    see a change that was rolled back.
+    """
+
+    @staticmethod
+    async def entry_changed(
+        db: AsyncSession,
+        user_id: UUID,
+        habit_id: UUID,
+        entry_date: date,
+        completed: bool
+    ) -> None:
+        """An entry was created, updated or deleted (deleted means completed=False)"""
+        await DataVersion.bump(db, user_id)
+        delta = await Rollups.apply(db, user_id, habit_id, entry_date, completed)
+        await Heatmap.apply(db, user_id, habit_id, entry_date, delta)
+        await Streaks.apply(db, user_id, habit_id, entry_date, delta)
+        await Alerts.apply(db, habit_id, entry_date, delta)
+        ChangeEvents._queue(db, user_id, {
+            "type": "entry",
+            "habit_id": str(habit_id),
+            "entry_date": entry_date.isoformat(),
+            "completed": completed
+        })
+
+    @staticmethod
+    async def habits_changed(db: AsyncSession, user_id: UUID) -> None:
+        """A habit was created, edited, deactivated or reordered"""
+        await DataVersion.bump(db, user_id)
+        ChangeEvents._queue(db, user_id, {"type": "habits"})
+
+    @staticmethod
+    def _queue(db: AsyncSession, user_id: UUID, change: Dict) -> None:
+        db.sync_session.info.setdefault(_PENDING, []).append((user_id, change))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session) -> None:
+    pending: List[Tuple[UUID, Dict]] = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    broker = get_broker()
+    for user_id, change in pending:
+        # after_commit is synchronous; publishing may need I/O (NOTIFY)
+        task = asyncio.get_running_loop().create_task(broker.publish(user_id, change))
+        _tasks.add(task)
+        task.add_done_callback(_finished)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _finished(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Publishing change event failed: {task.exception()}")
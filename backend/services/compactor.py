@@ -0,0 +1,128 @@
+"""
+Compactor - Fold old daily entries into monthly bitmap rows
+"""
+import logging
+from datetime import date
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from services.partition_manager import PartitionManager, DEFAULT_PARTITION
+
+logger = logging.getLogger(__name__)
+
+
+# Merge a month of live rows into the bitmap table. Days that have a live row
+# take the live value and note (`mask` and `days` clear the old ones first);
+# other compacted days keep theirs, so backdated writes into compacted months
+# fold cleanly.
+_FOLD_MONTH = text("""
+    WITH folded AS (
+        SELECT
+            user_id,
+            habit_id,
+            bit_or(CASE WHEN completed
+                THEN 1 << (EXTRACT(DAY FROM entry_date)::int - 1) ELSE 0 END) AS bits,
+            bit_or(1 << (EXTRACT(DAY FROM entry_date)::int - 1)) AS mask,
+            array_agg(EXTRACT(DAY FROM entry_date)::int::text) AS days,
+            jsonb_object_agg(EXTRACT(DAY FROM entry_date)::int::text, notes)
+                FILTER (WHERE notes IS NOT NULL) AS notes
+        FROM daily_entries
+        WHERE entry_date >= CAST(:month_start AS date) AND entry_date < CAST(:next_month AS date)
+        GROUP BY user_id, habit_id
+    )
+    INSERT INTO habit_month_bitmaps (id, user_id, habit_id, month_start, bitmap, notes)
+    SELECT
+        gen_random_uuid(),
+        folded.user_id,
+        folded.habit_id,
+        CAST(:month_start AS date),
+        (COALESCE(existing.bitmap, 0) & ~folded.mask) | folded.bits,
+        NULLIF((COALESCE(existing.notes, '{}'::jsonb) - folded.days) || COALESCE(folded.notes, '{}'::jsonb), '{}'::jsonb)
+    FROM folded
+    LEFT JOIN habit_month_bitmaps existing
+        ON existing.user_id = folded.user_id
+        AND existing.habit_id = folded.habit_id
+        AND existing.month_start = CAST(:month_start AS date)
+    ON CONFLICT (user_id, habit_id, month_start) DO UPDATE
+    SET bitmap = EXCLUDED.bitmap, notes = EXCLUDED.notes
+""")
+
+
+class Compactor:
+    """Moves immutable history out of daily_entries into habit_month_bitmaps"""
+
+    @staticmethod
+    async def compact_month(conn: AsyncConnection, month_start: date) -> int:
+        """
+        Fold one month of daily entries into bitmaps and remove the live rows.
+
+        A month with its own partition is truncated (no dead tuples to vacuum);
+        rows for that month in the default partition are deleted.
+        Returns the number of bitmap rows written.
+        """
+        month_start = PartitionManager.month_start(month_start)
+        next_month = PartitionManager.add_months(month_start, 1)
+        has_partition = month_start in await PartitionManager.list_partitions(conn)
+        table = PartitionManager.partition_name(month_start) if has_partition else DEFAULT_PARTITION
+
+        # Block writers until the live rows are gone, so nothing written between
+        # the fold and the truncate/delete is lost
+        await conn.execute(text(f"LOCK TABLE {table} IN EXCLUSIVE MODE"))
+
+        result = await conn.execute(
+            _FOLD_MONTH,
+            {"month_start": month_start, "next_month": next_month}
+        )
+        folded = result.rowcount
+
+        if has_partition:
+            await conn.execute(text(f"TRUNCATE {table}"))
+        else:
+            await conn.execute(
+                text(
+                    f"DELETE FROM {DEFAULT_PARTITION} "
+                    "WHERE entry_date >= :month_start AND entry_date < :next_month"
+                ),
+                {"month_start": month_start, "next_month": next_month}
+            )
+        return folded
+
+    @staticmethod
+    async def months_to_compact(conn: AsyncConnection, cutoff: date) -> List[date]:
+        """
+        Months before cutoff that still hold live rows. Compacted months are
+        emptied, so after the first run this only reads recent backdated rows.
+        """
+        result = await conn.execute(
+            text(
+                "SELECT DISTINCT date_trunc('month', entry_date)::date FROM daily_entries "
+                "WHERE entry_date < :cutoff"
+            ),
+            {"cutoff": cutoff}
+        )
+        return sorted(row[0] for row in result)
+
+
+async def run_compaction():
+    """Scheduled job: compact every month older than COMPACTION_AGE_MONTHS"""
+    from config import settings
+    from database import get_db_engine
+
+    if settings.COMPACTION_AGE_MONTHS <= 0:
+        return
+
+    cutoff = PartitionManager.add_months(
+        PartitionManager.month_start(date.today()),
+        -settings.COMPACTION_AGE_MONTHS
+    )
+    engine = get_db_engine()
+    async with engine.connect() as conn:
+        months = await Compactor.months_to_compact(conn, cutoff)
+
+    # One transaction per month keeps locks and WAL bursts small
+    for month_start in months:
+        async with engine.begin() as conn:
+            folded = await Compactor.compact_month(conn, month_start)
+        if folded:
+            logger.info(f"Compacted {month_start:%Y-%m}: {folded} habit months")
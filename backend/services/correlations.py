@@ -0,0 +1,141 @@
+"""
+Correlations - Which habits are completed together and which crowd each other out
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.habit import Habit
+from models.user import User
+from services.data_version import VersionCache
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+
+_cache = VersionCache()
+
+# Pairs listed at each end of the phi ranking
+PAIR_COUNT = 5
+# Days of history the matrix covers at most; backdated entries can reach
+# year 1, and the matrix (and its float copy) grows with every day
+LOOKBACK_DAYS = 3653
+
+
+def _rounded(matrix: np.ndarray) -> List[List[Optional[float]]]:
+    """Nested lists with 3 decimals; undefined coefficients become None"""
+    return [
+        [None if np.isnan(value) else value for value in row]
+        for row in np.round(matrix, 3).tolist()
+    ]
+
+
+class Correlations:
+    """
+    Pairwise co-occurrence of the active habits over the user's history,
+    from one habit x day completion matrix: phi (the correlation of two
+    yes/no series, negative when one habit's days tend to be the other's
+    off days) and Jaccard (shared days over days either was completed).
+    """
+
+    @staticmethod
+    def completion_matrix(
+        habits: Sequence[Habit],
+        entries: Sequence,
+        start: date,
+        end: date
+    ) -> np.ndarray:
+        """Boolean matrix, one row per habit and one column per day from start to end"""
+        index = {habit.id: i for i, habit in enumerate(habits)}
+        matrix = np.zeros((len(habits), (end - start).days + 1), dtype=bool)
+        rows = np.fromiter((index.get(e.habit_id, -1) for e in entries), dtype=np.int64, count=len(entries))
+        columns = np.fromiter(
+            (e.entry_date.toordinal() for e in entries), dtype=np.int64, count=len(entries)
+        ) - start.toordinal()
+        keep = (rows >= 0) & (columns >= 0) & (columns < matrix.shape[1])
+        matrix[rows[keep], columns[keep]] = True
+        return matrix
+
+    @staticmethod
+    def coefficients(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """Phi, Jaccard and shared-day counts for every pair of rows"""
+        x = matrix.astype(np.float64)
+        days = x.shape[1]
+        both = x @ x.T
+        counts = np.diag(both)
+        count_i, count_j = counts[:, None], counts[None, :]
+
+        neither = days - count_i - count_j + both
+        only_i, only_j = count_i - both, count_j - both
+        spread = count_i * (days - count_i) * count_j * (days - count_j)
+        union = count_i + count_j - both
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # A habit completed on every day or on none has no defined phi
+            phi = np.where(spread > 0, (both * neither - only_i * only_j) / np.sqrt(spread), np.nan)
+            jaccard = np.where(union > 0, both / union, 0.0)
+        return {"phi": phi, "jaccard": jaccard, "together": both.astype(np.int64)}
+
+    @staticmethod
+    def summarize(
+        habits: Sequence[Habit],
+        matrix: np.ndarray,
+        start: date,
+        end: date
+    ) -> Dict:
+        coefficients = Correlations.coefficients(matrix)
+        phi, jaccard, together = coefficients["phi"], coefficients["jaccard"], coefficients["together"]
+
+        first, second = np.triu_indices(len(habits), k=1)
+        pair_phi = phi[first, second]
+        defined = np.flatnonzero(~np.isnan(pair_phi))
+        ranked = defined[np.argsort(-pair_phi[defined], kind="stable")]
+
+        def pair(k: int) -> Dict:
+            i, j = int(first[k]), int(second[k])
+            return {
+                "habit_a": habits[i].id,
+                "habit_b": habits[j].id,
+                "phi": round(float(phi[i, j]), 3),
+                "jaccard": round(float(jaccard[i, j]), 3),
+                "together_days": int(together[i, j]),
+            }
+
+        return {
+            "start": start,
+            "end": end,
+            "days": matrix.shape[1],
+            "habits": [
+                {
+                    "habit_id": habit.id,
+                    "habit_name": habit.name,
+                    "is_physical": habit.is_physical,
+                    "completed_days": int(together[i, i]),
+                }
+                for i, habit in enumerate(habits)
+            ],
+            "phi": _rounded(phi),
+            "jaccard": _rounded(jaccard),
+            "together_days": together.tolist(),
+            "strongest_pairs": [pair(k) for k in ranked[:PAIR_COUNT] if pair_phi[k] > 0],
+            "weakest_pairs": [pair(k) for k in ranked[::-1][:PAIR_COUNT] if pair_phi[k] < 0],
+        }
+
+    @staticmethod
+    async def get(db: AsyncSession, user: User, today: date) -> Dict:
+        """
+        Correlations of the active habits from the first completed day (at
+        most LOOKBACK_DAYS ago) up to `today`, cached per (data version, today)
+        """
+        version = (user.data_version, today)
+        cached = _cache.get(user.id, version)
+        if cached is not None:
+            return cached
+
+        habits = await ScoreEngine.get_active_habits(db, user.id)
+        earliest = today - timedelta(days=LOOKBACK_DAYS - 1)
+        entries = await EntryStore.get_completed(db, user.id, earliest, today) if habits else []
+        active = {habit.id for habit in habits}
+        start = min((e.entry_date for e in entries if e.habit_id in active), default=today)
+        matrix = Correlations.completion_matrix(habits, entries, start, today)
+        content = Correlations.summarize(habits, matrix, start, today)
+        _cache.put(user.id, version, content)
+        return content
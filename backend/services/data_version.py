@@ -0,0 +1,83 @@
+"""
+Data Version - Per-user change counter behind ETags and conditional GETs
+"""
+import hashlib
+from datetime import date
+from typing import Any, Dict, Hashable, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.user import User
+
+
+class DataVersion:
+    """
+    Every habit or entry write bumps users.data_version in the same
+    transaction, so any response derived from a user's data can be keyed on
+    (user, data_version) without reading the data itself.
+    """
+
+    @staticmethod
+    async def bump(db: AsyncSession, user_id: UUID) -> None:
+        """Mark the user's data as changed; call inside the writing transaction"""
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(data_version=User.data_version + 1)
+        )
+
+    @staticmethod
+    def etag(
+        user_id: UUID,
+        version: int,
+        path: str,
+        query: str,
+        today: Optional[date]
+    ) -> str:
+        """
+        Strong ETag for one representation. `today` is part of the key for
+        responses relative to the current date; pass None for closed periods.
+        """
+        raw = f"{settings.APP_VERSION}:{user_id}:{version}:{today}:{path}?{query}"
+        return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate == "*" or candidate.removeprefix("W/") == etag:
+                return True
+        return False
+
+
+class VersionCache:
+    """
+    Per-user results that stay valid for one data version (plus whatever else
+    the result depends on, such as today's date). A newer version simply
+    misses, so nothing needs invalidating and each worker keeps its own copy.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._entries: Dict[Hashable, Tuple[Hashable, Any]] = {}
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, version: Hashable, value: Any) -> None:
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.maxsize:
+            # Oldest first; dicts keep insertion order
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (version, value)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,192 @@
+"""
+Entry Store - Unified reads over live daily entries and compacted history
+"""
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, exists, func, literal, union_all, Select, Subquery
+
+from models.entry import DailyEntry
+from models.bitmap import HabitMonthBitmap
+
+
+class CompactedEntry(NamedTuple):
+    """A day read back from a month bitmap; has no row id of its own"""
+    habit_id: UUID
+    entry_date: date
+    completed: bool
+    notes: Optional[str]
+    id: Optional[UUID] = None
+
+
+class EntryStore:
+    """
+    Reads completion data regardless of whether it is still in daily_entries
+    or has been folded into habit_month_bitmaps. A live row always wins over
+    the compacted bit for the same habit and day.
+    """
+
+    @staticmethod
+    def month_start(target_date: date) -> date:
+        return target_date.replace(day=1)
+
+    @staticmethod
+    def compaction_horizon() -> Optional[date]:
+        """
+        First day that compaction never touches. Ranges starting on or after it
+        can skip the bitmap table; None means compaction is disabled and any
+        leftover bitmaps must still be consulted.
+        """
+        from config import settings
+        if settings.COMPACTION_AGE_MONTHS <= 0:
+            return None
+        today = date.today()
+        index = today.year * 12 + today.month - 1 - settings.COMPACTION_AGE_MONTHS
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def _is_live_only(start_date: date) -> bool:
+        horizon = EntryStore.compaction_horizon()
+        return horizon is not None and start_date >= horizon
+
+    @staticmethod
+    def completed_entries(
+        user_id: UUID,
+        start_date: date,
+        end_date: date
+    ) -> Subquery:
+        """Subquery of (habit_id, entry_date) for every completed day in the range"""
+        live = select(
+            DailyEntry.habit_id,
+            DailyEntry.entry_date
+        ).where(
+            and_(
+                DailyEntry.user_id == user_id,
+                DailyEntry.entry_date >= start_date,
+                DailyEntry.entry_date <= end_date,
+                DailyEntry.completed == True
+            )
+        )
+
+        offset = func.generate_series(0, 30).table_valued("value").render_derived(name="day_offset")
+        day = HabitMonthBitmap.month_start + offset.c.value
+        overridden = exists().where(
+            and_(
+                DailyEntry.user_id == user_id,
+                DailyEntry.habit_id == HabitMonthBitmap.habit_id,
+                DailyEntry.entry_date == day
+            )
+        )
+        compacted = select(
+            HabitMonthBitmap.habit_id,
+            day.label("entry_date")
+        ).select_from(HabitMonthBitmap).join(offset, literal(True)).where(
+            and_(
+                HabitMonthBitmap.user_id == user_id,
+                HabitMonthBitmap.month_start >= EntryStore.month_start(start_date),
+                HabitMonthBitmap.month_start <= end_date,
+                HabitMonthBitmap.bitmap.op("&")(literal(1).op("<<")(offset.c.value)) != 0,
+                day >= start_date,
+                day <= end_date,
+                ~overridden
+            )
+        )
+
+        return union_all(live, compacted).subquery("completed_entries")
+
+    @staticmethod
+    def completed_query(user_id: UUID, start_date: date, end_date: date) -> Select:
+        """
+        (habit_id, entry_date) of each completed day in the range; skips the
+        bitmap union when the range is newer than anything compaction touches
+        """
+        if EntryStore._is_live_only(start_date):
+            return select(DailyEntry.habit_id, DailyEntry.entry_date).where(
+                and_(
+                    DailyEntry.user_id == user_id,
+                    DailyEntry.entry_date >= start_date,
+                    DailyEntry.entry_date <= end_date,
+                    DailyEntry.completed == True
+                )
+            )
+        completed = EntryStore.completed_entries(user_id, start_date, end_date)
+        return select(completed.c.habit_id, completed.c.entry_date)
+
+    @staticmethod
+    async def get_completed(
+        db: AsyncSession,
+        user_id: UUID,
+        start_date: date,
+        end_date: date
+    ) -> List:
+        """Rows with habit_id and entry_date for each completed day in the range"""
+        result = await db.execute(EntryStore.completed_query(user_id, start_date, end_date))
+        return result.all()
+
+    @staticmethod
+    async def get_compacted_days(
+        db: AsyncSession,
+        user_id: UUID,
+        start_date: date,
+        end_date: date
+    ) -> Dict[date, Dict[UUID, CompactedEntry]]:
+        """Compacted days in the range (completed or carrying a note), grouped by date"""
+        if EntryStore._is_live_only(start_date):
+            return {}
+        
+        result = await db.execute(
+            select(HabitMonthBitmap).where(
+                and_(
+                    HabitMonthBitmap.user_id == user_id,
+                    HabitMonthBitmap.month_start >= EntryStore.month_start(start_date),
+                    HabitMonthBitmap.month_start <= end_date
+                )
+            )
+        )
+
+        days: Dict[date, Dict[UUID, CompactedEntry]] = {}
+        for row in result.scalars().all():
+            notes = row.notes or {}
+            day = max(row.month_start, start_date)
+            last = min(EntryStore._month_end(row.month_start), end_date)
+            while day <= last:
+                completed = bool(row.bitmap & (1 << (day.day - 1)))
+                note = notes.get(str(day.day))
+                if completed or note is not None:
+                    days.setdefault(day, {})[row.habit_id] = CompactedEntry(
+                        habit_id=row.habit_id,
+                        entry_date=day,
+                        completed=completed,
+                        notes=note
+                    )
+                day += timedelta(days=1)
+        return days
+
+    @staticmethod
+    async def is_compacted_completed(
+        db: AsyncSession,
+        user_id: UUID,
+        habit_id: UUID,
+        day: date
+    ) -> bool:
+        """Whether the compacted bit marks the day completed (what shows once its live row is gone)"""
+        if EntryStore._is_live_only(day):
+            return False
+        result = await db.execute(
+            select(HabitMonthBitmap.bitmap).where(
+                and_(
+                    HabitMonthBitmap.user_id == user_id,
+                    HabitMonthBitmap.habit_id == habit_id,
+                    HabitMonthBitmap.month_start == EntryStore.month_start(day)
+                )
+            )
+        )
+        bitmap = result.scalar()
+        return bool(bitmap and bitmap & (1 << (day.day - 1)))
+
+    @staticmethod
+    def _month_end(month_start: date) -> date:
+        if month_start.month == 12:
+            return date(month_start.year + 1, 1, 1) - timedelta(days=1)
+        return date(month_start.year, month_start.month + 1, 1) - timedelta(days=1)
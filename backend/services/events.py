@@ -0,0 +1,137 @@
+"""
+Event Broker - Per-user pub/sub for pushing changes to open streams
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Optional, Set
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+# Delivered in place of events a slow subscriber could not keep up with
+OVERFLOW = {"type": "overflow"}
+
+
+class EventBroker(ABC):
+    """
+    Interface for fanning out change events to subscribers of one user.
+    Events are small JSON-compatible dicts with a "type" key.
+    """
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: UUID, event: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, user_id: UUID) -> asyncio.Queue:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, user_id: UUID, queue: asyncio.Queue) -> None:
+        ...
+
+
+class InProcessBroker(EventBroker):
+    """Fans events out to subscribers in this process only"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[UUID, Set[asyncio.Queue]] = defaultdict(set)
+
+    async def publish(self, user_id: UUID, event: Dict) -> None:
+        self.deliver(user_id, event)
+
+    def deliver(self, user_id: UUID, event: Dict) -> None:
+        """Hand an event to every local subscriber of the user"""
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                # Subscribers apply events incrementally, so a gap must not
+                # pass silently; replace the backlog with an overflow marker
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(OVERFLOW)
+                continue
+            queue.put_nowait(event)
+
+    def subscribe(self, user_id: UUID) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: UUID, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id: UUID) -> int:
+        return len(self._subscribers.get(user_id, ()))
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Shares events between workers through Postgres LISTEN/NOTIFY. Every
+    worker listens on one channel and delivers notifications (its own
+    included) to its local subscribers. Payloads must stay under 8000 bytes.
+    """
+    CHANNEL = "ppas_events"
+
+    def __init__(self, dsn: str, queue_size: int = 100):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        import asyncpg
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(self.CHANNEL, self._on_notify)
+        logger.info(f"Event broker listening on {self.CHANNEL}")
+
+    async def stop(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def publish(self, user_id: UUID, event: Dict) -> None:
+        if self._conn is None:
+            # Not started (or lost): still serve this worker's subscribers
+            self.deliver(user_id, event)
+            return
+        payload = json.dumps({"user_id": str(user_id), "event": event}, default=str)
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            message = json.loads(payload)
+            self.deliver(UUID(message["user_id"]), message["event"])
+        except (ValueError, KeyError):
+            logger.warning(f"Ignoring malformed event on {channel}")
+
+
+_broker: Optional[EventBroker] = None
+
+
+def get_broker() -> EventBroker:
+    """Process-wide broker, chosen by EVENT_BROKER"""
+    global _broker
+    if _broker is None:
+        from config import settings
+        if settings.EVENT_BROKER == "postgres":
+            dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+            _broker = PostgresBroker(dsn)
+        else:
+            _broker = InProcessBroker()
+    return _broker
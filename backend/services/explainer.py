@@ -1,16 +1,127 @@
 """
 Explainer - Generate insights about score changes
 """
+from collections import namedtuple
 from datetime import date, timedelta
-from typing import List, Dict
+from typing import List, Dict, Tuple
+from uuid import UUID
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from services.range_engine import RangeEngine
 from services.score_engine import ScoreEngine
 
+Period = Tuple[date, date]
+
+# Rules on a score that both periods have. `message` gets the change and the
+# period label ("week", "month", ...)
+ScoreRule = namedtuple("ScoreRule", "metric icon applies message impact")
+# Rules on habits, evaluated for all habits at once over vectors of their
+# values in both periods; `message` gets the two breakdown entries
+HabitRule = namedtuple("HabitRule", "icon applies message impact")
+
+SCORE_RULES = [
+    ScoreRule(
+        "completion_rate", "📈", lambda d: d >= 5,
+        lambda d, label: f"Completion rate improved by {d:.1f}%", lambda d: d
+    ),
+    ScoreRule(
+        "completion_rate", "📉", lambda d: d <= -5,
+        lambda d, label: f"Completion rate dropped by {abs(d):.1f}%", lambda d: d
+    ),
+    ScoreRule(
+        "consistency_score", "🎯", lambda d: d >= 10,
+        lambda d, label: "Your daily consistency improved significantly", lambda d: d / 10
+    ),
+    ScoreRule(
+        "consistency_score", "📊", lambda d: d <= -10,
+        lambda d, label: f"Your habit completion was less consistent this {label}", lambda d: d / 10
+    ),
+]
+
+HABIT_RULES = [
+    HabitRule(
+        "🆕", lambda v: v["is_new"],
+        lambda cur, prev: f"New habit '{cur['habit_name']}' added",
+        lambda v: v["contribution"]
+    ),
+    HabitRule(
+        "🚀", lambda v: ~v["is_new"] & (v["delta"] >= 20),
+        lambda cur, prev: (
+            f"'{cur['habit_name']}' improved from {prev['completion_rate']:.0f}% to {cur['completion_rate']:.0f}%"
+        ),
+        lambda v: v["delta"] * v["weight"] / 100
+    ),
+    HabitRule(
+        "⚠️", lambda v: ~v["is_new"] & (v["delta"] <= -20),
+        lambda cur, prev: (
+            f"'{cur['habit_name']}' dropped from {prev['completion_rate']:.0f}% to {cur['completion_rate']:.0f}%"
+        ),
+        lambda v: v["delta"] * v["weight"] / 100
+    ),
+    HabitRule(
+        "🔔", lambda v: ~v["is_new"] & v["below"] & ~v["was_below"],
+        lambda cur, prev: f"'{cur['habit_name']}' is now below your {cur.get('goal_threshold', 80)}% goal",
+        lambda v: np.full(len(v["delta"]), -5.0)
+    ),
+]
+
+# Insights keep the order they were listed in among equal impacts: the
+# completion-rate rules, then per habit in breakdown order, then consistency
+_SECTIONS = {"completion_rate": 0, "habits": 1, "consistency_score": 2}
+
+
+PERIODS = ("week", "month", "quarter")
+
 
 class Explainer:
     """Generates human-readable explanations for score changes"""
     
+    @staticmethod
+    def period_bounds(period: str, anchor: date) -> Period:
+        """The week (Monday start), month or quarter containing `anchor`"""
+        if period == "week":
+            return ScoreEngine.get_week_bounds(anchor)
+        months = 3 if period == "quarter" else 1
+        first_month = (anchor.month - 1) // months * months + 1
+        start = date(anchor.year, first_month, 1)
+        if first_month + months > 12:
+            next_start = date(anchor.year + 1, first_month + months - 12, 1)
+        else:
+            next_start = date(anchor.year, first_month + months, 1)
+        return start, next_start - timedelta(days=1)
+    
+    @staticmethod
+    def previous_period(period: str, current: Period) -> Period:
+        """The period before `current`: the previous week/month/quarter, or as many days just before it"""
+        if period in PERIODS:
+            return Explainer.period_bounds(period, current[0] - timedelta(days=1))
+        start, end = current
+        return start - (end - start) - timedelta(days=1), start - timedelta(days=1)
+    
+    @staticmethod
+    async def explain(
+        db: AsyncSession,
+        user_id: UUID,
+        period_a: Period,
+        period_b: Period,
+        label: str = "period"
+    ) -> Dict:
+        """
+        Why period_b's scores differ from period_a's. Both periods are scored
+        from one per-habit aggregate query, so any two periods (weeks,
+        months, quarters, custom ranges) cost the same two queries.
+        """
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        counts_a, counts_b = await RangeEngine.period_counts(db, user_id, len(habits), [period_a, period_b])
+        previous = RangeEngine.score_period(habits, counts_a, *period_a)
+        current = RangeEngine.score_period(habits, counts_b, *period_b)
+        return {
+            "previous": previous,
+            "current": current,
+            "insights": Explainer.compare(current, previous, label),
+        }
+    
     @staticmethod
     async def explain_weekly_change(
         db: AsyncSession,
@@ -18,96 +129,68 @@ class Explainer:
         current_week: date
     ) -> List[Dict]:
         """Explain why this week's score differs from last week"""
-        insights = []
-        
-        # Get current and previous week scores
-        current_score = await ScoreEngine.calculate_weekly_score(db, user_id, current_week)
         previous_week = current_week - timedelta(days=7)
-        previous_score = await ScoreEngine.calculate_weekly_score(db, user_id, previous_week)
-        
+        explanation = await Explainer.explain(
+            db,
+            user_id,
+            (previous_week, previous_week + timedelta(days=6)),
+            (current_week, current_week + timedelta(days=6)),
+            "week"
+        )
+        return explanation["insights"]
+    
+    @staticmethod
+    def compare_weeks(current_score: Dict, previous_score: Dict) -> List[Dict]:
+        """Insights from two already-computed weekly scores"""
+        return Explainer.compare(current_score, previous_score, "week")
+    
+    @staticmethod
+    def compare(current_score: Dict, previous_score: Dict, label: str = "period") -> List[Dict]:
+        """Insights from two already-scored periods, most impactful first (top 5)"""
         if not previous_score["habit_breakdown"]:
-            insights.append({
+            return [{
                 "icon": "🆕",
-                "message": "First week of tracking! Keep building your habits.",
+                "message": f"First {label} of tracking! Keep building your habits.",
                 "impact": 0
-            })
-            return insights
-        
-        # Compare overall scores
-        rate_diff = current_score["completion_rate"] - previous_score["completion_rate"]
-        if abs(rate_diff) >= 5:
-            if rate_diff > 0:
-                insights.append({
-                    "icon": "📈",
-                    "message": f"Completion rate improved by {rate_diff:.1f}%",
-                    "impact": rate_diff
-                })
-            else:
-                insights.append({
-                    "icon": "📉",
-                    "message": f"Completion rate dropped by {abs(rate_diff):.1f}%",
-                    "impact": rate_diff
-                })
-        
-        # Build lookup for previous week habits
-        prev_habits = {h["habit_id"]: h for h in previous_score["habit_breakdown"]}
-        
-        # Compare individual habits
-        for habit in current_score["habit_breakdown"]:
-            habit_id = habit["habit_id"]
-            prev_habit = prev_habits.get(habit_id)
-            
-            if not prev_habit:
-                insights.append({
-                    "icon": "🆕",
-                    "message": f"New habit '{habit['habit_name']}' added",
-                    "impact": habit["weighted_contribution"]
-                })
-                continue
-            
-            habit_diff = habit["completion_rate"] - prev_habit["completion_rate"]
-            
-            # Significant change (>20%)
-            if habit_diff >= 20:
-                insights.append({
-                    "icon": "🚀",
-                    "message": f"'{habit['habit_name']}' improved from {prev_habit['completion_rate']:.0f}% to {habit['completion_rate']:.0f}%",
-                    "impact": habit_diff * habit["weight"] / 100
-                })
-            elif habit_diff <= -20:
-                insights.append({
-                    "icon": "⚠️",
-                    "message": f"'{habit['habit_name']}' dropped from {prev_habit['completion_rate']:.0f}% to {habit['completion_rate']:.0f}%",
-                    "impact": habit_diff * habit["weight"] / 100
-                })
-            
-            # Check threshold violations
-            if habit["is_below_threshold"] and not prev_habit.get("is_below_threshold", False):
-                insights.append({
-                    "icon": "🔔",
-                    "message": f"'{habit['habit_name']}' is now below your {habit.get('goal_threshold', 80)}% goal",
-                    "impact": -5
-                })
+            }]
         
-        # Consistency insight
-        consistency_diff = current_score["consistency_score"] - previous_score["consistency_score"]
-        if consistency_diff >= 10:
-            insights.append({
-                "icon": "🎯",
-                "message": "Your daily consistency improved significantly",
-                "impact": consistency_diff / 10
-            })
-        elif consistency_diff <= -10:
-            insights.append({
-                "icon": "📊",
-                "message": "Your habit completion was less consistent this week",
-                "impact": consistency_diff / 10
-            })
+        ranked = []  # (position, insight)
+        for index, rule in enumerate(SCORE_RULES):
+            change = current_score[rule.metric] - previous_score[rule.metric]
+            if rule.applies(change):
+                ranked.append(((_SECTIONS[rule.metric], 0, index), {
+                    "icon": rule.icon,
+                    "message": rule.message(change, label),
+                    "impact": rule.impact(change)
+                }))
         
-        # Sort by impact (most impactful first)
-        insights.sort(key=lambda x: abs(x["impact"]), reverse=True)
+        current = current_score["habit_breakdown"]
+        previous = {h["habit_id"]: h for h in previous_score["habit_breakdown"]}
+        if current:
+            matched = [previous.get(h["habit_id"]) for h in current]
+            rate = np.array([h["completion_rate"] for h in current], dtype=np.float64)
+            vectors = {
+                "is_new": np.array([p is None for p in matched]),
+                "delta": rate - np.array([p["completion_rate"] if p else 0.0 for p in matched]),
+                "weight": np.array([h["weight"] for h in current], dtype=np.float64),
+                "contribution": np.array([h["weighted_contribution"] for h in current], dtype=np.float64),
+                "below": np.array([h["is_below_threshold"] for h in current]),
+                "was_below": np.array([bool(p and p.get("is_below_threshold", False)) for p in matched]),
+            }
+            for index, rule in enumerate(HABIT_RULES):
+                hits = np.flatnonzero(rule.applies(vectors))
+                if not len(hits):
+                    continue
+                impacts = rule.impact(vectors)
+                for i in hits:
+                    ranked.append(((_SECTIONS["habits"], int(i), index), {
+                        "icon": rule.icon,
+                        "message": rule.message(current[i], matched[i]),
+                        "impact": float(impacts[i])
+                    }))
         
-        return insights[:5]  # Top 5 insights
+        ranked.sort(key=lambda item: (-abs(item[1]["impact"]), item[0]))
+        return [insight for _, insight in ranked[:5]]
     
     @staticmethod
     def generate_grade(avg_score: float) -> str:
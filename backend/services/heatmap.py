@@ -0,0 +1,161 @@
+"""
+Heatmap - Year calendars of daily weighted scores, cached per user and year
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Dict, List
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, func, literal, text
+from sqlalchemy.dialects.postgresql import insert
+
+from models.habit import Habit
+from models.heatmap import HeatmapYear
+from models.user import User
+from services.entry_store import EntryStore
+
+# Runs after DataVersion.bump in the same transaction: rows that were current
+# before the bump are moved to the new version, and the written day's cell
+# gets the habit's weight added or removed
+_PATCH_SQL = text("""
+UPDATE heatmap_years AS h SET
+    cells[CASE WHEN h.year = :year THEN :day_index ELSE 1 END] = CASE
+        WHEN h.year = :year THEN h.cells[:day_index] + :delta * coalesce(
+            (SELECT weight FROM habits WHERE id = :habit_id AND is_active), 0
+        )
+        ELSE h.cells[1]
+    END,
+    version = u.data_version
+FROM users AS u
+WHERE u.id = :user_id AND h.user_id = :user_id AND h.version = u.data_version - 1
+""")
+
+
+def _year_days(year: int) -> int:
+    return 366 if calendar.isleap(year) else 365
+
+
+class Heatmap:
+    """
+    A year's daily weighted scores (score_day's weighted_score for every day)
+    from one grouped query, kept in heatmap_years. A cached year stays valid
+    while the user's data version does: entry writes patch their day in
+    place, so only habit edits (which change weights) force a rebuild.
+    """
+
+    @staticmethod
+    async def apply(
+        db: AsyncSession,
+        user_id: UUID,
+        habit_id: UUID,
+        day: date,
+        delta: int
+    ) -> None:
+        """Follow an entry write; `delta` is the completion change from Rollups.apply"""
+        await db.execute(_PATCH_SQL, {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "year": day.year,
+            "day_index": day.timetuple().tm_yday,
+            "delta": delta,
+        })
+
+    @staticmethod
+    async def get_year(
+        db: AsyncSession,
+        cache_db: AsyncSession,
+        user: User,
+        year: int
+    ) -> Dict:
+        """
+        Scores for every day of `year`. A miss is computed on the read-only
+        `db` and stored through the writable `cache_db`.
+        """
+        result = await db.execute(
+            select(HeatmapYear.total_weight, HeatmapYear.cells).where(
+                and_(
+                    HeatmapYear.user_id == user.id,
+                    HeatmapYear.year == year,
+                    HeatmapYear.version == user.data_version
+                )
+            )
+        )
+        cached = result.first()
+        if cached is not None:
+            total_weight, cells = cached
+        else:
+            total_weight, cells = await Heatmap._compute(db, user.id, year)
+            await Heatmap._store(cache_db, user, year, total_weight, cells)
+
+        start = date(year, 1, 1)
+        return {
+            "year": year,
+            "start": start,
+            "end": start + timedelta(days=len(cells) - 1),
+            "weighted_scores": [
+                round(cell / total_weight * 100, 1) if total_weight else 0.0 for cell in cells
+            ],
+        }
+
+    @staticmethod
+    async def _compute(db: AsyncSession, user_id: UUID, year: int) -> tuple[int, List[int]]:
+        """Total active weight and completed weight per day of the year"""
+        completed = EntryStore.completed_query(
+            user_id, date(year, 1, 1), date(year, 12, 31)
+        ).subquery("completed")
+        active = and_(Habit.user_id == user_id, Habit.is_active == True)
+        per_day = select(
+            completed.c.entry_date,
+            func.sum(Habit.weight).label("weight")
+        ).join(Habit, Habit.id == completed.c.habit_id).where(active).group_by(
+            completed.c.entry_date
+        ).subquery("per_day")
+        totals = select(
+            func.coalesce(func.sum(Habit.weight), 0).label("total_weight")
+        ).where(active).subquery("totals")
+        # Totals on every row, and one row even when nothing was completed
+        result = await db.execute(
+            select(totals.c.total_weight, per_day.c.entry_date, per_day.c.weight).select_from(
+                totals
+            ).outerjoin(per_day, literal(True))
+        )
+        rows = result.all()
+
+        cells = [0] * _year_days(year)
+        for row in rows:
+            if row.entry_date is not None:
+                cells[row.entry_date.timetuple().tm_yday - 1] = int(row.weight)
+        return int(rows[0].total_weight), cells
+
+    @staticmethod
+    async def _store(
+        db: AsyncSession,
+        user: User,
+        year: int,
+        total_weight: int,
+        cells: List[int]
+    ) -> None:
+        """
+        Save a computed year unless the user's data changed since it was read.
+        The shared lock on the user row waits out an in-flight write, whose
+        version bump then makes the check fail.
+        """
+        current = select(
+            User.id,
+            literal(year),
+            User.data_version,
+            literal(total_weight),
+            literal(cells, HeatmapYear.cells.type)
+        ).where(
+            and_(User.id == user.id, User.data_version == user.data_version)
+        ).with_for_update(read=True)
+        stmt = insert(HeatmapYear).from_select(
+            ["user_id", "year", "version", "total_weight", "cells"], current
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[HeatmapYear.user_id, HeatmapYear.year],
+            set_={
+                field: stmt.excluded[field] for field in ("version", "total_weight", "cells")
+            }
+        )
+        await db.execute(stmt)
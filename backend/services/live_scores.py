@@ -0,0 +1,113 @@
+"""
+Live Scores - Incrementally maintained today/streak/week state for streams
+"""
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from models.habit import Habit
+from services.score_engine import ScoreEngine
+
+
+class LiveScoreState:
+    """
+    Seeded once from a user's habits and completed entries, then updated per
+    entry change in O(1) (the streak walks back only as far as it reaches).
+    Numbers match ScoreEngine.score_day, score_week and streak_from.
+    """
+
+    def __init__(self, habits: List[Habit], entries: List, today: date):
+        self.today = today
+        self.week_start, self.week_end = ScoreEngine.get_week_bounds(today)
+        self.window_start = LiveScoreState.window_start(today)
+
+        self.habits = {h.id: h for h in habits}
+        self.total_weight = sum(h.weight for h in habits)
+        self.total_possible = sum(h.target_per_week for h in habits)
+
+        # Completed (habit, day) pairs of any habit, as in ScoreEngine
+        self.completed = set()
+        self.day_counts = Counter()
+        self.week_counts = Counter()
+        self.week_total = 0
+        for e in entries:
+            self._set(e.habit_id, e.entry_date, True)
+
+        self.today_done = sum(1 for h in self.habits if (h, today) in self.completed)
+        self.contributions = {h.id: self._contribution(h) for h in habits}
+        self.weighted_sum = sum(self.contributions.values())
+
+    @staticmethod
+    def window_start(today: date) -> date:
+        """Earliest day the state needs: the streak window or this week's Monday"""
+        week_start, _ = ScoreEngine.get_week_bounds(today)
+        return min(ScoreEngine.streak_window_start(today), week_start)
+
+    def is_stale(self) -> bool:
+        """Day rollover; the caller should reseed"""
+        return date.today() != self.today
+
+    def apply(self, habit_id: UUID, entry_date: date, completed: bool) -> Optional[Dict]:
+        """
+        Apply one entry change and return the new snapshot, or None when it
+        changes nothing visible. Idempotent, so changes already included in
+        the seed can be replayed safely.
+        """
+        if not self.window_start <= entry_date <= self.today:
+            return None
+        if ((habit_id, entry_date) in self.completed) == completed:
+            return None
+
+        self._set(habit_id, entry_date, completed)
+        habit = self.habits.get(habit_id)
+        if habit is not None:
+            if entry_date == self.today:
+                self.today_done += 1 if completed else -1
+            if self.week_start <= entry_date <= self.week_end:
+                contribution = self._contribution(habit)
+                self.weighted_sum += contribution - self.contributions[habit_id]
+                self.contributions[habit_id] = contribution
+        return self.snapshot()
+
+    def snapshot(self) -> Dict:
+        total = len(self.habits)
+        completion_rate = self.today_done / total * 100 if total else 0
+        week_rate = self.week_total / self.total_possible * 100 if self.total_possible else 0
+        return {
+            "date": self.today,
+            "completed": self.today_done,
+            "total": total,
+            "completion_rate": round(completion_rate, 1),
+            "streak_days": self._streak(),
+            "week_completion_rate": round(week_rate, 1),
+            "week_weighted_score": round(self.weighted_sum, 1) if self.habits else 0.0
+        }
+
+    def _set(self, habit_id: UUID, day: date, completed: bool) -> None:
+        key = (habit_id, day)
+        if completed == (key in self.completed):
+            return
+        step = 1 if completed else -1
+        if completed:
+            self.completed.add(key)
+        else:
+            self.completed.discard(key)
+        self.day_counts[day] += step
+        if self.week_start <= day <= self.week_end:
+            self.week_counts[habit_id] += step
+            self.week_total += step
+
+    def _contribution(self, habit: Habit) -> float:
+        """Same rounding as ScoreEngine.score_week's weighted_contribution"""
+        target = habit.target_per_week
+        rate = min(self.week_counts[habit.id] / target * 100, 100) if target > 0 else 0
+        return round(habit.weight / self.total_weight * rate, 1) if self.total_weight > 0 else 0
+
+    def _streak(self) -> int:
+        streak = 0
+        day = self.today
+        while self.day_counts[day] > 0:
+            streak += 1
+            day -= timedelta(days=1)
+        return streak
@@ -0,0 +1,169 @@
+"""
+Partition Manager - Monthly range partitions for daily_entries
+"""
+import logging
+import re
+from datetime import date
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "daily_entries"
+DEFAULT_PARTITION = "daily_entries_default"
+_PARTITION_NAME = re.compile(r"^daily_entries_(\d{4})_(\d{2})$")
+
+
+class PartitionManager:
+    """Creates, lists and detaches monthly partitions of daily_entries"""
+
+    @staticmethod
+    def month_start(target_date: date) -> date:
+        """First day of the month containing target_date"""
+        return target_date.replace(day=1)
+
+    @staticmethod
+    def add_months(month_start: date, months: int) -> date:
+        """Shift a month start by a (possibly negative) number of months"""
+        index = month_start.year * 12 + month_start.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def partition_name(month_start: date) -> str:
+        """Partition table name for a month, e.g. daily_entries_2024_03"""
+        return f"{PARENT_TABLE}_{month_start.year:04d}_{month_start.month:02d}"
+
+    @staticmethod
+    async def list_partitions(conn: AsyncConnection) -> List[date]:
+        """Month starts of all attached monthly partitions, oldest first"""
+        result = await conn.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :parent"
+            ),
+            {"parent": PARENT_TABLE}
+        )
+        months = []
+        for (name,) in result:
+            match = _PARTITION_NAME.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    @staticmethod
+    async def default_months(conn: AsyncConnection) -> List[date]:
+        """Month starts of the rows sitting in the default partition, oldest first"""
+        result = await conn.execute(text(
+            f"SELECT DISTINCT CAST(date_trunc('month', entry_date) AS date) AS month "
+            f"FROM {DEFAULT_PARTITION} ORDER BY month"
+        ))
+        return [month for (month,) in result]
+
+    @staticmethod
+    async def create_partition(conn: AsyncConnection, month_start: date) -> bool:
+        """
+        Create and attach the partition for a month.
+
+        Rows for that month already sitting in the default partition are moved
+        into the new table before it is attached, since Postgres refuses to
+        attach a range the default partition still holds rows for.
+        Returns False if the partition already exists.
+        """
+        month_start = PartitionManager.month_start(month_start)
+        if month_start in await PartitionManager.list_partitions(conn):
+            return False
+
+        name = PartitionManager.partition_name(month_start)
+        start = month_start.isoformat()
+        end = PartitionManager.add_months(month_start, 1).isoformat()
+
+        await conn.execute(text(
+            f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ))
+        await conn.execute(text(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE entry_date >= '{start}' AND entry_date < '{end}' RETURNING *"
+            f") INSERT INTO {name} SELECT * FROM moved"
+        ))
+        await conn.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        logger.info(f"Created partition {name}")
+        return True
+
+    @staticmethod
+    async def ensure_partitions(
+        conn: AsyncConnection,
+        months_ahead: int,
+        today: date | None = None
+    ) -> List[str]:
+        """
+        Make sure partitions exist for the current month, the next months_ahead
+        months and every month with rows in the default partition (history
+        loaded before its partition existed), so those rows move out of it
+        """
+        current = PartitionManager.month_start(today or date.today())
+        months = await PartitionManager.default_months(conn)
+        months += [PartitionManager.add_months(current, offset) for offset in range(months_ahead + 1)]
+        created = []
+        for month_start in months:
+            if await PartitionManager.create_partition(conn, month_start):
+                created.append(PartitionManager.partition_name(month_start))
+        return created
+
+    @staticmethod
+    async def detach_partition(conn: AsyncConnection, month_start: date) -> bool:
+        """
+        Detach a month's partition from daily_entries.
+
+        The detached table keeps its rows and can be dumped or moved to cheaper
+        storage; its data no longer shows up in queries against daily_entries.
+        """
+        month_start = PartitionManager.month_start(month_start)
+        if month_start not in await PartitionManager.list_partitions(conn):
+            return False
+
+        name = PartitionManager.partition_name(month_start)
+        await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        logger.info(f"Detached partition {name}")
+        return True
+
+    @staticmethod
+    async def detach_expired(
+        conn: AsyncConnection,
+        retention_months: int,
+        today: date | None = None
+    ) -> List[str]:
+        """Detach partitions for months older than retention_months"""
+        cutoff = PartitionManager.add_months(
+            PartitionManager.month_start(today or date.today()),
+            -retention_months
+        )
+        detached = []
+        for month_start in await PartitionManager.list_partitions(conn):
+            if month_start >= cutoff:
+                break
+            if await PartitionManager.detach_partition(conn, month_start):
+                detached.append(PartitionManager.partition_name(month_start))
+        return detached
+
+
+async def run_partition_maintenance():
+    """Scheduled job: create upcoming partitions and detach expired ones"""
+    from config import settings
+    from database import get_db_engine
+
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        created = await PartitionManager.ensure_partitions(conn, settings.PARTITION_MONTHS_AHEAD)
+        detached = []
+        if settings.PARTITION_RETENTION_MONTHS > 0:
+            detached = await PartitionManager.detach_expired(conn, settings.PARTITION_RETENTION_MONTHS)
+
+    if created or detached:
+        logger.info(f"Partition maintenance: created={created} detached={detached}")
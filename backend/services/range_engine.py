@@ -0,0 +1,149 @@
+"""
+Range Engine - score_week's formulas over any span of days
+"""
+from datetime import date
+from typing import Dict, List, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, cast, column, func, null, values, Date, Float, Integer
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from models.habit import Habit
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+from services.sql import round1
+
+Period = Tuple[date, date]
+
+
+class RangeEngine:
+    """
+    Scores arbitrary periods the way score_week scores a week, with targets
+    pro-rated to the period's length (target_per_week * days / 7). Any
+    number of periods are counted in one aggregate query: completions per
+    habit and, for consistency, the sum and sum of squares of the daily
+    completion rates, so the result size never depends on period length.
+    """
+
+    @staticmethod
+    async def period_counts(
+        db: AsyncSession,
+        user_id: UUID,
+        habit_count: int,
+        periods: Sequence[Period]
+    ) -> List[Dict]:
+        """Per period: {"habits": {habit_id: completed}, "total_completed", "rate_sum", "rate_squares"}"""
+        counts = [
+            {"habits": {}, "total_completed": 0, "rate_sum": 0.0, "rate_squares": 0.0}
+            for _ in periods
+        ]
+        if not periods:
+            return counts
+
+        spans = values(
+            column("period", Integer), column("start_day", Date), column("end_day", Date),
+            name="periods"
+        ).data([(i, start, end) for i, (start, end) in enumerate(periods)])
+        completed = EntryStore.completed_query(
+            user_id, min(start for start, _ in periods), max(end for _, end in periods)
+        ).subquery("completed")
+        in_period = select(spans.c.period, completed.c.habit_id, completed.c.entry_date).join(
+            spans,
+            and_(completed.c.entry_date >= spans.c.start_day, completed.c.entry_date <= spans.c.end_day)
+        ).cte("in_period")
+
+        per_habit = select(
+            in_period.c.period,
+            in_period.c.habit_id,
+            cast(func.count(), Integer).label("completed"),
+            cast(null(), Float).label("rate_sum"),
+            cast(null(), Float).label("rate_squares")
+        ).group_by(in_period.c.period, in_period.c.habit_id)
+
+        per_day = select(
+            in_period.c.period, func.count().label("completed")
+        ).group_by(in_period.c.period, in_period.c.entry_date).subquery("per_day")
+        day_rate = round1(cast(per_day.c.completed, Float) / max(habit_count, 1) * 100)
+        days = select(
+            per_day.c.period,
+            cast(null(), PG_UUID(as_uuid=True)).label("habit_id"),
+            cast(func.sum(per_day.c.completed), Integer).label("completed"),
+            func.sum(day_rate).label("rate_sum"),
+            func.sum(day_rate * day_rate).label("rate_squares")
+        ).group_by(per_day.c.period)
+
+        result = await db.execute(per_habit.union_all(days))
+        for row in result.all():
+            period = counts[row.period]
+            if row.habit_id is not None:
+                period["habits"][row.habit_id] = row.completed
+            else:
+                period["total_completed"] = int(row.completed)
+                period["rate_sum"] = row.rate_sum
+                period["rate_squares"] = row.rate_squares
+        return counts
+
+    @staticmethod
+    def score_period(habits: Sequence[Habit], counts: Dict, start: date, end: date) -> Dict:
+        """One period's scores and per-habit breakdown (score_week's shape, minus daily_rates)"""
+        days = (end - start).days + 1
+        if not habits:
+            return {
+                "start": start,
+                "end": end,
+                "days": days,
+                "completion_rate": 0.0,
+                "weighted_score": 0.0,
+                "consistency_score": 0.0,
+                "total_completed": 0,
+                "total_possible": 0.0,
+                "habit_breakdown": [],
+            }
+
+        total_weight = sum(h.weight for h in habits)
+        breakdown = []
+        for habit in habits:
+            completed_count = counts["habits"].get(habit.id, 0)
+            target = habit.target_per_week * days / 7
+            rate = min(completed_count / target * 100, 100) if target > 0 else 0
+            weighted_contribution = (habit.weight / total_weight * rate) if total_weight > 0 else 0
+            breakdown.append({
+                "habit_id": str(habit.id),
+                "habit_name": habit.name,
+                "category": habit.category,
+                "completed_count": completed_count,
+                "target_count": round(target, 1),
+                "completion_rate": round(rate, 1),
+                "weight": habit.weight,
+                "weighted_contribution": round(weighted_contribution, 1),
+                "is_below_threshold": rate < habit.goal_threshold
+            })
+
+        if days > 1:
+            # Sample variance of the daily rates; days without completions are 0
+            rate_sum = counts["rate_sum"]
+            variance = max(0.0, (counts["rate_squares"] - rate_sum * rate_sum / days) / (days - 1))
+            consistency = max(0, 100 - (variance / 10))
+        else:
+            consistency = 100
+
+        total_possible = sum(h.target_per_week for h in habits) * days / 7
+        completion_rate = counts["total_completed"] / total_possible * 100 if total_possible > 0 else 0
+        return {
+            "start": start,
+            "end": end,
+            "days": days,
+            "completion_rate": round(completion_rate, 1),
+            "weighted_score": round(sum(hb["weighted_contribution"] for hb in breakdown), 1),
+            "consistency_score": round(consistency, 1),
+            "total_completed": counts["total_completed"],
+            "total_possible": round(total_possible, 1),
+            "habit_breakdown": breakdown,
+        }
+
+    @staticmethod
+    async def score_range(db: AsyncSession, user_id: UUID, start: date, end: date) -> Dict:
+        """Scores for start..end (inclusive) in two queries whatever its length"""
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        [counts] = await RangeEngine.period_counts(db, user_id, len(habits), [(start, end)])
+        return RangeEngine.score_period(habits, counts, start, end)
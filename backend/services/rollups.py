@@ -0,0 +1,254 @@
+"""
+Rollups - Running per-habit aggregates for rolling and EWMA metrics
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Dict, List, Sequence
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text, literal, and_
+
+from models.habit import Habit
+from models.rollup import HabitRollup
+from services.backfill import Backfill, run_backfill
+from services.score_engine import ScoreEngine
+
+# Rolling windows in days; each also has an EWMA column with span = window
+WINDOWS = (7, 30, 90)
+ALPHAS = {window: 2 / (window + 1) for window in WINDOWS}
+# Beyond this many days a change's effect on an average is below 1e-10
+# (and power() would underflow for the short spans)
+_DECAY_HORIZON = 1000
+
+
+def _decay_sql(alpha: float, days: str) -> str:
+    return f"(CASE WHEN {days} > {_DECAY_HORIZON} THEN 0 ELSE power(CAST({1 - alpha!r} AS float8), {days}) END)"
+
+
+def _decay(alpha: float, days: int) -> float:
+    return 0.0 if days > _DECAY_HORIZON else (1 - alpha) ** days
+
+
+# Sets whether the habit was completed on :day. The change against the
+# current checkpoints (0, +1 or -1) shifts every later checkpoint; the row
+# for :day itself is written from the checkpoint before it. Idempotent;
+# returns the change when there was one.
+_APPLY_SQL = text(f"""
+WITH prev AS (
+    SELECT day, completed_total, {", ".join(f"ewma_{w}" for w in WINDOWS)}
+    FROM habit_rollups
+    WHERE habit_id = :habit_id AND day < CAST(:day AS date)
+    ORDER BY day DESC
+    LIMIT 1
+), change AS (
+    SELECT :completed - coalesce(
+        (SELECT completed_total FROM habit_rollups WHERE habit_id = :habit_id AND day = CAST(:day AS date))
+        - coalesce((SELECT completed_total FROM prev), 0),
+        0
+    ) AS delta
+), later AS (
+    UPDATE habit_rollups AS r SET
+        completed_total = r.completed_total + change.delta,
+        {", ".join(
+            f"ewma_{w} = r.ewma_{w} + change.delta * {ALPHAS[w]!r} * {_decay_sql(ALPHAS[w], 'r.day - CAST(:day AS date)')}"
+            for w in WINDOWS
+        )}
+    FROM change
+    WHERE r.habit_id = :habit_id AND r.day > CAST(:day AS date) AND change.delta <> 0
+)
+INSERT INTO habit_rollups (habit_id, day, user_id, completed_total, {", ".join(f"ewma_{w}" for w in WINDOWS)})
+SELECT CAST(:habit_id AS uuid), CAST(:day AS date), CAST(:user_id AS uuid),
+    coalesce(prev.completed_total, 0) + :completed,
+    {", ".join(
+        f"coalesce(prev.ewma_{w} * {_decay_sql(ALPHAS[w], 'CAST(:day AS date) - prev.day')}, 0) + :completed * {ALPHAS[w]!r}"
+        for w in WINDOWS
+    )}
+FROM change LEFT JOIN prev ON true
+WHERE change.delta <> 0
+ON CONFLICT (habit_id, day) DO UPDATE SET
+    completed_total = EXCLUDED.completed_total,
+    {", ".join(f"ewma_{w} = EXCLUDED.ewma_{w}" for w in WINDOWS)}
+RETURNING (SELECT delta FROM change)
+""")
+
+
+class _HabitSeries:
+    """One habit's checkpoints, read back as per-day values"""
+
+    def __init__(self, checkpoints: Sequence):
+        self.checkpoints = sorted(checkpoints, key=lambda c: c.day)
+        self.days = [c.day for c in self.checkpoints]
+
+    def _at(self, day: date):
+        index = bisect_right(self.days, day) - 1
+        return self.checkpoints[index] if index >= 0 else None
+
+    def total(self, day: date) -> int:
+        checkpoint = self._at(day)
+        return checkpoint.completed_total if checkpoint is not None else 0
+
+    def ewma(self, window: int, day: date) -> float:
+        checkpoint = self._at(day)
+        if checkpoint is None:
+            return 0.0
+        return getattr(checkpoint, f"ewma_{window}") * _decay(ALPHAS[window], (day - checkpoint.day).days)
+
+
+class Rollups:
+    """
+    Keeps habit_rollups in step with entry writes (one statement per write,
+    called from ChangeEvents) and reads rolling and EWMA series from them.
+    Per-user values are combined from the habits at read time with the
+    current weights, so habit edits never invalidate stored rows.
+    """
+
+    @staticmethod
+    async def apply(
+        db: AsyncSession,
+        user_id: UUID,
+        habit_id: UUID,
+        day: date,
+        completed: bool
+    ) -> int:
+        """
+        Record that the habit was (or was not) completed on `day`. Returns
+        +1 or -1 when that changed the habit's history, otherwise 0.
+        """
+        result = await db.execute(_APPLY_SQL, {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "day": day,
+            "completed": int(completed),
+        })
+        return result.scalar() or 0
+
+    @staticmethod
+    def checkpoints(completed: Sequence) -> List[Dict]:
+        """Checkpoint rows for (habit_id, entry_date) pairs, one per completed day"""
+        rows = []
+        previous: Dict[UUID, Dict] = {}
+        for entry in sorted(completed, key=lambda e: (e.habit_id, e.entry_date)):
+            last = previous.get(entry.habit_id)
+            row = {"habit_id": entry.habit_id, "day": entry.entry_date, "completed_total": 1}
+            for window in WINDOWS:
+                carried = 0.0
+                if last is not None:
+                    carried = last[f"ewma_{window}"] * _decay(ALPHAS[window], (entry.entry_date - last["day"]).days)
+                row[f"ewma_{window}"] = carried + ALPHAS[window]
+            if last is not None:
+                row["completed_total"] += last["completed_total"]
+            previous[entry.habit_id] = row
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, user_id: UUID, chunk_size: int = 1000) -> int:
+        """Recompute a user's rollups from the full completion history"""
+        return await Backfill.rebuild(db, HabitRollup, user_id, Rollups.checkpoints, chunk_size)
+
+    @staticmethod
+    async def get_series(
+        db: AsyncSession,
+        user_id: UUID,
+        start: date,
+        end: date,
+        windows: Sequence[int] = WINDOWS
+    ) -> Dict:
+        """
+        Rolling completion rate, rolling weighted score and EWMA per day from
+        `start` to `end`, overall and per active habit. Reads only the
+        checkpoints inside the range (plus one before it per habit), so the
+        cost does not depend on how much history the user has.
+        """
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        lookback = start - timedelta(days=max(windows))
+        series = {habit.id: [] for habit in habits}
+        if habits:
+            for row in await Rollups._read_checkpoints(db, [h.id for h in habits], lookback, end):
+                series[row.habit_id].append(row)
+        per_habit = {habit_id: _HabitSeries(rows) for habit_id, rows in series.items()}
+
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        habit_count = len(habits)
+        total_weight = sum(h.weight for h in habits)
+
+        def pct(value: float) -> float:
+            return round(value * 100, 1)
+
+        overall = []
+        habit_windows = {habit.id: [] for habit in habits}
+        for window in windows:
+            completion, weighted, ewma_completion, ewma_weighted = [], [], [], []
+            habit_rates = {habit.id: ([], []) for habit in habits}
+            for day in days:
+                count_sum = weighted_sum = ewma_sum = ewma_weighted_sum = 0.0
+                for habit in habits:
+                    values = per_habit[habit.id]
+                    count = values.total(day) - values.total(day - timedelta(days=window))
+                    ewma = values.ewma(window, day)
+                    count_sum += count
+                    weighted_sum += habit.weight * count
+                    ewma_sum += ewma
+                    ewma_weighted_sum += habit.weight * ewma
+                    habit_rates[habit.id][0].append(pct(count / window))
+                    habit_rates[habit.id][1].append(pct(ewma))
+                completion.append(pct(count_sum / (habit_count * window)) if habit_count else 0.0)
+                weighted.append(pct(weighted_sum / (total_weight * window)) if total_weight else 0.0)
+                ewma_completion.append(pct(ewma_sum / habit_count) if habit_count else 0.0)
+                ewma_weighted.append(pct(ewma_weighted_sum / total_weight) if total_weight else 0.0)
+            overall.append({
+                "window": window,
+                "completion_rates": completion,
+                "weighted_scores": weighted,
+                "ewma_completion_rates": ewma_completion,
+                "ewma_weighted_scores": ewma_weighted,
+            })
+            for habit in habits:
+                rates, ewmas = habit_rates[habit.id]
+                habit_windows[habit.id].append({
+                    "window": window,
+                    "completion_rates": rates,
+                    "ewma_completion_rates": ewmas,
+                })
+
+        return {
+            "start": start,
+            "end": end,
+            "dates": days,
+            "overall": overall,
+            "habits": [
+                {"habit_id": habit.id, "habit_name": habit.name, "windows": habit_windows[habit.id]}
+                for habit in habits
+            ],
+        }
+
+    @staticmethod
+    async def _read_checkpoints(
+        db: AsyncSession,
+        habit_ids: List[UUID],
+        start: date,
+        end: date
+    ) -> List:
+        """Checkpoints in [start, end] plus, per habit, the last one before start"""
+        columns = [HabitRollup.habit_id, HabitRollup.day, HabitRollup.completed_total] + [
+            getattr(HabitRollup, f"ewma_{w}") for w in WINDOWS
+        ]
+        habit = select(Habit.id).where(Habit.id.in_(habit_ids)).subquery("habit")
+        before = select(*columns).where(
+            and_(HabitRollup.habit_id == habit.c.id, HabitRollup.day < start)
+        ).order_by(HabitRollup.day.desc()).limit(1).lateral("before")
+        in_range = select(*columns).where(
+            and_(
+                HabitRollup.habit_id.in_(habit_ids),
+                HabitRollup.day >= start,
+                HabitRollup.day <= end
+            )
+        )
+        query = select(before).select_from(habit).join(before, literal(True)).union_all(in_range)
+        result = await db.execute(query)
+        return result.all()
+
+
+async def run_rollup_backfill():
+    """Build rollup checkpoints for users whose history predates them (run at startup)"""
+    await run_backfill(HabitRollup, Rollups.checkpoints, "Rollups")
@@ -14,14 +14,45 @@ def setup_scheduler():
     global scheduler
     try:
         scheduler = AsyncIOScheduler()
-        # Jobs will be added when scheduler is actually needed
-        # For now, just initialize without adding jobs to avoid blocking
+        _add_jobs(scheduler)
         scheduler.start()
         logger.info("Background scheduler started")
     except Exception as e:
         logger.warning(f"Scheduler could not be started: {e}")
 
 
+def _add_jobs(scheduler: AsyncIOScheduler):
+    """Register recurring maintenance jobs"""
+    from services.partition_manager import run_partition_maintenance
+    from services.compactor import run_compaction
+    from services.alerts import run_alert_dispatch
+    from config import settings
+
+    scheduler.add_job(
+        run_partition_maintenance,
+        "cron",
+        hour=3,
+        id="partition_maintenance",
+        replace_existing=True
+    )
+    scheduler.add_job(
+        run_compaction,
+        "cron",
+        hour=4,
+        id="history_compaction",
+        replace_existing=True
+    )
+    if settings.ALERT_DISPATCH_SECONDS > 0:
+        scheduler.add_job(
+            run_alert_dispatch,
+            "interval",
+            seconds=settings.ALERT_DISPATCH_SECONDS,
+            id="alert_dispatch",
+            max_instances=1,
+            replace_existing=True
+        )
+
+
 def shutdown_scheduler():
     """Shutdown the scheduler"""
     global scheduler
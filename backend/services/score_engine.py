@@ -5,11 +5,11 @@ from datetime import date, timedelta
 from uuid import UUID
 from typing import List, Dict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_
 import statistics
 
 from models.habit import Habit
-from models.entry import DailyEntry
+from services.entry_store import EntryStore
 
 
 class ScoreEngine:
@@ -23,6 +23,16 @@ class ScoreEngine:
         week_end = week_start + timedelta(days=6)
         return week_start, week_end
     
+    @staticmethod
+    async def get_active_habits(db: AsyncSession, user_id: UUID) -> List[Habit]:
+        """Fetch the user's active habits in display order"""
+        habits_result = await db.execute(
+            select(Habit).where(
+                and_(Habit.user_id == user_id, Habit.is_active == True)
+            ).order_by(Habit.display_order)
+        )
+        return list(habits_result.scalars().all())
+    
     @staticmethod
     async def calculate_daily_score(
         db: AsyncSession,
@@ -30,14 +40,17 @@ class ScoreEngine:
         target_date: date
     ) -> Dict:
         """Calculate score for a single day"""
-        # Get active habits
-        habits_result = await db.execute(
-            select(Habit).where(
-                and_(Habit.user_id == user_id, Habit.is_active == True)
-            )
-        )
-        habits = habits_result.scalars().all()
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        if not habits:
+            return ScoreEngine.score_day(habits, [], target_date)
         
+        # Get completed entries for the date (live or compacted)
+        entries = await EntryStore.get_completed(db, user_id, target_date, target_date)
+        return ScoreEngine.score_day(habits, entries, target_date)
+    
+    @staticmethod
+    def score_day(habits: List[Habit], entries: List, target_date: date) -> Dict:
+        """Score one day from already-fetched habits and completed entries"""
         if not habits:
             return {
                 "date": target_date,
@@ -47,19 +60,7 @@ class ScoreEngine:
                 "total": 0
             }
         
-        # Get entries for the date
-        entries_result = await db.execute(
-            select(DailyEntry).where(
-                and_(
-                    DailyEntry.user_id == user_id,
-                    DailyEntry.entry_date == target_date,
-                    DailyEntry.completed == True
-                )
-            )
-        )
-        entries = entries_result.scalars().all()
-        
-        completed_habit_ids = {e.habit_id for e in entries}
+        completed_habit_ids = {e.habit_id for e in entries if e.entry_date == target_date}
         
         # Calculate scores
         total_habits = len(habits)
@@ -90,29 +91,25 @@ class ScoreEngine:
         """Calculate comprehensive weekly score with habit breakdown"""
         week_end = week_start + timedelta(days=6)
         
-        # Get active habits
-        habits_result = await db.execute(
-            select(Habit).where(
-                and_(Habit.user_id == user_id, Habit.is_active == True)
-            )
-        )
-        habits = habits_result.scalars().all()
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        if not habits:
+            return ScoreEngine._empty_weekly_score(week_start, week_end)
         
+        # Get all completed entries for the week (live or compacted)
+        entries = await EntryStore.get_completed(db, user_id, week_start, week_end)
+        return ScoreEngine.score_week(habits, entries, week_start)
+    
+    @staticmethod
+    def score_week(habits: List[Habit], entries: List, week_start: date) -> Dict:
+        """
+        Score one week from already-fetched habits and completed entries.
+        Entries outside the week are ignored, so one fetch can serve many weeks.
+        """
+        week_end = week_start + timedelta(days=6)
         if not habits:
             return ScoreEngine._empty_weekly_score(week_start, week_end)
         
-        # Get all entries for the week
-        entries_result = await db.execute(
-            select(DailyEntry).where(
-                and_(
-                    DailyEntry.user_id == user_id,
-                    DailyEntry.entry_date >= week_start,
-                    DailyEntry.entry_date <= week_end,
-                    DailyEntry.completed == True
-                )
-            )
-        )
-        entries = entries_result.scalars().all()
+        entries = [e for e in entries if week_start <= e.entry_date <= week_end]
         
         # Build entries lookup
         entries_by_habit = {}
@@ -197,29 +194,25 @@ class ScoreEngine:
     ) -> int:
         """Calculate current streak of consecutive days with at least one habit completed"""
         today = date.today()
+        entries = await EntryStore.get_completed(
+            db, user_id, ScoreEngine.streak_window_start(today), today
+        )
+        return ScoreEngine.streak_from(entries, today)
+    
+    @staticmethod
+    def streak_window_start(today: date) -> date:
+        """Streaks are capped at 366 days, so one bounded range read is enough"""
+        return today - timedelta(days=365)
+    
+    @staticmethod
+    def streak_from(entries: List, today: date) -> int:
+        """Streak ending today from already-fetched completed entries"""
+        active_days = {e.entry_date for e in entries}
+        
         streak = 0
         check_date = today
-        
-        while True:
-            result = await db.execute(
-                select(func.count(DailyEntry.id)).where(
-                    and_(
-                        DailyEntry.user_id == user_id,
-                        DailyEntry.entry_date == check_date,
-                        DailyEntry.completed == True
-                    )
-                )
-            )
-            count = result.scalar()
-            
-            if count > 0:
-                streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
-            
-            # Safety limit
-            if streak > 365:
-                break
+        while check_date in active_days:
+            streak += 1
+            check_date -= timedelta(days=1)
         
         return streak
@@ -0,0 +1,148 @@
+"""
+Simulator - Re-score past weeks under proposed habit settings
+"""
+from datetime import date, timedelta
+from typing import Dict, Sequence
+from uuid import UUID
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.habit import Habit
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+from services.trend_engine import TrendEngine
+
+SETTINGS = ("weight", "target_per_week", "goal_threshold")
+
+
+class UnknownHabit(Exception):
+    """A proposed change names a habit that is not one of the user's active ones"""
+    def __init__(self, habit_id: UUID):
+        super().__init__(habit_id)
+        self.habit_id = habit_id
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    return np.round(values, 1)
+
+
+class Simulator:
+    """
+    Applies score_week's formulas to a habit x week matrix of completion
+    counts, once with the habits' current settings and once with the
+    proposed ones. Completions are read once; nothing is written.
+    """
+
+    @staticmethod
+    def week_counts(
+        habits: Sequence[Habit],
+        entries: Sequence,
+        first_week: date,
+        weeks: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Completions per habit and week, plus per week the completions of
+        habits not in `habits` (score_week counts those in completion_rate)
+        """
+        index = {habit.id: i for i, habit in enumerate(habits)}
+        week_index = np.fromiter(
+            (e.entry_date.toordinal() for e in entries), dtype=np.int64, count=len(entries)
+        )
+        week_index = (week_index - first_week.toordinal()) // 7
+        habit_index = np.fromiter((index.get(e.habit_id, -1) for e in entries), dtype=np.int64, count=len(entries))
+        in_range = (week_index >= 0) & (week_index < weeks)
+
+        counts = np.zeros((len(habits), weeks), dtype=np.int64)
+        known = in_range & (habit_index >= 0)
+        np.add.at(counts, (habit_index[known], week_index[known]), 1)
+        other = np.bincount(week_index[in_range & (habit_index < 0)], minlength=weeks)
+        return counts, other
+
+    @staticmethod
+    def score(
+        counts: np.ndarray,
+        other: np.ndarray,
+        weight: np.ndarray,
+        target: np.ndarray,
+        threshold: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Weekly completion rate and weighted score, per-habit rates and threshold misses"""
+        target_column = target[:, None].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = np.where(target_column > 0, np.minimum(counts / target_column * 100, 100), 0.0)
+        total_weight = weight.sum()
+        contributions = _round1(weight[:, None] / total_weight * rates) if total_weight > 0 else np.zeros_like(rates)
+        total_possible = target.sum()
+        completed = counts.sum(axis=0) + other
+        completion = completed / total_possible * 100 if total_possible > 0 else np.zeros(counts.shape[1])
+        return {
+            "completion_rates": _round1(completion),
+            "weighted_scores": _round1(contributions.sum(axis=0)),
+            "habit_rates": _round1(rates),
+            "below_threshold": rates < threshold[:, None],
+        }
+
+    @staticmethod
+    async def simulate(
+        db: AsyncSession,
+        user_id: UUID,
+        changes: Dict[UUID, Dict],
+        weeks: int,
+        today: date
+    ) -> Dict:
+        """
+        Current and simulated series for the last `weeks` weeks. `changes`
+        maps active habit ids to the settings to try (any of SETTINGS);
+        raises UnknownHabit for a habit that is not one of the user's active ones.
+        """
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        unknown = set(changes) - {habit.id for habit in habits}
+        if unknown:
+            raise UnknownHabit(next(iter(unknown)))
+
+        first_week, last_week = TrendEngine.weekly_range(today, weeks)
+        entries = await EntryStore.get_completed(db, user_id, first_week, last_week + timedelta(days=6))
+        counts, other = Simulator.week_counts(habits, entries, first_week, weeks)
+
+        current = {
+            setting: np.array([getattr(h, setting) for h in habits], dtype=np.float64)
+            for setting in SETTINGS
+        }
+        proposed = {
+            setting: np.array(
+                [changes.get(h.id, {}).get(setting, getattr(h, setting)) for h in habits], dtype=np.float64
+            )
+            for setting in SETTINGS
+        }
+        before = Simulator.score(counts, other, current["weight"], current["target_per_week"], current["goal_threshold"])
+        after = Simulator.score(counts, other, proposed["weight"], proposed["target_per_week"], proposed["goal_threshold"])
+
+        def series(scored: Dict) -> Dict:
+            return {
+                "completion_rates": scored["completion_rates"].tolist(),
+                "weighted_scores": scored["weighted_scores"].tolist(),
+                "habits_below_threshold": scored["below_threshold"].sum(axis=0).tolist(),
+            }
+
+        def habit_series(scored: Dict, i: int) -> Dict:
+            return {
+                "completion_rates": scored["habit_rates"][i].tolist(),
+                "weeks_below_threshold": int(scored["below_threshold"][i].sum()),
+            }
+
+        return {
+            "week_starts": [first_week + timedelta(weeks=i) for i in range(weeks)],
+            "current": series(before),
+            "simulated": series(after),
+            "habits": [
+                {
+                    "habit_id": habit.id,
+                    "habit_name": habit.name,
+                    "current_settings": {s: getattr(habit, s) for s in SETTINGS},
+                    "simulated_settings": {s: int(proposed[s][i]) for s in SETTINGS},
+                    "current": habit_series(before, i),
+                    "simulated": habit_series(after, i),
+                }
+                for i, habit in enumerate(habits)
+            ],
+        }
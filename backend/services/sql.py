@@ -0,0 +1,9 @@
+"""
+SQL helpers shared by the services that score in Postgres
+"""
+from sqlalchemy import cast, func, Float
+
+
+def round1(value):
+    """round(x, 1) on double precision; ties go to even like Python's round()"""
+    return func.round(cast(value, Float) * 10) / 10
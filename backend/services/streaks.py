@@ -0,0 +1,175 @@
+"""
+Streaks - Per-habit runs of consecutive completed days
+"""
+from datetime import date
+from typing import Dict, List, Sequence
+from uuid import UUID
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text, func, and_, or_
+
+from models.streak import HabitStreak
+from services.backfill import Backfill, run_backfill
+from services.score_engine import ScoreEngine
+
+# A day was completed: the runs ending the day before and starting the day
+# after (if any) are replaced by one run covering all three
+_EXTEND_SQL = text("""
+WITH neighbours AS (
+    DELETE FROM habit_streaks
+    WHERE habit_id = :habit_id
+      AND (end_day = CAST(:day AS date) - 1 OR start_day = CAST(:day AS date) + 1)
+    RETURNING start_day, end_day
+)
+INSERT INTO habit_streaks (habit_id, start_day, end_day, user_id)
+SELECT CAST(:habit_id AS uuid),
+    least(CAST(:day AS date), min(start_day)),
+    greatest(CAST(:day AS date), max(end_day)),
+    CAST(:user_id AS uuid)
+FROM neighbours
+""")
+
+# A day was un-completed: the run containing it is replaced by the parts
+# before and after it
+_SPLIT_SQL = text("""
+WITH run AS (
+    DELETE FROM habit_streaks
+    WHERE habit_id = :habit_id
+      AND start_day = (
+          SELECT max(start_day) FROM habit_streaks
+          WHERE habit_id = :habit_id AND start_day <= CAST(:day AS date)
+      )
+      AND end_day >= CAST(:day AS date)
+    RETURNING start_day, end_day
+)
+INSERT INTO habit_streaks (habit_id, start_day, end_day, user_id)
+SELECT CAST(:habit_id AS uuid), part.start_day, part.end_day, CAST(:user_id AS uuid)
+FROM (
+    SELECT start_day, CAST(:day AS date) - 1 AS end_day FROM run WHERE start_day < CAST(:day AS date)
+    UNION ALL
+    SELECT CAST(:day AS date) + 1, end_day FROM run WHERE end_day > CAST(:day AS date)
+) AS part
+""")
+
+
+def _length(start: date, end: date) -> int:
+    return (end - start).days + 1
+
+
+class Streaks:
+    """
+    Keeps habit_streaks in step with entry writes: a completed day merges
+    with the runs on either side, an undone day splits its run, each with
+    one statement touching at most two rows. Current and best streaks and
+    the recent history are then read from the runs.
+    """
+
+    @staticmethod
+    async def apply(
+        db: AsyncSession,
+        user_id: UUID,
+        habit_id: UUID,
+        day: date,
+        delta: int
+    ) -> None:
+        """Follow an entry write; `delta` is the completion change from Rollups.apply"""
+        if delta == 0:
+            return
+        await db.execute(_EXTEND_SQL if delta > 0 else _SPLIT_SQL, {
+            "user_id": user_id,
+            "habit_id": habit_id,
+            "day": day,
+        })
+
+    @staticmethod
+    def runs(completed: Sequence) -> List[Dict]:
+        """Run-length encode (habit_id, entry_date) rows into streak rows"""
+        if not completed:
+            return []
+        ordered = sorted(completed, key=lambda e: (e.habit_id, e.entry_date))
+        habits = [e.habit_id for e in ordered]
+        days = np.fromiter((e.entry_date.toordinal() for e in ordered), dtype=np.int64, count=len(ordered))
+        same_habit = np.fromiter(
+            (a == b for a, b in zip(habits, habits[1:])), dtype=bool, count=len(habits) - 1
+        )
+        # A run starts wherever the habit changes or the previous day is missing
+        starts = np.flatnonzero(np.concatenate(([True], ~same_habit | (np.diff(days) != 1))))
+        ends = np.append(starts[1:], len(ordered)) - 1
+        return [
+            {
+                "habit_id": habits[s],
+                "start_day": date.fromordinal(int(days[s])),
+                "end_day": date.fromordinal(int(days[e])),
+            }
+            for s, e in zip(starts, ends)
+        ]
+
+    @staticmethod
+    async def rebuild(db: AsyncSession, user_id: UUID, chunk_size: int = 1000) -> int:
+        """Recompute a user's streak runs from the full completion history"""
+        return await Backfill.rebuild(db, HabitStreak, user_id, Streaks.runs, chunk_size)
+
+    @staticmethod
+    async def get_report(db: AsyncSession, user_id: UUID, today: date, history: int = 10) -> Dict:
+        """
+        Per active habit: the current streak (the run ending today), the best
+        run ever and the `history` most recent runs, from one windowed query
+        """
+        habits = await ScoreEngine.get_active_habits(db, user_id)
+        runs_by_habit = {habit.id: {"recent": [], "latest": None, "best": None} for habit in habits}
+        if habits:
+            length = HabitStreak.end_day - HabitStreak.start_day
+            ranked = select(
+                HabitStreak.habit_id,
+                HabitStreak.start_day,
+                HabitStreak.end_day,
+                func.row_number().over(
+                    partition_by=HabitStreak.habit_id, order_by=HabitStreak.end_day.desc()
+                ).label("recent"),
+                func.row_number().over(
+                    partition_by=HabitStreak.habit_id, order_by=(length.desc(), HabitStreak.end_day.desc())
+                ).label("best")
+            ).where(
+                and_(HabitStreak.user_id == user_id, HabitStreak.start_day <= today)
+            ).subquery("ranked")
+            result = await db.execute(
+                # The latest run decides the current streak, even with history=0
+                select(ranked).where(
+                    or_(ranked.c.recent <= max(history, 1), ranked.c.best == 1)
+                ).order_by(ranked.c.habit_id, ranked.c.end_day.desc())
+            )
+            for row in result.all():
+                runs = runs_by_habit.get(row.habit_id)
+                if runs is None:
+                    continue
+                run = {
+                    "start": row.start_day,
+                    "end": row.end_day,
+                    "length": _length(row.start_day, row.end_day),
+                }
+                if row.recent <= history:
+                    runs["recent"].append(run)
+                if row.recent == 1:
+                    runs["latest"] = run
+                if row.best == 1:
+                    runs["best"] = run
+
+        report = []
+        for habit in habits:
+            runs = runs_by_habit[habit.id]
+            latest = runs["latest"]
+            current = latest["length"] if latest and latest["start"] <= today <= latest["end"] else 0
+            report.append({
+                "habit_id": habit.id,
+                "habit_name": habit.name,
+                "current_streak": current,
+                "best_streak": runs["best"]["length"] if runs["best"] else 0,
+                "best_run": runs["best"],
+                "history": runs["recent"],
+            })
+        return {"as_of": today, "habits": report}
+
+
+async def run_streak_backfill():
+    """Build streak runs for users whose history predates them (run at startup)"""
+    await run_backfill(HabitStreak, Streaks.runs, "Streaks")
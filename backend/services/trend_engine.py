@@ -0,0 +1,198 @@
+"""
+Trend Engine - Weekly and monthly trend series in one aggregation query
+"""
+from datetime import date, timedelta
+from typing import Dict, List
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, case, cast, func, literal, Date, Float
+
+from models.habit import Habit
+from services.aggregator import Aggregator
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+from services.sql import round1
+
+
+class TrendEngine:
+    """
+    Computes the same series as scoring each week with ScoreEngine.score_week
+    (and, monthly, averaging the weeks that start in each month as the monthly
+    report does), but in Postgres: completed days are bucketed per week with
+    date_trunc, joined with the active habits' weights and targets, and months
+    are summarised with window functions. Cost is one round trip whatever the
+    lookback.
+    """
+
+    @staticmethod
+    def weekly_range(today: date, lookback: int) -> tuple[date, date]:
+        """First and last Monday of a weekly trend"""
+        current_week, _ = ScoreEngine.get_week_bounds(today)
+        return current_week - timedelta(weeks=lookback - 1), current_week
+
+    @staticmethod
+    def monthly_range(today: date, lookback: int) -> tuple[date, date]:
+        """First and last Monday that start a week inside the trend's months"""
+        index = today.year * 12 + today.month - 1 - (lookback - 1)
+        first_day = date(index // 12, index % 12 + 1, 1)
+        _, last_day = Aggregator._month_bounds(today.year, today.month)
+        first_week = first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+        last_week = last_day - timedelta(days=last_day.weekday())
+        return first_week, last_week
+
+    @staticmethod
+    def week_scores(user_id: UUID, first_week: date, last_week: date):
+        """Subquery: week_start, completion_rate, weighted_score, consistency_score per week"""
+        completed = EntryStore.completed_query(
+            user_id, first_week, last_week + timedelta(days=6)
+        ).cte("completed")
+        entry_week = cast(func.date_trunc("week", completed.c.entry_date), Date)
+
+        habits = select(
+            Habit.id, Habit.weight, Habit.target_per_week
+        ).where(
+            and_(Habit.user_id == user_id, Habit.is_active == True)
+        ).cte("active_habits")
+        totals = select(
+            func.count().label("habit_count"),
+            func.coalesce(func.sum(habits.c.weight), 0).label("total_weight"),
+            func.coalesce(func.sum(habits.c.target_per_week), 0).label("total_possible")
+        ).cte("totals")
+
+        # Daily completion rates; days without completions are 0 and only
+        # count through the fixed 7 in the variance below
+        per_day = select(
+            entry_week.label("week_start"),
+            func.count().label("completed")
+        ).select_from(completed).group_by(completed.c.entry_date).subquery("per_day")
+        day_rate = round1(cast(per_day.c.completed, Float) / totals.c.habit_count * 100)
+        days = select(
+            per_day.c.week_start,
+            func.sum(per_day.c.completed).label("total_completed"),
+            func.sum(day_rate).label("rate_sum"),
+            func.sum(day_rate * day_rate).label("rate_squares")
+        ).select_from(per_day).join(totals, totals.c.habit_count > 0).group_by(
+            per_day.c.week_start
+        ).cte("week_days")
+
+        # Each habit's weighted contribution, rounded per habit as in score_week
+        per_habit = select(
+            entry_week.label("week_start"),
+            completed.c.habit_id,
+            func.count().label("completed")
+        ).select_from(completed).group_by(entry_week, completed.c.habit_id).subquery("per_habit")
+        habit_rate = func.least(cast(per_habit.c.completed, Float) / habits.c.target_per_week * 100, 100)
+        weighted = select(
+            per_habit.c.week_start,
+            func.sum(
+                round1(cast(habits.c.weight, Float) / totals.c.total_weight * habit_rate)
+            ).label("weighted_sum")
+        ).select_from(per_habit).join(habits, habits.c.id == per_habit.c.habit_id).join(
+            totals, literal(True)
+        ).where(
+            and_(habits.c.target_per_week > 0, totals.c.total_weight > 0)
+        ).group_by(per_habit.c.week_start).cte("week_weighted")
+
+        week_count = (last_week - first_week).days // 7 + 1
+        offset = func.generate_series(0, week_count - 1).table_valued("value").render_derived(name="week_index")
+        week_start = (literal(first_week, Date) + offset.c.value * 7).label("week_start")
+        spine = select(week_start).select_from(offset).subquery("weeks")
+
+        rate_sum = func.coalesce(days.c.rate_sum, 0)
+        variance = (func.coalesce(days.c.rate_squares, 0) - rate_sum * rate_sum / 7) / 6
+        return select(
+            spine.c.week_start,
+            case(
+                (totals.c.total_possible > 0, round1(
+                    cast(func.coalesce(days.c.total_completed, 0), Float) / totals.c.total_possible * 100
+                )),
+                else_=0.0
+            ).label("completion_rate"),
+            round1(func.coalesce(weighted.c.weighted_sum, 0)).label("weighted_score"),
+            case(
+                (totals.c.habit_count > 0, round1(func.greatest(0, 100 - variance / 10))),
+                else_=0.0
+            ).label("consistency_score")
+        ).select_from(spine).join(totals, literal(True)).outerjoin(
+            days, days.c.week_start == spine.c.week_start
+        ).outerjoin(
+            weighted, weighted.c.week_start == spine.c.week_start
+        ).subquery("week_scores")
+
+    @staticmethod
+    async def weekly_trends(db: AsyncSession, user_id: UUID, today: date, lookback: int) -> Dict:
+        """Trend of the last `lookback` weeks (TrendData shape)"""
+        if lookback < 1:
+            return TrendEngine._series("weekly", [], [], [], [])
+        first_week, last_week = TrendEngine.weekly_range(today, lookback)
+        weeks = TrendEngine.week_scores(user_id, first_week, last_week)
+        result = await db.execute(select(weeks).order_by(weeks.c.week_start))
+        rows = result.all()
+        return TrendEngine._series(
+            "weekly",
+            [row.week_start.strftime("%b %d") for row in rows],
+            [row.completion_rate for row in rows],
+            [row.weighted_score for row in rows],
+            [row.consistency_score for row in rows]
+        )
+
+    @staticmethod
+    async def monthly_trends(db: AsyncSession, user_id: UUID, today: date, lookback: int) -> Dict:
+        """
+        Trend of the last `lookback` months (TrendData shape): averages of the
+        weeks starting in each month, consistency as 50 + the change from the
+        first to the second half of those weeks
+        """
+        if lookback < 1:
+            return TrendEngine._series("monthly", [], [], [], [])
+        first_week, last_week = TrendEngine.monthly_range(today, lookback)
+        weeks = TrendEngine.week_scores(user_id, first_week, last_week)
+
+        month = cast(func.date_trunc("month", weeks.c.week_start), Date)
+        ranked = select(
+            month.label("month"),
+            weeks.c.completion_rate,
+            weeks.c.weighted_score,
+            weeks.c.consistency_score,
+            func.row_number().over(partition_by=month, order_by=weeks.c.week_start).label("position"),
+            func.count().over(partition_by=month).label("weeks")
+        ).subquery("ranked")
+        first_half = ranked.c.position <= ranked.c.weeks // 2
+        trend = case(
+            (func.max(ranked.c.weeks) > 1,
+             func.avg(ranked.c.consistency_score).filter(~first_half)
+             - func.avg(ranked.c.consistency_score).filter(first_half)),
+            else_=0.0
+        )
+        result = await db.execute(
+            select(
+                ranked.c.month,
+                func.avg(ranked.c.completion_rate).label("completion_rate"),
+                func.avg(ranked.c.weighted_score).label("weighted_score"),
+                (50 + trend).label("consistency_score")
+            ).group_by(ranked.c.month).order_by(ranked.c.month)
+        )
+        rows = result.all()
+        return TrendEngine._series(
+            "monthly",
+            [row.month.strftime("%b %Y") for row in rows],
+            [row.completion_rate for row in rows],
+            [row.weighted_score for row in rows],
+            [row.consistency_score for row in rows]
+        )
+
+    @staticmethod
+    def _series(
+        period: str,
+        labels: List[str],
+        completion_rates: List[float],
+        weighted_scores: List[float],
+        consistency_scores: List[float]
+    ) -> Dict:
+        return {
+            "period": period,
+            "labels": labels,
+            "completion_rates": completion_rates,
+            "weighted_scores": weighted_scores,
+            "consistency_scores": consistency_scores
+        }
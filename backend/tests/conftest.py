@@ -2,14 +2,21 @@
 Pytest fixtures for PPAS backend tests
 """
 import os
+import random
+from datetime import date, timedelta
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
-from database import Base, get_db
+from config import settings
+from middleware.rate_limiter import get_rate_limit_store
+from database import Base, get_db, get_read_db, get_analytics_db
+from models.entry import DailyEntry
+from models.habit import Habit
 from models.user import User
 from services.auth_service import AuthService
 
@@ -20,6 +27,14 @@ TEST_DB_URL = os.getenv(
 )
 
 
+# Responses are built without validation in production; validate them here
+settings.VALIDATE_RESPONSES = True
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Each test starts with full buckets; auth calls would otherwise add up"""
+    get_rate_limit_store().clear()
 
 
 @pytest_asyncio.fixture
@@ -36,6 +51,34 @@ async def test_engine():
     await engine.dispose()
 
 
+class QueryCounter:
+    """Records the SQL statements sent through an engine while the block runs"""
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries(test_engine):
+    """`with count_queries() as queries:` ... `queries.count`"""
+    return lambda: QueryCounter(test_engine)
+
+
 @pytest_asyncio.fixture
 async def db_session(test_engine):
     """Create a new session for each test, rolled back after test"""
@@ -56,6 +99,8 @@ async def client(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_analytics_db] = override_get_db
     async with AsyncClient(
         transport=ASGITransport(app=app),
         base_url="http://test"
@@ -84,3 +129,40 @@ async def auth_headers(test_user, db_session):
     """Get auth headers for test user"""
     access_token = AuthService.create_access_token(test_user.id)
     return {"Authorization": f"Bearer {access_token}"}
+
+
+@pytest.fixture
+def seed_history(db_session):
+    """
+    Add habits with a random history:
+    `habits, done = await seed_history(user_id, [dict(name="Run", ...)], days=120, rate=0.6, seed=1)`
+    completes each habit on each of the `days` days up to `end` (today) with
+    chance `rate`, optionally recording a missed day with chance `missed`;
+    `keep(i, day)` can rule days out for the i-th habit. `done` maps habit
+    ids to their completed days.
+    """
+    async def seed(user_id, habits: list, days: int = 0, rate: float = 0.5, seed: int = 0,
+                   end: date = None, missed: float = 0.0, keep=None) -> tuple[list, dict]:
+        rng = random.Random(seed)
+        habits = [Habit(user_id=user_id, **columns) for columns in habits]
+        db_session.add_all(habits)
+        await db_session.flush()
+        end = end or date.today()
+        done = {habit.id: set() for habit in habits}
+        entries = []
+        for i, habit in enumerate(habits):
+            for day in (end - timedelta(days=d) for d in range(days)):
+                if keep is not None and not keep(i, day):
+                    continue
+                completed = rng.random() < rate
+                if completed:
+                    done[habit.id].add(day)
+                if completed or rng.random() < missed:
+                    entries.append(
+                        DailyEntry(user_id=user_id, habit_id=habit.id, entry_date=day, completed=completed)
+                    )
+        db_session.add_all(entries)
+        await db_session.flush()
+        return habits, done
+
+    return seed
@@ -0,0 +1,103 @@
+"""
+Aggregator upsert tests
+"""
+from datetime import date, datetime, timezone
+import pytest
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import upgrade_schema
+from models.user import User
+from models.score import WeeklyScore, MonthlyScore
+from services.aggregator import Aggregator
+from services.auth_service import AuthService
+
+
+def _weekly_row(user_id, week_start: date, rate: float) -> dict:
+    return {
+        "user_id": user_id,
+        "week_start": week_start,
+        "completion_rate": rate,
+        "weighted_score": rate,
+        "consistency_score": 100.0,
+        "total_completed": 0,
+        "total_possible": 0,
+        "habit_breakdown": [],
+        "insights": []
+    }
+
+
+@pytest.mark.asyncio
+async def test_weekly_report_upserts_single_row(db_session: AsyncSession, test_user):
+    """Regenerating a week updates the existing row instead of duplicating it"""
+    week_start = date(2024, 1, 1)
+    first = await Aggregator.generate_weekly_report(db_session, test_user.id, week_start)
+    second = await Aggregator.generate_weekly_report(db_session, test_user.id, week_start)
+    assert first.id == second.id
+
+    count = await db_session.execute(
+        select(func.count()).select_from(WeeklyScore).where(WeeklyScore.user_id == test_user.id)
+    )
+    assert count.scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_many_users(db_session: AsyncSession, test_user):
+    """One statement writes and then updates rows for several users"""
+    other = User(
+        email="other@example.com",
+        password_hash=AuthService.hash_password("password123"),
+        name="Other User"
+    )
+    db_session.add(other)
+    await db_session.flush()
+
+    week_start = date(2024, 1, 8)
+    rows = [_weekly_row(test_user.id, week_start, 10.0), _weekly_row(other.id, week_start, 20.0)]
+    created = await Aggregator.upsert_weekly_scores(db_session, rows)
+    assert len(created) == 2
+
+    rows = [_weekly_row(test_user.id, week_start, 55.0), _weekly_row(other.id, week_start, 65.0)]
+    updated = await Aggregator.upsert_weekly_scores(db_session, rows)
+    assert {s.id for s in updated} == {s.id for s in created}
+    assert sorted(s.completion_rate for s in updated) == [55.0, 65.0]
+
+
+@pytest.mark.asyncio
+async def test_monthly_report_upserts_single_row(db_session: AsyncSession, test_user):
+    """Monthly reports are unique per user, year and month"""
+    first = await Aggregator.generate_monthly_report(db_session, test_user.id, 2024, 2)
+    second = await Aggregator.generate_monthly_report(db_session, test_user.id, 2024, 2)
+    assert first.id == second.id
+
+    count = await db_session.execute(
+        select(func.count()).select_from(MonthlyScore).where(MonthlyScore.user_id == test_user.id)
+    )
+    assert count.scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_upgrade_dedupes_and_adds_unique_constraint(db_session: AsyncSession, test_user):
+    """Tables from before the unique constraint get it at startup, keeping the newest row"""
+    conn = await db_session.connection()
+    await conn.execute(text("ALTER TABLE weekly_scores DROP CONSTRAINT unique_user_week"))
+    week_start = date(2024, 2, 5)
+    for day, rate in ((1, 10.0), (3, 30.0), (2, 20.0)):
+        db_session.add(WeeklyScore(
+            **_weekly_row(test_user.id, week_start, rate),
+            calculated_at=datetime(2024, 2, day, tzinfo=timezone.utc)
+        ))
+    await db_session.flush()
+
+    await upgrade_schema(conn)
+    await upgrade_schema(conn)
+    kept = await db_session.execute(
+        select(WeeklyScore.completion_rate).where(WeeklyScore.user_id == test_user.id)
+    )
+    assert kept.scalars().all() == [30.0]
+    rows = await Aggregator.upsert_weekly_scores(db_session, [_weekly_row(test_user.id, week_start, 55.0)])
+    assert len(rows) == 1
+    count = await db_session.execute(
+        select(func.count()).select_from(WeeklyScore).where(WeeklyScore.user_id == test_user.id)
+    )
+    assert count.scalar() == 1
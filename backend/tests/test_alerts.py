@@ -0,0 +1,102 @@
+"""
+Alert tests - threshold crossings from entry writes and outbox draining
+"""
+import json
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.alert import AlertOutbox
+from models.habit import Habit
+from services.alerts import Alerts, AlertSink, FileSink
+from services.rollups import Rollups
+from services.score_engine import ScoreEngine
+
+MONDAY = date(2025, 6, 2)
+
+
+class FailingSink(AlertSink):
+    async def send(self, alerts):
+        raise ConnectionError("sink down")
+
+
+async def _habit(db: AsyncSession, user_id) -> Habit:
+    habit = Habit(user_id=user_id, name="Run", target_per_week=3, goal_threshold=60)
+    db.add(habit)
+    await db.flush()
+    return habit
+
+
+async def _write(db: AsyncSession, user_id, habit_id, day: date, completed: bool):
+    delta = await Rollups.apply(db, user_id, habit_id, day, completed)
+    await Alerts.apply(db, habit_id, day, delta)
+
+
+async def _outbox(db: AsyncSession) -> list:
+    result = await db.execute(
+        select(AlertOutbox.week_start, AlertOutbox.kind, AlertOutbox.completion_rate).order_by(AlertOutbox.id)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+@pytest.mark.asyncio
+async def test_only_crossings_are_queued(db_session: AsyncSession, test_user):
+    habit = await _habit(db_session, test_user.id)
+    for days, completed in [(0, True), (1, True), (1, True), (2, True), (1, False), (0, False)]:
+        await _write(db_session, test_user.id, habit.id, MONDAY + timedelta(days=days), completed)
+    # A completion the week before does not count towards this week
+    await _write(db_session, test_user.id, habit.id, MONDAY - timedelta(days=1), True)
+
+    assert await _outbox(db_session) == [(MONDAY, "met", 66.7), (MONDAY, "below", 33.3)]
+
+
+@pytest.mark.asyncio
+async def test_alert_shares_the_write_transaction(db_session: AsyncSession, test_user):
+    habit = await _habit(db_session, test_user.id)
+    await _write(db_session, test_user.id, habit.id, MONDAY, True)
+    savepoint = await db_session.begin_nested()
+    await _write(db_session, test_user.id, habit.id, MONDAY + timedelta(days=1), True)
+    assert len(await _outbox(db_session)) == 1
+    await savepoint.rollback()
+    assert await _outbox(db_session) == []
+
+
+@pytest.mark.asyncio
+async def test_entry_endpoint_queues_alert(client: AsyncClient, auth_headers, db_session: AsyncSession, test_user):
+    habit = await _habit(db_session, test_user.id)
+    habit.target_per_week = 1
+    await db_session.flush()
+    today = date.today()
+    resp = await client.post("/api/entries", json={
+        "habit_id": str(habit.id), "entry_date": today.isoformat(), "completed": True
+    }, headers=auth_headers)
+    assert resp.status_code < 400
+    assert await _outbox(db_session) == [(ScoreEngine.get_week_bounds(today)[0], "met", 100.0)]
+
+
+@pytest.mark.asyncio
+async def test_drain_in_batches_to_file(db_session: AsyncSession, test_user, tmp_path):
+    habit = await _habit(db_session, test_user.id)
+    for weeks in range(3):
+        for days in (0, 1):
+            await _write(db_session, test_user.id, habit.id, MONDAY + timedelta(weeks=weeks, days=days), True)
+    sink = FileSink(str(tmp_path / "alerts" / "alerts.jsonl"))
+
+    savepoint = await db_session.begin_nested()
+    with pytest.raises(ConnectionError):
+        await Alerts.drain(db_session, FailingSink(), batch_size=2)
+    await savepoint.rollback()
+    assert len(await _outbox(db_session)) == 3
+
+    assert await Alerts.drain(db_session, sink, batch_size=2) == 2
+    assert await Alerts.drain(db_session, sink, batch_size=2) == 1
+    assert await Alerts.drain(db_session, sink, batch_size=2) == 0
+    assert await _outbox(db_session) == []
+
+    lines = (tmp_path / "alerts" / "alerts.jsonl").read_text().splitlines()
+    alerts = [json.loads(line) for line in lines]
+    assert [a["week_start"] for a in alerts] == [(MONDAY + timedelta(weeks=w)).isoformat() for w in range(3)]
+    assert alerts[0]["habit_id"] == str(habit.id) and alerts[0]["kind"] == "met"
+    assert alerts[0]["goal_threshold"] == 60
@@ -0,0 +1,142 @@
+"""
+Analytics API tests
+"""
+from datetime import date
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, func, text
+
+from models.habit import Habit
+from models.entry import DailyEntry
+from models.score import MonthlyScore
+from config import settings
+from database import upgrade_schema
+
+
+async def _seed_today(db_session, user_id) -> Habit:
+    habit = Habit(user_id=user_id, name="Read", target_per_week=7)
+    db_session.add(habit)
+    await db_session.flush()
+    db_session.add(DailyEntry(
+        user_id=user_id, habit_id=habit.id, entry_date=date.today(), completed=True
+    ))
+    await db_session.flush()
+    return habit
+
+
+@pytest.mark.asyncio
+async def test_today_stats(client: AsyncClient, auth_headers, test_user, db_session):
+    """GET /analytics/today counts today's completions and streak"""
+    await _seed_today(db_session, test_user.id)
+
+    resp = await client.get("/api/analytics/today", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["completed"] == 1
+    assert data["total"] == 1
+    assert data["streak_days"] == 1
+    assert resp.headers["server-timing"].startswith("db;dur=")
+
+
+@pytest.mark.asyncio
+async def test_week_analytics(client: AsyncClient, auth_headers, test_user, db_session):
+    """GET /analytics/week returns the per-habit breakdown"""
+    await _seed_today(db_session, test_user.id)
+
+    resp = await client.get("/api/analytics/week", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total_completed"] == 1
+    assert len(data["habit_breakdown"]) == 1
+    assert len(data["daily_rates"]) == 7
+
+
+@pytest.mark.asyncio
+async def test_month_analytics_does_not_write(client: AsyncClient, auth_headers, test_user, db_session):
+    """GET /analytics/month is computed without storing a report"""
+    await _seed_today(db_session, test_user.id)
+
+    resp = await client.get("/api/analytics/month", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["month"] == date.today().month
+
+    stored = await db_session.execute(select(func.count()).select_from(MonthlyScore))
+    assert stored.scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_week_etag_not_modified_until_write(client: AsyncClient, auth_headers, test_user, db_session):
+    """A matching If-None-Match gets 304 until an entry write bumps the data version"""
+    habit = await _seed_today(db_session, test_user.id)
+
+    resp = await client.get("/api/analytics/week", headers=auth_headers)
+    etag = resp.headers["etag"]
+    assert resp.headers["cache-control"] == "private, no-cache"
+
+    cached = await client.get("/api/analytics/week", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    write = await client.post("/api/entries", headers=auth_headers, json={
+        "habit_id": str(habit.id), "entry_date": date.today().isoformat(), "completed": False
+    })
+    assert write.status_code == 201
+
+    fresh = await client.get("/api/analytics/week", headers={**auth_headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_closed_week_is_cacheable(client: AsyncClient, auth_headers, test_user):
+    """Weeks that have ended get a long-lived Cache-Control"""
+    resp = await client.get("/api/analytics/week/2024-01-01", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"].startswith("private, max-age=")
+
+
+@pytest.mark.asyncio
+async def test_trusted_responses_match_validated(client: AsyncClient, auth_headers, test_user, db_session, monkeypatch):
+    """Skipping response validation produces the same JSON as validating it"""
+    await _seed_today(db_session, test_user.id)
+    paths = ["/api/analytics/week", "/api/analytics/month", "/api/entries/today"]
+
+    validated = [(await client.get(p, headers=auth_headers)).json() for p in paths]
+    monkeypatch.setattr(settings, "VALIDATE_RESPONSES", False)
+    trusted = [(await client.get(p, headers=auth_headers)).json() for p in paths]
+
+    assert trusted == validated
+
+
+@pytest.mark.asyncio
+async def test_dashboard_matches_individual_endpoints(client: AsyncClient, auth_headers, test_user, db_session):
+    """GET /analytics/dashboard returns the same views as the four separate calls"""
+    await _seed_today(db_session, test_user.id)
+
+    resp = await client.get("/api/analytics/dashboard", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+
+    for key, path in [
+        ("today", "/api/analytics/today"),
+        ("week", "/api/analytics/week"),
+        ("trends", "/api/analytics/trends"),
+        ("entries", "/api/entries/today"),
+    ]:
+        assert data[key] == (await client.get(path, headers=auth_headers)).json(), key
+
+    for lookback in (0, 261, 100000):
+        resp = await client.get(f"/api/analytics/dashboard?lookback={lookback}", headers=auth_headers)
+        assert resp.status_code == 422, lookback
+
+
+@pytest.mark.asyncio
+async def test_upgrade_adds_data_version(client: AsyncClient, auth_headers, db_session):
+    """A users table from before ETags gets data_version at startup"""
+    conn = await db_session.connection()
+    await conn.execute(text("ALTER TABLE users DROP COLUMN data_version"))
+    await upgrade_schema(conn)
+    db_session.expire_all()
+    resp = await client.get("/api/analytics/week", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["etag"]
@@ -0,0 +1,103 @@
+"""
+Calendar profile tests - grouped weekday/month rates against a day-by-day count
+"""
+import random
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.calendar_profile import CalendarProfile, occurrences
+
+
+HABITS = [
+    dict(name="Run", weight=3, display_order=0),
+    dict(name="Read", weight=5, display_order=1),
+    dict(name="Old", weight=4, is_active=False),
+]
+HISTORY = [500, 200, 300]  # Read started later
+
+
+def _keep(i: int, day: date) -> bool:
+    # Run is skipped on Sundays
+    return (date.today() - day).days < HISTORY[i] and not (i == 0 and day.weekday() == 6)
+
+
+def _expected(done: dict, habits: list, bucket) -> dict:
+    today = date.today()
+    totals = {}
+    for habit in habits:
+        days = done[habit.id]
+        day = min(days)
+        while day <= today:
+            completed, possible = totals.get((habit.id, bucket(day)), (0, 0))
+            totals[(habit.id, bucket(day))] = (completed + (day in days), possible + 1)
+            day += timedelta(days=1)
+    return totals
+
+
+def test_occurrences_match_day_by_day_count():
+    rng = random.Random(5)
+    for _ in range(50):
+        start = date(rng.randint(1, 2100), rng.randint(1, 12), rng.randint(1, 28))
+        end = start + timedelta(days=rng.randint(0, 800))
+        expected = [[0] * 12 for _ in range(7)]
+        day = start
+        while day <= end:
+            expected[day.weekday()][day.month - 1] += 1
+            day += timedelta(days=1)
+        assert occurrences(start, end).tolist() == expected
+    # Two millennia cost a few thousand month spans, not a day matrix
+    assert occurrences(date(1, 1, 1), date(2025, 12, 31)).sum() == (date(2025, 12, 31) - date(1, 1, 1)).days + 1
+
+
+@pytest.mark.asyncio
+async def test_weekday_profile_matches_day_by_day_count(db_session: AsyncSession, test_user, seed_history):
+    habits, done = await seed_history(test_user.id, HABITS, days=500, rate=0.6, seed=4, keep=_keep)
+    active = habits[:2]
+    profile = await CalendarProfile.weekday_profile(db_session, test_user, date.today())
+    totals = _expected(done, active, lambda d: d.weekday())
+
+    assert profile["days"][0] == "Monday"
+    assert profile["start"] == min(done[active[0].id])
+    for i, habit in enumerate(active):
+        for weekday in range(7):
+            completed, possible = totals[(habit.id, weekday)]
+            assert profile["habits"][i]["completion_rates"][weekday] == round(completed / possible * 100, 1)
+    assert profile["habits"][0]["completion_rates"][6] == 0.0
+    assert profile["habits"][0]["weakest_day"] == "Sunday"
+    for weekday in range(7):
+        completed = sum(totals[(h.id, weekday)][0] * h.weight for h in active)
+        possible = sum(totals[(h.id, weekday)][1] * h.weight for h in active)
+        assert profile["weighted_scores"][weekday] == round(completed / possible * 100, 1)
+
+
+@pytest.mark.asyncio
+async def test_seasonality_matches_day_by_day_count(db_session: AsyncSession, test_user, seed_history):
+    habits, done = await seed_history(test_user.id, HABITS, days=500, rate=0.6, seed=4, keep=_keep)
+    active = habits[:2]
+    seasonality = await CalendarProfile.seasonality(db_session, test_user, date.today())
+    totals = _expected(done, active, lambda d: d.month)
+
+    for month in range(1, 13):
+        cells = [totals.get((h.id, month)) for h in active]
+        known = [cell for cell in cells if cell]
+        expected = round(sum(c for c, _ in known) / sum(p for _, p in known) * 100, 1) if known else None
+        assert seasonality["completion_rates"][month - 1] == expected
+        # Read's 200 days leave some months without a single possible day
+        read = seasonality["habits"][1]["completion_rates"][month - 1]
+        if cells[1] is None:
+            assert read is None
+        else:
+            assert read == round(cells[1][0] / cells[1][1] * 100, 1)
+
+
+@pytest.mark.asyncio
+async def test_profile_endpoints(client: AsyncClient, auth_headers, db_session: AsyncSession, test_user, seed_history):
+    await seed_history(test_user.id, HABITS, days=500, rate=0.6, seed=4, keep=_keep)
+    resp = await client.get("/api/analytics/weekday-profile", headers=auth_headers)
+    assert resp.status_code == 200
+    assert len(resp.json()["completion_rates"]) == 7
+    resp = await client.get("/api/analytics/seasonality", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["months"][0] == "January"
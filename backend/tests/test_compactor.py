@@ -0,0 +1,135 @@
+"""
+History compaction tests
+"""
+from datetime import date
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.habit import Habit
+from models.entry import DailyEntry
+from models.bitmap import HabitMonthBitmap
+from models.rollup import HabitRollup
+from services.compactor import Compactor
+from services.entry_store import EntryStore
+from services.rollups import Rollups
+from services.score_engine import ScoreEngine
+
+
+async def _seed_march(db_session: AsyncSession, user_id) -> Habit:
+    habit = Habit(user_id=user_id, name="Read", target_per_week=7)
+    db_session.add(habit)
+    await db_session.flush()
+    db_session.add_all([
+        DailyEntry(user_id=user_id, habit_id=habit.id, entry_date=date(2019, 3, 4), completed=True),
+        DailyEntry(user_id=user_id, habit_id=habit.id, entry_date=date(2019, 3, 5), completed=True,
+                   notes="chapter 3"),
+        DailyEntry(user_id=user_id, habit_id=habit.id, entry_date=date(2019, 3, 6), completed=False,
+                   notes="too tired"),
+    ])
+    await db_session.flush()
+    return habit
+
+
+@pytest.mark.asyncio
+async def test_compact_month_folds_entries(db_session: AsyncSession, test_user):
+    """A month of entries becomes one bitmap row and leaves daily_entries"""
+    habit = await _seed_march(db_session, test_user.id)
+
+    conn = await db_session.connection()
+    assert await Compactor.compact_month(conn, date(2019, 3, 1)) == 1
+
+    bitmap = (await db_session.execute(
+        select(HabitMonthBitmap).where(HabitMonthBitmap.habit_id == habit.id)
+    )).scalar_one()
+    assert bitmap.month_start == date(2019, 3, 1)
+    assert bitmap.bitmap == (1 << 3) | (1 << 4)
+    assert bitmap.notes == {"5": "chapter 3", "6": "too tired"}
+
+    remaining = await db_session.execute(
+        select(func.count()).select_from(DailyEntry).where(DailyEntry.habit_id == habit.id)
+    )
+    assert remaining.scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_scores_read_compacted_history(db_session: AsyncSession, test_user):
+    """Weekly scoring sees the same completions before and after compaction"""
+    await _seed_march(db_session, test_user.id)
+    week_start = date(2019, 3, 4)
+    before = await ScoreEngine.calculate_weekly_score(db_session, test_user.id, week_start)
+
+    conn = await db_session.connection()
+    await Compactor.compact_month(conn, date(2019, 3, 1))
+    after = await ScoreEngine.calculate_weekly_score(db_session, test_user.id, week_start)
+
+    assert after["total_completed"] == before["total_completed"] == 2
+    assert after["daily_rates"] == before["daily_rates"]
+
+
+@pytest.mark.asyncio
+async def test_live_entry_overrides_compacted_day(
+    client: AsyncClient, auth_headers, db_session: AsyncSession, test_user
+):
+    """A write into a compacted month wins over the folded bit, and refolds cleanly"""
+    habit = await _seed_march(db_session, test_user.id)
+    conn = await db_session.connection()
+    await Compactor.compact_month(conn, date(2019, 3, 1))
+
+    resp = await client.get("/api/entries/date/2019-03-05", headers=auth_headers)
+    status = resp.json()["habits"][0]
+    assert status["completed"] is True
+    assert status["notes"] == "chapter 3"
+    assert status["entry_id"] is None
+
+    db_session.add(DailyEntry(
+        user_id=test_user.id, habit_id=habit.id, entry_date=date(2019, 3, 5), completed=False
+    ))
+    await db_session.flush()
+    resp = await client.get("/api/entries/date/2019-03-05", headers=auth_headers)
+    assert resp.json()["habits"][0]["completed"] is False
+
+    await Compactor.compact_month(conn, date(2019, 3, 1))
+    bitmap = (await db_session.execute(
+        select(HabitMonthBitmap).where(HabitMonthBitmap.habit_id == habit.id)
+    )).scalar_one()
+    await db_session.refresh(bitmap)
+    assert bitmap.bitmap == 1 << 3
+    # The live row had no note, so the refold drops the old one
+    assert bitmap.notes == {"6": "too tired"}
+
+
+@pytest.mark.asyncio
+async def test_deleting_live_row_restores_compacted_day(
+    client: AsyncClient, auth_headers, db_session: AsyncSession, test_user
+):
+    """Derived data follows the compacted bit that shows again once the live row is gone"""
+    habit = await _seed_march(db_session, test_user.id)
+    conn = await db_session.connection()
+    await Compactor.compact_month(conn, date(2019, 3, 1))
+    await Rollups.rebuild(db_session, test_user.id)
+
+    resp = await client.post("/api/entries", json={
+        "habit_id": str(habit.id), "entry_date": "2019-03-05", "completed": False
+    }, headers=auth_headers)
+    resp = await client.delete(
+        f"/api/entries/{resp.json()['id']}?entry_date=2019-03-05", headers=auth_headers
+    )
+    assert resp.status_code == 204
+
+    completed = await EntryStore.get_completed(db_session, test_user.id, date(2019, 3, 1), date(2019, 3, 31))
+    assert sorted(e.entry_date.day for e in completed) == [4, 5]
+
+    async def rollups():
+        result = await db_session.execute(
+            select(HabitRollup.day, HabitRollup.completed_total)
+            .where(HabitRollup.habit_id == habit.id)
+            .order_by(HabitRollup.day)
+        )
+        return [tuple(row) for row in result.all()]
+
+    incremental = await rollups()
+    await Rollups.rebuild(db_session, test_user.id)
+    assert incremental[-1] == (date(2019, 3, 5), 2)
+    assert incremental[-1] == (await rollups())[-1]
@@ -0,0 +1,45 @@
+"""
+Response compression and fast JSON tests
+"""
+import pytest
+from httpx import AsyncClient
+
+from middleware.compression import negotiate_encoding
+
+
+def test_negotiate_encoding():
+    """Brotli wins when offered; q=0 refuses an encoding"""
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+    assert negotiate_encoding("identity") is None
+
+
+@pytest.mark.asyncio
+async def test_large_response_is_compressed(client: AsyncClient, auth_headers):
+    """Trends over a year exceed the threshold and go out gzipped with a weak ETag"""
+    headers = {**auth_headers, "Accept-Encoding": "gzip"}
+    resp = await client.get("/api/analytics/trends?lookback=52", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in resp.headers["vary"].lower()
+    assert len(resp.json()["labels"]) == 52
+
+    etag = resp.headers["etag"]
+    assert etag.startswith("W/")
+    cached = await client.get(
+        "/api/analytics/trends?lookback=52",
+        headers={**headers, "If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_small_response_is_not_compressed(client: AsyncClient, auth_headers):
+    """Bodies under the threshold are sent as-is"""
+    resp = await client.get(
+        "/api/analytics/today",
+        headers={**auth_headers, "Accept-Encoding": "gzip"}
+    )
+    assert resp.status_code == 200
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["content-type"] == "application/json"
@@ -0,0 +1,112 @@
+"""
+Correlation tests - vectorized coefficients against a direct count
+"""
+import math
+import random
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.entry import DailyEntry
+from models.habit import Habit
+from services.correlations import Correlations, LOOKBACK_DAYS
+
+Completed = namedtuple("Completed", "habit_id entry_date")
+
+
+def _phi(a: list, b: list):
+    n11 = sum(x and y for x, y in zip(a, b))
+    n10 = sum(x and not y for x, y in zip(a, b))
+    n01 = sum(y and not x for x, y in zip(a, b))
+    n00 = len(a) - n11 - n10 - n01
+    spread = (n11 + n10) * (n01 + n00) * (n11 + n01) * (n10 + n00)
+    return (n11 * n00 - n10 * n01) / math.sqrt(spread) if spread else None
+
+
+def test_coefficients_match_direct_counts():
+    rng = random.Random(2)
+    rows = [[rng.random() < p for _ in range(120)] for p in (0.2, 0.5, 0.8)]
+    rows.append([not x for x in rows[1]])  # perfectly crowded out by row 1
+    rows.append([False] * 120)  # never completed
+    coefficients = Correlations.coefficients(np.array(rows))
+
+    for i, a in enumerate(rows):
+        for j, b in enumerate(rows):
+            expected = _phi(a, b)
+            if expected is None:
+                assert np.isnan(coefficients["phi"][i, j])
+            else:
+                assert coefficients["phi"][i, j] == pytest.approx(expected)
+            union = sum(x or y for x, y in zip(a, b))
+            together = sum(x and y for x, y in zip(a, b))
+            assert coefficients["together"][i, j] == together
+            assert coefficients["jaccard"][i, j] == pytest.approx(together / union if union else 0.0)
+    assert coefficients["phi"][1, 3] == pytest.approx(-1.0)
+
+
+def test_fifty_habits_over_three_years_is_fast():
+    rng = np.random.default_rng(0)
+    today = date.today()
+    start = today - timedelta(days=3 * 365)
+    habits = [Habit(id=uuid.uuid4(), name=f"Habit {i}", is_physical=i % 5 == 0) for i in range(50)]
+    done = rng.random((50, 3 * 365 + 1)) < 0.6
+    entries = [
+        Completed(habits[i].id, start + timedelta(days=int(d))) for i, d in zip(*np.nonzero(done))
+    ]
+
+    started = time.perf_counter()
+    matrix = Correlations.completion_matrix(habits, entries, start, today)
+    content = Correlations.summarize(habits, matrix, start, today)
+    elapsed = time.perf_counter() - started
+
+    assert (matrix == done).all()
+    assert len(content["phi"]) == 50 and content["days"] == 3 * 365 + 1
+    assert elapsed < 0.1
+
+
+@pytest.mark.asyncio
+async def test_correlations_endpoint(
+    client: AsyncClient, auth_headers, db_session: AsyncSession, test_user, seed_history
+):
+    today = date.today()
+    # Run and Read share their days; Gym takes the others
+    habits, _ = await seed_history(test_user.id, [
+        dict(name="Run", is_physical=True, display_order=0),
+        dict(name="Gym", is_physical=True, display_order=1),
+        dict(name="Read", display_order=2),
+    ], days=30, rate=1.0, keep=lambda i, day: ((today - day).days % 3 == 0) == (i == 1))
+
+    resp = await client.get("/api/analytics/correlations", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [h["habit_name"] for h in data["habits"]] == ["Run", "Gym", "Read"]
+    assert data["days"] == 30
+    assert data["phi"][0][2] == 1.0
+    assert data["phi"][0][1] == -1.0
+    assert data["strongest_pairs"][0]["habit_a"] == str(habits[0].id)
+    assert data["strongest_pairs"][0]["habit_b"] == str(habits[2].id)
+    assert {p["phi"] for p in data["weakest_pairs"]} == {-1.0}
+
+
+@pytest.mark.asyncio
+async def test_ancient_entry_does_not_widen_the_matrix(
+    client: AsyncClient, auth_headers, db_session: AsyncSession, test_user
+):
+    habit = Habit(user_id=test_user.id, name="Run")
+    db_session.add(habit)
+    await db_session.flush()
+    db_session.add_all([
+        DailyEntry(user_id=test_user.id, habit_id=habit.id, entry_date=day, completed=True)
+        for day in (date(1, 1, 1), date.today() - timedelta(days=LOOKBACK_DAYS - 1))
+    ])
+    await db_session.flush()
+
+    resp = await client.get("/api/analytics/correlations", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["days"] == LOOKBACK_DAYS
+    assert resp.json()["habits"][0]["completed_days"] == 1
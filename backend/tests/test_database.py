@@ -0,0 +1,47 @@
+"""
+Database session tests - the read-only dependencies behind GET endpoints
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database
+from database import get_analytics_db, get_read_db
+from tests.conftest import TEST_DB_URL
+
+
+async def _settings(session: AsyncSession) -> tuple:
+    result = await session.execute(text(
+        "SELECT current_setting('transaction_read_only'), current_setting('transaction_isolation'),"
+        " current_setting('transaction_deferrable'), pg_backend_pid()"
+    ))
+    return tuple(result.one())
+
+
+@pytest.mark.asyncio
+async def test_read_only_sessions(monkeypatch):
+    # One pooled connection, so every session below checks out the same one
+    engine = create_async_engine(TEST_DB_URL, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(database, "_session_factory", async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    ))
+    try:
+        for dependency, expected in (
+            (get_read_db, ("on", "read committed", "off")),
+            (get_analytics_db, ("on", "serializable", "on")),
+        ):
+            sessions = dependency()
+            session = await anext(sessions)
+            *options, pid = await _settings(session)
+            assert tuple(options) == expected, dependency.__name__
+            with pytest.raises(DBAPIError, match="read-only transaction"):
+                await session.execute(text("CREATE TEMPORARY TABLE scratch (id int)"))
+            await sessions.aclose()
+
+            # Back in the pool, the connection is an ordinary read-write one again
+            async for session in database.get_db():
+                assert await _settings(session) == ("off", "read committed", "off", pid)
+                await session.execute(text("CREATE TEMPORARY TABLE scratch (id int) ON COMMIT DROP"))
+    finally:
+        await engine.dispose()
@@ -0,0 +1,128 @@
+"""
+Explainer tests - insight rules, period bounds and two-period comparisons
+"""
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.entry import DailyEntry
+from models.habit import Habit
+from services.explainer import Explainer
+from services.range_engine import RangeEngine
+
+
+def _score(rate: float, consistency: float, habits: list) -> dict:
+    return {
+        "completion_rate": rate,
+        "consistency_score": consistency,
+        "habit_breakdown": [
+            {
+                "habit_id": habit_id,
+                "habit_name": name,
+                "completion_rate": habit_rate,
+                "weight": 5,
+                "weighted_contribution": habit_rate / 2,
+                "is_below_threshold": habit_rate < 80,
+            }
+            for habit_id, name, habit_rate in habits
+        ],
+    }
+
+
+def test_compare_ranks_insights_by_impact():
+    previous = _score(60, 80, [("a", "Run", 90), ("b", "Read", 30)])
+    current = _score(70, 60, [("a", "Run", 50), ("b", "Read", 100), ("c", "Write", 40)])
+
+    insights = Explainer.compare(current, previous, "month")
+    assert [i["icon"] for i in insights] == ["🆕", "📈", "🔔", "🚀", "⚠️"]
+    assert insights[0]["message"] == "New habit 'Write' added"
+    assert insights[2]["message"] == "'Run' is now below your 80% goal"
+    assert insights[4]["impact"] == pytest.approx(-2)
+
+    insights = Explainer.compare(_score(60, 50, []), previous, "month")
+    assert insights == [{
+        "icon": "📊", "message": "Your habit completion was less consistent this month", "impact": -3.0
+    }]
+    assert Explainer.compare(current, _score(0, 0, []), "quarter")[0]["message"] == (
+        "First quarter of tracking! Keep building your habits."
+    )
+
+
+def test_period_bounds():
+    anchor = date(2025, 11, 19)
+    assert Explainer.period_bounds("week", anchor) == (date(2025, 11, 17), date(2025, 11, 23))
+    assert Explainer.period_bounds("month", anchor) == (date(2025, 11, 1), date(2025, 11, 30))
+    quarter = Explainer.period_bounds("quarter", anchor)
+    assert quarter == (date(2025, 10, 1), date(2025, 12, 31))
+    assert Explainer.previous_period("quarter", quarter) == (date(2025, 7, 1), date(2025, 9, 30))
+    assert Explainer.previous_period("month", (date(2025, 1, 1), date(2025, 1, 31))) == (
+        date(2024, 12, 1), date(2024, 12, 31)
+    )
+    assert Explainer.previous_period("custom", (date(2025, 3, 1), date(2025, 3, 10))) == (
+        date(2025, 2, 19), date(2025, 2, 28)
+    )
+
+
+@pytest.mark.asyncio
+async def test_explain_uses_two_queries(db_session: AsyncSession, test_user, count_queries):
+    run = Habit(user_id=test_user.id, name="Run", target_per_week=7, display_order=0)
+    read = Habit(user_id=test_user.id, name="Read", target_per_week=7, display_order=1)
+    db_session.add_all([run, read])
+    await db_session.flush()
+    start = date(2025, 1, 1)
+    db_session.add_all([
+        DailyEntry(user_id=test_user.id, habit_id=habit.id, entry_date=start + timedelta(days=day), completed=True)
+        for day in range(180)
+        for habit in (run, read)
+        if habit is run or day >= 90
+    ])
+    await db_session.flush()
+
+    for period in ("month", "quarter"):
+        current = Explainer.period_bounds(period, date(2025, 4, 15))
+        previous = Explainer.previous_period(period, current)
+        with count_queries() as queries:
+            result = await Explainer.explain(db_session, test_user.id, previous, current, period)
+        assert queries.count == 2
+        assert result["current"] == await RangeEngine.score_range(db_session, test_user.id, *current)
+        assert result["previous"] == await RangeEngine.score_range(db_session, test_user.id, *previous)
+        assert any(i["message"].startswith("'Read' improved from 0% to") for i in result["insights"])
+
+
+@pytest.mark.asyncio
+async def test_compare_endpoint(client: AsyncClient, auth_headers, db_session: AsyncSession, test_user):
+    habit = Habit(user_id=test_user.id, name="Run", target_per_week=7)
+    db_session.add(habit)
+    await db_session.flush()
+    today = date.today()
+    db_session.add_all([
+        DailyEntry(user_id=test_user.id, habit_id=habit.id, entry_date=today - timedelta(days=day), completed=True)
+        for day in range(5)
+    ])
+    await db_session.flush()
+
+    resp = await client.get(
+        f"/api/analytics/compare?period=custom&start={(today - timedelta(days=4)).isoformat()}"
+        f"&end={today.isoformat()}",
+        headers=auth_headers
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["previous"]["end"] == (today - timedelta(days=5)).isoformat()
+    assert body["current"]["total_completed"] == 5
+    assert body["insights"][0]["icon"] == "📈"
+
+    resp = await client.get("/api/analytics/compare?period=quarter", headers=auth_headers)
+    assert resp.status_code == 200
+    resp = await client.get("/api/analytics/compare?period=year", headers=auth_headers)
+    assert resp.status_code == 400
+    resp = await client.get("/api/analytics/compare?period=custom", headers=auth_headers)
+    assert resp.status_code == 400
+    for query in (
+        "period=custom&start=0001-01-01&end=0001-01-05",
+        "period=month&date=9999-12-05",
+        "period=week&date=9999-12-31",
+    ):
+        resp = await client.get(f"/api/analytics/compare?{query}", headers=auth_headers)
+        assert resp.status_code == 400, query
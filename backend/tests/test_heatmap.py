@@ -0,0 +1,98 @@
+"""
+Heatmap tests - cached year calendars against score_day
+"""
+from datetime import date, timedelta
+from types import SimpleNamespace
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.heatmap import HeatmapYear
+from models.user import User
+from services.data_version import DataVersion
+from services.entry_store import EntryStore
+from services.heatmap import Heatmap
+from services.score_engine import ScoreEngine
+
+
+HABITS = [
+    dict(name="Run", weight=3, target_per_week=3),
+    dict(name="Read", weight=5, target_per_week=7),
+    dict(name="Old", weight=4, target_per_week=4, is_active=False),
+]
+
+
+async def _expected(db: AsyncSession, user_id, year: int) -> list:
+    habits = await ScoreEngine.get_active_habits(db, user_id)
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    entries = await EntryStore.get_completed(db, user_id, start, end)
+    return [
+        ScoreEngine.score_day(habits, entries, start + timedelta(days=i))["weighted_score"]
+        for i in range((end - start).days + 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_year_matches_score_day_and_is_cached(db_session: AsyncSession, test_user, seed_history):
+    year = date.today().year - 1
+    await seed_history(test_user.id, HABITS, days=365, rate=0.5, seed=5, end=date(year, 12, 31))
+
+    heatmap = await Heatmap.get_year(db_session, db_session, test_user, year)
+    assert heatmap["start"] == date(year, 1, 1)
+    assert heatmap["end"] == date(year, 12, 31)
+    assert heatmap["weighted_scores"] == await _expected(db_session, test_user.id, year)
+
+    cached = await db_session.scalar(select(HeatmapYear).where(HeatmapYear.user_id == test_user.id))
+    assert cached.year == year and cached.version == test_user.data_version
+
+
+@pytest.mark.asyncio
+async def test_entry_writes_patch_the_cached_year(
+    client: AsyncClient, auth_headers, db_session: AsyncSession, test_user, seed_history
+):
+    year = date.today().year
+    habits, _ = await seed_history(test_user.id, HABITS, days=365, rate=0.5, seed=5, end=date(year - 1, 12, 31))
+    resp = await client.get("/api/analytics/heatmap", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["year"] == year
+
+    today = date.today().isoformat()
+    for habit, completed in ((habits[0], True), (habits[1], True), (habits[1], True), (habits[0], False)):
+        resp = await client.post("/api/entries", json={
+            "habit_id": str(habit.id), "entry_date": today, "completed": completed
+        }, headers=auth_headers)
+        assert resp.status_code < 400
+
+    # Still the cached row, moved along with each write
+    cached = (await db_session.execute(
+        select(HeatmapYear.version, HeatmapYear.cells, User.data_version).join(
+            User, User.id == HeatmapYear.user_id
+        ).where(HeatmapYear.user_id == test_user.id, HeatmapYear.year == year)
+    )).one()
+    assert cached.version == cached.data_version
+    assert cached.cells[date.today().timetuple().tm_yday - 1] == habits[1].weight
+
+    resp = await client.get("/api/analytics/heatmap", headers=auth_headers)
+    assert resp.json()["weighted_scores"] == await _expected(db_session, test_user.id, year)
+
+
+@pytest.mark.asyncio
+async def test_stale_computation_is_not_stored(db_session: AsyncSession, test_user, seed_history):
+    year = date.today().year - 1
+    await seed_history(test_user.id, HABITS, days=365, rate=0.5, seed=5, end=date(year, 12, 31))
+    version = test_user.data_version
+    total_weight, cells = await Heatmap._compute(db_session, test_user.id, year)
+
+    await DataVersion.bump(db_session, test_user.id)
+    reader = SimpleNamespace(id=test_user.id, data_version=version)
+    await Heatmap._store(db_session, reader, year, total_weight, cells)
+    assert await db_session.scalar(select(HeatmapYear).where(HeatmapYear.user_id == test_user.id)) is None
+
+
+@pytest.mark.asyncio
+async def test_last_supported_year(client: AsyncClient, auth_headers, test_user):
+    resp = await client.get("/api/analytics/heatmap?year=9999", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.json()["end"] == "9999-12-31"
+    assert len(resp.json()["weighted_scores"]) == 365
@@ -0,0 +1,109 @@
+"""
+Request metrics and /metrics endpoint tests
+"""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import settings
+from middleware import metrics
+from middleware.db_timing import RequestDBStats, TimedQueuePool, _current, install_db_timing
+from tests.conftest import TEST_DB_URL
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = metrics.Histogram((0.1, 0.2, 0.4))
+    for value in [0.05] * 50 + [0.15] * 40 + [0.3] * 10:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.1)
+    assert histogram.quantile(0.7) == pytest.approx(0.15)
+    assert histogram.quantile(0.95) == pytest.approx(0.3)
+    assert histogram.cumulative() == [("0.1", 50), ("0.2", 90), ("0.4", 100), ("+Inf", 100)]
+
+    histogram.observe(5.0)
+    assert histogram.quantile(1.0) == 0.4
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes(client: AsyncClient, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    for _ in range(3):
+        assert (await client.get("/api/analytics/today", headers=auth_headers)).status_code == 200
+    await client.get("/api/nowhere")
+
+    resp = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+
+    route = 'method="GET",route="/api/analytics/today"'
+    assert f'ppas_http_requests_total{{{route},status="200"}} 3' in body
+    assert f'ppas_http_request_duration_seconds_bucket{{{route},le="+Inf"}} 3' in body
+    assert f'ppas_http_request_duration_seconds_count{{{route}}} 3' in body
+    assert f'ppas_db_queries_per_request_count{{{route}}} 3' in body
+    # Unknown paths share one series instead of one per URL
+    assert 'route="<unmatched>",status="404"' in body
+    assert "/api/nowhere" not in body
+
+    summary = metrics.route_summary()["GET /api/analytics/today"]
+    assert summary["requests"] == 3
+    assert summary["p50_ms"] <= summary["p99_ms"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_token(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    assert (await client.get("/metrics")).status_code == 404
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert (await client.get("/metrics")).status_code == 401
+    resp = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_is_timed_per_request():
+    engine = create_async_engine(TEST_DB_URL, poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+    stats = RequestDBStats()
+    token = _current.set(stats)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        _current.reset(token)
+        await engine.dispose()
+
+    # The first checkout opens the connection, so the wait is never zero
+    assert stats.pool_wait > 0
+    assert "ppas_db_pool_wait_seconds_count 1" in metrics.render_prometheus()
+
+
+@pytest.mark.asyncio
+async def test_failed_statements_leave_no_timing_state():
+    engine = create_async_engine(TEST_DB_URL, poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+    install_db_timing(engine)
+    stats = RequestDBStats()
+    token = _current.set(stats)
+    try:
+        async with engine.connect() as conn:
+            info = dict(conn.sync_connection.info)
+            for _ in range(3):
+                with pytest.raises(DBAPIError):
+                    await conn.execute(text("SELECT 1 / 0"))
+                await conn.rollback()
+            await conn.execute(text("SELECT 1"))
+            assert conn.sync_connection.info == info
+    finally:
+        _current.reset(token)
+        await engine.dispose()
+
+    assert stats.query_count == 1
@@ -0,0 +1,78 @@
+"""
+Partition manager tests
+"""
+from datetime import date
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.habit import Habit
+from models.entry import DailyEntry
+from services.partition_manager import PartitionManager
+
+
+def test_add_months_wraps_years():
+    """Month arithmetic crosses year boundaries"""
+    assert PartitionManager.add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert PartitionManager.add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert PartitionManager.partition_name(date(2024, 3, 1)) == "daily_entries_2024_03"
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_upcoming_months(db_session: AsyncSession):
+    """Current month and the requested months ahead get partitions"""
+    conn = await db_session.connection()
+    await PartitionManager.ensure_partitions(conn, 2, today=date(2031, 5, 17))
+
+    months = await PartitionManager.list_partitions(conn)
+    assert {date(2031, 5, 1), date(2031, 6, 1), date(2031, 7, 1)} <= set(months)
+    # Second run is a no-op
+    assert await PartitionManager.ensure_partitions(conn, 2, today=date(2031, 5, 17)) == []
+
+
+@pytest.mark.asyncio
+async def test_create_partition_moves_rows_from_default(db_session: AsyncSession, test_user):
+    """Rows already in the default partition are moved into the new month"""
+    habit = Habit(user_id=test_user.id, name="Read")
+    db_session.add(habit)
+    await db_session.flush()
+    db_session.add(DailyEntry(
+        user_id=test_user.id, habit_id=habit.id, entry_date=date(2019, 4, 10), completed=True
+    ))
+    await db_session.flush()
+
+    conn = await db_session.connection()
+    assert await PartitionManager.create_partition(conn, date(2019, 4, 1)) is True
+
+    moved = await conn.execute(text("SELECT count(*) FROM daily_entries_2019_04"))
+    assert moved.scalar() == 1
+    left = await conn.execute(text(
+        "SELECT count(*) FROM daily_entries_default WHERE entry_date = '2019-04-10'"
+    ))
+    assert left.scalar() == 0
+
+    assert await PartitionManager.detach_partition(conn, date(2019, 4, 1)) is True
+    assert date(2019, 4, 1) not in await PartitionManager.list_partitions(conn)
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_moves_history_out_of_default(db_session: AsyncSession, test_user):
+    """Months reloaded into the default partition get their own, and can then expire"""
+    habit = Habit(user_id=test_user.id, name="Read")
+    db_session.add(habit)
+    await db_session.flush()
+    db_session.add_all([
+        DailyEntry(user_id=test_user.id, habit_id=habit.id, entry_date=day, completed=True)
+        for day in (date(2018, 2, 3), date(2018, 2, 27), date(2018, 7, 14))
+    ])
+    await db_session.flush()
+
+    conn = await db_session.connection()
+    created = await PartitionManager.ensure_partitions(conn, 0, today=date(2031, 5, 17))
+    assert created[:2] == ["daily_entries_2018_02", "daily_entries_2018_07"]
+    assert await PartitionManager.default_months(conn) == []
+    moved = await conn.execute(text("SELECT count(*) FROM daily_entries_2018_02"))
+    assert moved.scalar() == 2
+
+    detached = await PartitionManager.detach_expired(conn, 12, today=date(2031, 5, 17))
+    assert {"daily_entries_2018_02", "daily_entries_2018_07"} <= set(detached)
@@ -0,0 +1,79 @@
+"""
+Request profiler tests
+"""
+import time
+import orjson
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from main import app
+from config import settings
+from middleware.profiler import Profile, ProfilerMiddleware, _active, install_profiler, sign, verify
+
+SECRET = "profile-secret"
+
+
+def test_signature_is_bound_to_path_and_expiry():
+    expires = int(time.time()) + 60
+    value = sign(SECRET, "/api/analytics/month", expires)
+    assert verify(SECRET, "/api/analytics/month", value)
+    assert not verify(SECRET, "/api/analytics/week", value)
+    assert not verify("other-secret", "/api/analytics/month", value)
+    assert not verify(SECRET, "/api/analytics/month", sign(SECRET, "/api/analytics/month", int(time.time()) - 1))
+    assert not verify(SECRET, "/api/analytics/month", "garbage")
+
+
+@pytest.mark.asyncio
+async def test_signed_request_is_profiled(client, auth_headers, test_engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SECRET", SECRET)
+    install_profiler(test_engine)
+    # `client` installs the test database overrides on the app
+    profiled = ProfilerMiddleware(app, secret=SECRET, directory=str(tmp_path), interval_ms=0.5)
+    async with AsyncClient(transport=ASGITransport(app=profiled), base_url="http://test") as ac:
+        plain = await ac.get("/api/analytics/month", headers=auth_headers)
+        assert "x-profile-id" not in plain.headers
+
+        forged = await ac.get(
+            "/api/analytics/month",
+            headers={**auth_headers, "X-Profile": sign("wrong", "/api/analytics/month", int(time.time()) + 60)}
+        )
+        assert forged.status_code == 200
+        assert "x-profile-id" not in forged.headers
+
+        header = sign(SECRET, "/api/analytics/month", int(time.time()) + 60)
+        resp = await ac.get("/api/analytics/month", headers={**auth_headers, "X-Profile": header})
+
+    assert resp.status_code == 200
+    profile_id = resp.headers["x-profile-id"]
+    meta = orjson.loads((tmp_path / f"{profile_id}.json").read_bytes())
+    assert meta["path"] == "/api/analytics/month"
+    assert meta["sql"] and all(span["duration_ms"] >= 0 for span in meta["sql"])
+
+    folded = (tmp_path / f"{profile_id}.folded").read_text().splitlines()
+    assert folded
+    for line in folded:
+        stack, _, count = line.rpartition(" ")
+        assert stack and int(count) > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_statements_leave_no_profiling_state(test_engine, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_SECRET", SECRET)
+    install_profiler(test_engine)
+    profile = Profile(0, 0.001)
+    token = _active.set(profile)
+    try:
+        async with test_engine.connect() as conn:
+            info = dict(conn.sync_connection.info)
+            for _ in range(3):
+                with pytest.raises(DBAPIError):
+                    await conn.execute(text("SELECT 1 / 0"))
+                await conn.rollback()
+            await conn.execute(text("SELECT 1"))
+            assert conn.sync_connection.info == info
+    finally:
+        _active.reset(token)
+
+    assert [span["statement"] for span in profile.spans] == ["SELECT 1"]
@@ -0,0 +1,183 @@
+"""
+Query-count budgets for every endpoint
+
+Each endpoint is called against a small and a large data set. The number of
+SQL statements must stay within the declared budget and must not grow with
+the data: a loop of per-day or per-week queries fails here before it ships.
+When a change legitimately needs another round trip, raise the budget in the
+same commit.
+"""
+import uuid
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.entry import DailyEntry
+from models.habit import Habit
+from routers.stream import stream_scores
+from services.auth_service import AuthService
+from services.data_version import DataVersion
+
+# (habits, days of history) per run
+SMALL, LARGE = (2, 7), (6, 70)
+
+# Exact counts today, including the user lookup done by the auth dependency.
+# Lower a budget when an endpoint gets cheaper.
+BUDGETS = {
+    # auth
+    "POST /api/auth/register": 3,
+    "POST /api/auth/login": 1,
+    "POST /api/auth/refresh": 1,
+    "GET /api/auth/me": 1,
+    # habits
+    "GET /api/habits": 2,
+    "POST /api/habits": 5,
+    "GET /api/habits/{habit_id}": 2,
+    "PUT /api/habits/{habit_id}": 5,
+    "DELETE /api/habits/{habit_id}": 4,
+    "POST /api/habits/{habit_id}/reorder": 4,
+    # entries
+    "GET /api/entries/today": 3,
+    "GET /api/entries/date/{entry_date}": 3,
+    "GET /api/entries/week/{week_start}": 3,
+    "POST /api/entries": 10,
+    "PUT /api/entries/{entry_id}": 9,
+    # the entry was not completed; deleting a completed one also splits its
+    # streak and re-evaluates its goal threshold
+    "DELETE /api/entries/{entry_id}": 6,
+    # analytics
+    "GET /api/analytics/today": 3,
+    "GET /api/analytics/week": 3,
+    "GET /api/analytics/week/{week_start}": 3,
+    "GET /api/analytics/month": 4,
+    "GET /api/analytics/month/{year}/{month}": 4,
+    "GET /api/analytics/trends": 2,
+    "GET /api/analytics/range": 3,
+    "GET /api/analytics/compare": 3,
+    "GET /api/analytics/rolling": 3,
+    # a cache miss: lookup, one grouped query, store
+    "GET /api/analytics/heatmap": 4,
+    "GET /api/analytics/correlations": 3,
+    "GET /api/analytics/weekday-profile": 3,
+    "GET /api/analytics/seasonality": 3,
+    "GET /api/analytics/streaks": 3,
+    # habits, the completed range and the weekly trend query
+    "GET /api/analytics/dashboard": 5,
+    "POST /api/analytics/simulate": 3,
+    # stream (seeding only; the event loop itself issues no SQL)
+    "GET /api/stream": 2,
+}
+
+
+async def _seed(db: AsyncSession, user_id, size) -> dict:
+    """`habits` active habits with alternating completions over `days` days"""
+    habit_count, days = size
+    today = date.today()
+    habits = [Habit(user_id=user_id, name=f"Habit {i}", target_per_week=5) for i in range(habit_count)]
+    db.add_all(habits)
+    await db.flush()
+    db.add_all([
+        DailyEntry(
+            user_id=user_id,
+            habit_id=habit.id,
+            entry_date=today - timedelta(days=day),
+            completed=(day + i) % 2 == 0
+        )
+        for i, habit in enumerate(habits)
+        for day in range(days)
+    ])
+    await db.flush()
+    entry = DailyEntry(user_id=user_id, habit_id=habits[0].id, entry_date=today - timedelta(days=days + 1))
+    db.add(entry)
+    await db.flush()
+    # As the write endpoints do, so nothing cached for the previous seed is reused
+    await DataVersion.bump(db, user_id)
+
+    past_week = today - timedelta(days=today.weekday() + 14)
+    last_month = today.replace(day=1) - timedelta(days=1)
+    return {
+        "habit_id": habits[0].id,
+        "entry_id": entry.id,
+        "entry_day": entry.entry_date.isoformat(),
+        "entry_date": (today - timedelta(days=3)).isoformat(),
+        "week_start": past_week.isoformat(),
+        "year": last_month.year,
+        "month": last_month.month,
+    }
+
+
+def _request(endpoint: str, ids: dict, user) -> dict:
+    """Method, URL and body for one endpoint"""
+    method, path = endpoint.split(" ")
+    url = path.format(**ids)
+    body = None
+    if endpoint == "POST /api/auth/register":
+        body = {"email": f"{uuid.uuid4().hex}@example.com", "password": "password123", "name": "Budget"}
+    elif endpoint == "POST /api/auth/login":
+        body = {"email": user.email, "password": "password123"}
+    elif endpoint == "POST /api/auth/refresh":
+        body = {"refresh_token": AuthService.create_refresh_token(user.id)}
+    elif endpoint == "POST /api/habits":
+        body = {"name": "New habit"}
+    elif endpoint == "PUT /api/habits/{habit_id}":
+        body = {"name": "Renamed"}
+    elif endpoint == "POST /api/habits/{habit_id}/reorder":
+        url += "?new_order=3"
+    elif endpoint == "POST /api/entries":
+        body = {"habit_id": str(ids["habit_id"]), "entry_date": ids["entry_date"], "completed": True}
+    elif endpoint == "PUT /api/entries/{entry_id}":
+        url += f"?entry_date={ids['entry_day']}"
+        body = {"completed": True}
+    elif endpoint == "GET /api/analytics/range":
+        url += f"?start={ids['week_start']}&end={date.today().isoformat()}"
+    elif endpoint == "GET /api/analytics/compare":
+        url += "?period=month"
+    elif endpoint == "POST /api/analytics/simulate":
+        body = {"weeks": 12, "habits": [{"habit_id": str(ids["habit_id"]), "weight": 9}]}
+    elif endpoint == "DELETE /api/entries/{entry_id}":
+        url += f"?entry_date={ids['entry_day']}"
+    return {"method": method, "url": url, "json": body}
+
+
+async def _count(client, db_session, count_queries, user, headers, endpoint, size) -> int:
+    ids = await _seed(db_session, user.id, size)
+    if endpoint == "GET /api/stream":
+        # Called directly: the streaming body never ends on its own
+        with count_queries() as queries:
+            response = await stream_scores(request=None, db=db_session, current_user=user)
+        await anext(response.body_iterator)
+        await response.body_iterator.aclose()
+        return queries.count
+
+    request = _request(endpoint, ids, user)
+    with count_queries() as queries:
+        resp = await client.request(
+            request["method"], request["url"], json=request["json"], headers=headers
+        )
+    assert resp.status_code < 400, f"{endpoint}: {resp.status_code} {resp.text}"
+    return queries.count
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("endpoint", list(BUDGETS))
+async def test_query_budget(
+    endpoint, client: AsyncClient, db_session, count_queries, test_user, auth_headers
+):
+    small = await _count(client, db_session, count_queries, test_user, auth_headers, endpoint, SMALL)
+    # Same user, more data: the large seed adds to the small one
+    large = await _count(client, db_session, count_queries, test_user, auth_headers, endpoint, LARGE)
+
+    assert small <= BUDGETS[endpoint], f"{endpoint} issued {small} queries, budget {BUDGETS[endpoint]}"
+    assert large == small, f"{endpoint} issued {small} queries for {SMALL}, {large} for {LARGE}"
+
+
+def test_every_route_has_a_budget():
+    from main import app
+    routes = {
+        f"{method} {route.path}"
+        for route in app.routes
+        if route.path.startswith("/api/")
+        for method in getattr(route, "methods", ()) - {"HEAD"}
+    }
+    assert routes == set(BUDGETS)
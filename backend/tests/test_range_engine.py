@@ -0,0 +1,94 @@
+"""
+Range engine tests - one aggregate query against score_week and a direct count
+"""
+import statistics
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.entry_store import EntryStore
+from services.range_engine import RangeEngine
+from services.score_engine import ScoreEngine
+
+
+HABITS = [
+    dict(name="Run", weight=3, target_per_week=3, display_order=0),
+    dict(name="Read", weight=5, target_per_week=7, display_order=1),
+    dict(name="Write", weight=2, target_per_week=5, display_order=2),
+    dict(name="Old", weight=4, target_per_week=4, is_active=False),
+]
+
+
+@pytest.mark.asyncio
+async def test_week_range_matches_score_week(db_session: AsyncSession, test_user, seed_history):
+    await seed_history(test_user.id, HABITS, days=150, rate=0.6, seed=6)
+    habits = await ScoreEngine.get_active_habits(db_session, test_user.id)
+    for weeks_back in (1, 3, 9):
+        week_start, week_end = ScoreEngine.get_week_bounds(date.today() - timedelta(weeks=weeks_back))
+        entries = await EntryStore.get_completed(db_session, test_user.id, week_start, week_end)
+        expected = ScoreEngine.score_week(habits, entries, week_start)
+
+        actual = await RangeEngine.score_range(db_session, test_user.id, week_start, week_end)
+        for key in ("completion_rate", "weighted_score", "consistency_score", "total_completed"):
+            assert actual[key] == pytest.approx(expected[key], abs=0.11), key
+        assert {hb["habit_id"]: hb["completed_count"] for hb in actual["habit_breakdown"]} == {
+            hb["habit_id"]: hb["completed_count"] for hb in expected["habit_breakdown"]
+        }
+
+
+@pytest.mark.asyncio
+async def test_arbitrary_range_matches_direct_count(db_session: AsyncSession, test_user, seed_history):
+    await seed_history(test_user.id, HABITS, days=150, rate=0.6, seed=6)
+    habits = await ScoreEngine.get_active_habits(db_session, test_user.id)
+    start, end = date.today() - timedelta(days=100), date.today() - timedelta(days=14)
+    entries = await EntryStore.get_completed(db_session, test_user.id, start, end)
+    days = (end - start).days + 1
+
+    actual = await RangeEngine.score_range(db_session, test_user.id, start, end)
+    assert actual["days"] == days
+    assert actual["total_completed"] == len(entries)
+    daily = [
+        round(sum(e.entry_date == start + timedelta(days=i) for e in entries) / len(habits) * 100, 1)
+        for i in range(days)
+    ]
+    assert actual["consistency_score"] == pytest.approx(
+        max(0, 100 - statistics.variance(daily) / 10), abs=0.11
+    )
+    run = next(hb for hb in actual["habit_breakdown"] if hb["habit_name"] == "Run")
+    run_id = next(h.id for h in habits if h.name == "Run")
+    completed = sum(e.habit_id == run_id for e in entries)
+    assert run["target_count"] == round(3 * days / 7, 1)
+    assert run["completion_rate"] == pytest.approx(min(completed / (3 * days / 7) * 100, 100), abs=0.051)
+
+
+@pytest.mark.asyncio
+async def test_period_counts_many_periods_in_one_query(
+    db_session: AsyncSession, test_user, count_queries, seed_history
+):
+    await seed_history(test_user.id, HABITS, days=150, rate=0.6, seed=6)
+    today = date.today()
+    periods = [(today - timedelta(days=d + 9), today - timedelta(days=d)) for d in range(0, 120, 10)]
+    with count_queries() as queries:
+        counts = await RangeEngine.period_counts(db_session, test_user.id, 3, periods)
+    assert queries.count == 1
+    for (start, end), period in zip(periods, counts):
+        entries = await EntryStore.get_completed(db_session, test_user.id, start, end)
+        assert period["total_completed"] == len(entries)
+
+
+@pytest.mark.asyncio
+async def test_range_endpoint(client: AsyncClient, auth_headers, db_session: AsyncSession, test_user, seed_history):
+    await seed_history(test_user.id, HABITS, days=20, rate=0.6, seed=6)
+    today = date.today()
+    resp = await client.get(
+        f"/api/analytics/range?start={(today - timedelta(days=9)).isoformat()}&end={today.isoformat()}",
+        headers=auth_headers
+    )
+    assert resp.status_code == 200
+    assert resp.json()["days"] == 10
+    resp = await client.get(
+        f"/api/analytics/range?start={today.isoformat()}&end={(today - timedelta(days=1)).isoformat()}",
+        headers=auth_headers
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,69 @@
+"""
+Token-bucket rate limiter tests
+"""
+import uuid
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from middleware.rate_limiter import InMemoryBucketStore, RateLimitMiddleware
+from services.auth_service import AuthService
+
+
+def test_bucket_refills_over_time():
+    store = InMemoryBucketStore()
+    rate, capacity = 1.0, 2.0
+    assert store.take_now("k", rate, capacity, now=0.0) == 0
+    assert store.take_now("k", rate, capacity, now=0.0) == 0
+    assert store.take_now("k", rate, capacity, now=0.0) == pytest.approx(1.0)
+    assert store.take_now("k", rate, capacity, now=0.5) == pytest.approx(0.5)
+    assert store.take_now("k", rate, capacity, now=1.0) == 0
+
+
+def test_sweep_drops_only_full_buckets():
+    store = InMemoryBucketStore(shards=1, sweep_every=3)
+    store.take_now("slow", 0.01, 5.0, now=0.0)
+    store.take_now("fast", 100.0, 5.0, now=0.0)
+    store.take_now("other", 100.0, 5.0, now=1.0)  # third call sweeps at t=1
+    assert len(store) == 2
+
+
+def _limited_app(per_minute: int = 2, auth_per_hour: int = 1):
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[
+        Route("/api/things", ok),
+        Route("/api/auth/login", ok, methods=["POST"]),
+    ])
+    return RateLimitMiddleware(
+        app, store=InMemoryBucketStore(), per_minute=per_minute, auth_per_hour=auth_per_hour
+    )
+
+
+@pytest.mark.asyncio
+async def test_limits_per_user_not_per_ip():
+    """Two users behind one IP each get their own bucket"""
+    first = {"Authorization": f"Bearer {AuthService.create_access_token(uuid.uuid4())}"}
+    second = {"Authorization": f"Bearer {AuthService.create_access_token(uuid.uuid4())}"}
+
+    async with AsyncClient(transport=ASGITransport(app=_limited_app()), base_url="http://test") as client:
+        assert (await client.get("/api/things", headers=first)).status_code == 200
+        assert (await client.get("/api/things", headers=first)).status_code == 200
+        limited = await client.get("/api/things", headers=first)
+        assert limited.status_code == 429
+        assert limited.json()["error"] == "RATE_LIMITED"
+        assert int(limited.headers["retry-after"]) >= 1
+
+        assert (await client.get("/api/things", headers=second)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_auth_routes_limited_per_ip():
+    async with AsyncClient(transport=ASGITransport(app=_limited_app()), base_url="http://test") as client:
+        assert (await client.post("/api/auth/login")).status_code == 200
+        assert (await client.post("/api/auth/login")).status_code == 429
+        # The general bucket for the same IP is separate
+        assert (await client.get("/api/things")).status_code == 200
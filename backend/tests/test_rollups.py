@@ -0,0 +1,159 @@
+"""
+Rollup tests - incremental updates against a rebuild and a brute-force series
+"""
+import random
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.entry import DailyEntry
+from models.rollup import HabitRollup
+from services.rollups import Rollups, ALPHAS, WINDOWS
+
+
+HABITS = [
+    dict(name="Run", weight=3, target_per_week=3),
+    dict(name="Read", weight=5, target_per_week=7),
+]
+
+
+async def _rows(db: AsyncSession, user_id) -> list:
+    result = await db.execute(
+        select(HabitRollup).where(HabitRollup.user_id == user_id).order_by(HabitRollup.habit_id, HabitRollup.day)
+    )
+    return [
+        (r.habit_id, r.day, r.completed_total, *(getattr(r, f"ewma_{w}") for w in WINDOWS))
+        for r in result.scalars().all()
+    ]
+
+
+def _assert_same(actual: list, expected: list):
+    assert [row[:3] for row in actual] == [row[:3] for row in expected]
+    for a, e in zip(actual, expected):
+        assert a[3:] == pytest.approx(e[3:], abs=1e-9)
+
+
+@pytest.mark.asyncio
+async def test_incremental_updates_match_rebuild(db_session: AsyncSession, test_user, seed_history):
+    habits, _ = await seed_history(test_user.id, HABITS)
+    rng = random.Random(3)
+    today = date.today()
+    state = {}
+    # Out-of-order writes, including undoing and repeating the same day
+    for _ in range(300):
+        habit = rng.choice(habits)
+        day = today - timedelta(days=rng.randrange(200))
+        completed = rng.random() < 0.65
+        await Rollups.apply(db_session, test_user.id, habit.id, day, completed)
+        state[(habit.id, day)] = completed
+
+    incremental = await _rows(db_session, test_user.id)
+
+    db_session.add_all([
+        DailyEntry(user_id=test_user.id, habit_id=habit_id, entry_date=day, completed=completed)
+        for (habit_id, day), completed in state.items()
+    ])
+    await db_session.flush()
+    await Rollups.rebuild(db_session, test_user.id)
+    rebuilt = await _rows(db_session, test_user.id)
+
+    # A day undone after being completed leaves a zero-change checkpoint behind
+    def checkpoints_only(rows):
+        kept, last = [], {}
+        for row in rows:
+            if last.get(row[0]) != row[2]:
+                kept.append(row)
+            last[row[0]] = row[2]
+        return kept
+
+    _assert_same(checkpoints_only(incremental), rebuilt)
+
+
+@pytest.mark.asyncio
+async def test_apply_is_idempotent(db_session: AsyncSession, test_user, seed_history):
+    habits, _ = await seed_history(test_user.id, HABITS)
+    habit = habits[0]
+    today = date.today()
+    for day in (5, 3, 1):
+        await Rollups.apply(db_session, test_user.id, habit.id, today - timedelta(days=day), True)
+    before = await _rows(db_session, test_user.id)
+
+    await Rollups.apply(db_session, test_user.id, habit.id, today - timedelta(days=3), True)
+    await Rollups.apply(db_session, test_user.id, habit.id, today - timedelta(days=4), False)
+    _assert_same(await _rows(db_session, test_user.id), before)
+
+
+@pytest.mark.asyncio
+async def test_series_match_brute_force(db_session: AsyncSession, test_user, seed_history):
+    habits, _ = await seed_history(test_user.id, HABITS)
+    rng = random.Random(11)
+    today = date.today()
+    done = {
+        habit.id: {today - timedelta(days=d) for d in range(400) if rng.random() < 0.5}
+        for habit in habits
+    }
+    for habit in habits:
+        for day in done[habit.id]:
+            await Rollups.apply(db_session, test_user.id, habit.id, day, True)
+
+    start = today - timedelta(days=59)
+    series = await Rollups.get_series(db_session, test_user.id, start, today)
+    assert len(series["dates"]) == 60
+
+    def ewma(days: set, window: int, day: date) -> float:
+        alpha, value = ALPHAS[window], 0.0
+        for offset in range(1000, -1, -1):
+            value = (1 - alpha) * value + alpha * ((day - timedelta(days=offset)) in days)
+        return value
+
+    total_weight = sum(h.weight for h in habits)
+    for entry in series["overall"]:
+        window = entry["window"]
+        for i, day in enumerate(series["dates"]):
+            counts = {
+                h.id: sum((day - timedelta(days=k)) in done[h.id] for k in range(window)) for h in habits
+            }
+            ewmas = {h.id: ewma(done[h.id], window, day) for h in habits}
+            assert entry["completion_rates"][i] == pytest.approx(
+                round(sum(counts.values()) / (len(habits) * window) * 100, 1), abs=0.051
+            )
+            assert entry["weighted_scores"][i] == pytest.approx(
+                round(sum(h.weight * counts[h.id] for h in habits) / (total_weight * window) * 100, 1), abs=0.051
+            )
+            assert entry["ewma_weighted_scores"][i] == pytest.approx(
+                round(sum(h.weight * ewmas[h.id] for h in habits) / total_weight * 100, 1), abs=0.051
+            )
+    read = next(h for h in series["habits"] if h["habit_name"] == "Read")
+    assert read["windows"][0]["completion_rates"][-1] == pytest.approx(
+        round(sum((today - timedelta(days=k)) in done[habits[1].id] for k in range(7)) / 7 * 100, 1)
+    )
+
+
+@pytest.mark.asyncio
+async def test_rolling_endpoint_follows_entry_writes(
+    client: AsyncClient, auth_headers, db_session, test_user, seed_history
+):
+    habits, _ = await seed_history(test_user.id, HABITS)
+    habit = habits[0]
+    today = date.today()
+    for day in range(3):
+        resp = await client.post("/api/entries", json={
+            "habit_id": str(habit.id),
+            "entry_date": (today - timedelta(days=day)).isoformat(),
+            "completed": True,
+        }, headers=auth_headers)
+        assert resp.status_code < 400
+
+    resp = await client.get("/api/analytics/rolling?days=5&window=7", headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data["dates"]) == 5
+    [overall] = data["overall"]
+    assert overall["window"] == 7
+    # 3 of 7 days for one of two equally counted habits
+    assert overall["completion_rates"][-1] == round(3 / 14 * 100, 1)
+
+    resp = await client.get("/api/analytics/rolling?window=10", headers=auth_headers)
+    assert resp.status_code == 400
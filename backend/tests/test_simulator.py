@@ -0,0 +1,95 @@
+"""
+Simulator tests - vectorized re-scoring against score_week
+"""
+import uuid
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.habit import Habit
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+from services.simulator import Simulator, UnknownHabit
+from services.trend_engine import TrendEngine
+
+
+HABITS = [
+    dict(name="Run", weight=3, target_per_week=3, goal_threshold=70, display_order=0),
+    dict(name="Read", weight=5, target_per_week=7, goal_threshold=80, display_order=1),
+    dict(name="Write", weight=2, target_per_week=5, goal_threshold=60, display_order=2),
+    dict(name="Old", weight=4, target_per_week=4, is_active=False),
+]
+
+
+async def _score_weeks(db: AsyncSession, user_id, habits: list, weeks: int) -> list:
+    first_week, last_week = TrendEngine.weekly_range(date.today(), weeks)
+    entries = await EntryStore.get_completed(db, user_id, first_week, last_week + timedelta(days=6))
+    return [ScoreEngine.score_week(habits, entries, first_week + timedelta(weeks=i)) for i in range(weeks)]
+
+
+def _detached(habit: Habit, **settings) -> Habit:
+    values = {s: getattr(habit, s) for s in ("weight", "target_per_week", "goal_threshold")}
+    values.update(settings)
+    return Habit(id=habit.id, name=habit.name, category=habit.category, **values)
+
+
+@pytest.mark.asyncio
+async def test_simulation_matches_score_week(db_session: AsyncSession, test_user, seed_history):
+    habits, _ = await seed_history(test_user.id, HABITS, days=120, rate=0.55, seed=9)
+    active = habits[:3]
+    changes = {active[0].id: {"target_per_week": 5, "weight": 8}, active[2].id: {"goal_threshold": 30}}
+    result = await Simulator.simulate(db_session, test_user.id, changes, 16, date.today())
+
+    for key, simulated_habits in (
+        ("current", [_detached(h) for h in active]),
+        ("simulated", [_detached(h, **changes.get(h.id, {})) for h in active]),
+    ):
+        expected = await _score_weeks(db_session, test_user.id, simulated_habits, 16)
+        series = result[key]
+        assert series["completion_rates"] == pytest.approx([w["completion_rate"] for w in expected], abs=0.11)
+        assert series["weighted_scores"] == pytest.approx([w["weighted_score"] for w in expected], abs=0.11)
+        assert series["habits_below_threshold"] == [
+            sum(hb["is_below_threshold"] for hb in w["habit_breakdown"]) for w in expected
+        ]
+        for i, habit in enumerate(result["habits"]):
+            assert habit[key]["completion_rates"] == pytest.approx(
+                [w["habit_breakdown"][i]["completion_rate"] for w in expected], abs=0.11
+            )
+
+    run = result["habits"][0]
+    assert run["current_settings"]["target_per_week"] == 3
+    assert run["simulated_settings"] == {"weight": 8, "target_per_week": 5, "goal_threshold": 70}
+
+
+@pytest.mark.asyncio
+async def test_simulate_endpoint_writes_nothing(
+    client: AsyncClient, auth_headers, db_session: AsyncSession, test_user, seed_history
+):
+    habits, _ = await seed_history(test_user.id, HABITS, days=120, rate=0.55, seed=9)
+    resp = await client.post("/api/analytics/simulate", json={
+        "weeks": 52,
+        "habits": [{"habit_id": str(habits[1].id), "target_per_week": 4}],
+    }, headers=auth_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data["week_starts"]) == len(data["simulated"]["weighted_scores"]) == 52
+    assert (await db_session.scalar(select(Habit.target_per_week).where(Habit.id == habits[1].id))) == 7
+
+    resp = await client.post("/api/analytics/simulate", json={
+        "habits": [{"habit_id": str(habits[3].id), "weight": 1}],
+    }, headers=auth_headers)
+    assert resp.status_code == 404
+    resp = await client.post("/api/analytics/simulate", json={
+        "habits": [{"habit_id": str(uuid.uuid4()), "weight": 11}],
+    }, headers=auth_headers)
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_unknown_habit_is_reported(db_session: AsyncSession, test_user):
+    habit_id = uuid.uuid4()
+    with pytest.raises(UnknownHabit) as raised:
+        await Simulator.simulate(db_session, test_user.id, {habit_id: {"weight": 3}}, 4, date.today())
+    assert raised.value.habit_id == habit_id
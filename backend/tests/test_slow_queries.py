@@ -0,0 +1,72 @@
+"""
+Slow-query log tests
+"""
+import logging
+import orjson
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from middleware.slow_queries import SlowQueryLog, redact
+
+
+def test_redact_keeps_types_only():
+    assert redact(("secret@example.com", 42)) == ["str", "int"]
+    assert redact({"email": "secret@example.com"}) == {"email": "str"}
+    assert redact([("a", 1), ("b", 2)]) == [["str", "int"], "... 2 sets"]
+
+
+async def _slow_service_call(db: AsyncSession):
+    await db.execute(text("SELECT pg_sleep(0.02), :email AS email"), {"email": "secret@example.com"})
+
+
+@pytest.mark.asyncio
+async def test_slow_query_logged_with_origin_and_plan(test_engine, db_session, caplog):
+    slow_log = SlowQueryLog(test_engine, logging.getLogger("test.slow_queries"), threshold_ms=10)
+    slow_log.install()
+
+    with caplog.at_level(logging.WARNING, logger="test.slow_queries"):
+        await db_session.execute(text("SELECT 1"))
+        await _slow_service_call(db_session)
+        await slow_log.drain()
+
+    assert len(caplog.records) == 1
+    entry = orjson.loads(caplog.records[0].getMessage())
+    assert entry["duration_ms"] >= 10
+    assert entry["origin"].startswith("_slow_service_call (tests/test_slow_queries.py:")
+    assert "secret" not in caplog.records[0].getMessage()
+    assert entry["parameters"] == ["str"]
+    assert "Result" in entry["plan"]
+
+
+@pytest.mark.asyncio
+async def test_sampling_and_explain_interval(test_engine, db_session, caplog):
+    slow_log = SlowQueryLog(test_engine, logging.getLogger("test.slow_queries"), threshold_ms=10)
+    slow_log.install()
+
+    with caplog.at_level(logging.WARNING, logger="test.slow_queries"):
+        for _ in range(2):
+            await _slow_service_call(db_session)
+            await slow_log.drain()
+        slow_log.sample_rate = 0.0
+        await _slow_service_call(db_session)
+
+    entries = [orjson.loads(record.getMessage()) for record in caplog.records]
+    # Logged twice, explained once per interval, not logged at all when unsampled
+    assert [entry["plan"] is not None for entry in entries] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_failed_statements_leave_no_state(test_engine, db_session):
+    slow_log = SlowQueryLog(test_engine, logging.getLogger("test.slow_queries"), threshold_ms=10)
+    slow_log.install()
+    conn = await db_session.connection()
+    info = dict(conn.sync_connection.info)
+    for _ in range(3):
+        savepoint = await db_session.begin_nested()
+        with pytest.raises(DBAPIError):
+            await db_session.execute(text("SELECT 1 / 0"))
+        await savepoint.rollback()
+    await db_session.execute(text("SELECT 1"))
+    assert conn.sync_connection.info == info
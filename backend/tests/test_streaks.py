@@ -0,0 +1,117 @@
+"""
+Streak tests - incremental merges and splits against run-length encoding
+"""
+import random
+from collections import namedtuple
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.entry import DailyEntry
+from models.streak import HabitStreak
+from services.rollups import Rollups
+from services.streaks import Streaks
+
+Completed = namedtuple("Completed", "habit_id entry_date")
+
+
+HABITS = [
+    dict(name="Run", display_order=0),
+    dict(name="Read", display_order=1),
+]
+
+
+async def _write(db: AsyncSession, user_id, habit_id, day: date, completed: bool):
+    delta = await Rollups.apply(db, user_id, habit_id, day, completed)
+    await Streaks.apply(db, user_id, habit_id, day, delta)
+
+
+async def _runs(db: AsyncSession, user_id) -> list:
+    result = await db.execute(
+        select(HabitStreak.habit_id, HabitStreak.start_day, HabitStreak.end_day)
+        .where(HabitStreak.user_id == user_id)
+        .order_by(HabitStreak.habit_id, HabitStreak.start_day)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+def test_run_length_encoding():
+    a, b = "a", "b"
+    day = date(2024, 3, 1)
+    rows = [Completed(a, day + timedelta(days=d)) for d in (0, 1, 2, 5, 7, 8)]
+    rows += [Completed(b, day + timedelta(days=d)) for d in (2, 3)]
+    runs = [(r["habit_id"], r["start_day"].day, r["end_day"].day) for r in Streaks.runs(rows)]
+    assert runs == [(a, 1, 3), (a, 6, 6), (a, 8, 9), (b, 3, 4)]
+    assert Streaks.runs([]) == []
+
+
+@pytest.mark.asyncio
+async def test_incremental_updates_match_rebuild(db_session: AsyncSession, test_user, seed_history):
+    habits, _ = await seed_history(test_user.id, HABITS)
+    rng = random.Random(8)
+    today = date.today()
+    state = {}
+    for _ in range(400):
+        habit = rng.choice(habits)
+        day = today - timedelta(days=rng.randrange(60))
+        completed = rng.random() < 0.7
+        await _write(db_session, test_user.id, habit.id, day, completed)
+        state[(habit.id, day)] = completed
+    incremental = await _runs(db_session, test_user.id)
+
+    db_session.add_all([
+        DailyEntry(user_id=test_user.id, habit_id=habit_id, entry_date=day, completed=completed)
+        for (habit_id, day), completed in state.items()
+    ])
+    await db_session.flush()
+    await Streaks.rebuild(db_session, test_user.id)
+    assert incremental == await _runs(db_session, test_user.id)
+
+
+@pytest.mark.asyncio
+async def test_backdated_entry_joins_two_streaks(db_session: AsyncSession, test_user, seed_history):
+    habits, _ = await seed_history(test_user.id, HABITS)
+    habit = habits[0]
+    today = date.today()
+    for days_ago in (0, 1, 3, 4, 5):
+        await _write(db_session, test_user.id, habit.id, today - timedelta(days=days_ago), True)
+    assert len(await _runs(db_session, test_user.id)) == 2
+
+    await _write(db_session, test_user.id, habit.id, today - timedelta(days=2), True)
+    assert await _runs(db_session, test_user.id) == [(habit.id, today - timedelta(days=5), today)]
+
+    await _write(db_session, test_user.id, habit.id, today - timedelta(days=3), False)
+    assert await _runs(db_session, test_user.id) == [
+        (habit.id, today - timedelta(days=5), today - timedelta(days=4)),
+        (habit.id, today - timedelta(days=2), today),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_streaks_endpoint(client: AsyncClient, auth_headers, db_session: AsyncSession, test_user, seed_history):
+    (run, read), _ = await seed_history(test_user.id, HABITS)
+    today = date.today()
+    for days_ago in (0, 1, 2, 10, 11, 12, 13, 20):
+        resp = await client.post("/api/entries", json={
+            "habit_id": str(run.id),
+            "entry_date": (today - timedelta(days=days_ago)).isoformat(),
+            "completed": True,
+        }, headers=auth_headers)
+        assert resp.status_code < 400
+    await _write(db_session, test_user.id, read.id, today - timedelta(days=1), True)
+
+    resp = await client.get("/api/analytics/streaks?history=2", headers=auth_headers)
+    assert resp.status_code == 200
+    run_streaks, read_streaks = resp.json()["habits"]
+    assert run_streaks["current_streak"] == 3
+    assert run_streaks["best_streak"] == 4
+    assert run_streaks["best_run"]["end"] == (today - timedelta(days=10)).isoformat()
+    assert [r["length"] for r in run_streaks["history"]] == [3, 4]
+    # Not yet done today
+    assert read_streaks["current_streak"] == 0 and read_streaks["best_streak"] == 1
+
+    resp = await client.get("/api/analytics/streaks?history=0", headers=auth_headers)
+    run_streaks = resp.json()["habits"][0]
+    assert run_streaks["current_streak"] == 3 and run_streaks["history"] == []
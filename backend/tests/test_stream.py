@@ -0,0 +1,143 @@
+"""
+Live score stream tests
+"""
+import asyncio
+import uuid
+from collections import namedtuple
+from datetime import date, timedelta
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.habit import Habit
+from routers.stream import _event_stream
+from services.change_events import ChangeEvents
+from services.events import InProcessBroker, OVERFLOW, get_broker
+from services.live_scores import LiveScoreState
+from services.score_engine import ScoreEngine
+
+Completed = namedtuple("Completed", "habit_id entry_date")
+
+
+def _habit(weight: int = 1, target: int = 7) -> Habit:
+    return Habit(id=uuid.uuid4(), name="h", weight=weight, target_per_week=target, goal_threshold=80)
+
+
+def _expected(habits, entries, today):
+    day = ScoreEngine.score_day(habits, entries, today)
+    week = ScoreEngine.score_week(habits, entries, ScoreEngine.get_week_bounds(today)[0])
+    return {
+        "date": today,
+        "completed": day["completed"],
+        "total": day["total"],
+        "completion_rate": day["completion_rate"],
+        "streak_days": ScoreEngine.streak_from(entries, today),
+        "week_completion_rate": week["completion_rate"],
+        "week_weighted_score": week["weighted_score"],
+    }
+
+
+def test_live_state_matches_full_recompute():
+    """Each incremental update equals scoring the changed data from scratch"""
+    today = date.today()
+    habits = [_habit(weight=3, target=5), _habit(weight=1, target=3)]
+    entries = {Completed(habits[0].id, today - timedelta(days=d)) for d in range(1, 4)}
+    state = LiveScoreState(habits, list(entries), today)
+    assert state.snapshot() == _expected(habits, list(entries), today)
+
+    changes = [
+        (habits[0].id, today, True),
+        (habits[1].id, today, True),
+        (habits[0].id, today - timedelta(days=2), False),
+        (habits[1].id, today, True),  # replay, no change
+        (habits[0].id, today - timedelta(days=2), True),
+    ]
+    for habit_id, day, completed in changes:
+        before = set(entries)
+        if completed:
+            entries.add(Completed(habit_id, day))
+        else:
+            entries.discard(Completed(habit_id, day))
+        snapshot = state.apply(habit_id, day, completed)
+        if entries == before:
+            assert snapshot is None
+        else:
+            assert snapshot == _expected(habits, list(entries), today)
+
+
+@pytest.mark.asyncio
+async def test_broker_fans_out_per_user_and_flags_overflow():
+    broker = InProcessBroker(queue_size=2)
+    user_a, user_b = uuid.uuid4(), uuid.uuid4()
+    first, second = broker.subscribe(user_a), broker.subscribe(user_a)
+    other = broker.subscribe(user_b)
+
+    await broker.publish(user_a, {"type": "entry"})
+    assert first.get_nowait() == second.get_nowait() == {"type": "entry"}
+    assert other.empty()
+
+    for _ in range(3):
+        await broker.publish(user_b, {"type": "entry"})
+    assert other.get_nowait() == OVERFLOW
+
+    broker.unsubscribe(user_a, first)
+    broker.unsubscribe(user_a, second)
+    assert broker.subscriber_count(user_a) == 0
+
+
+@pytest.mark.asyncio
+async def test_change_published_only_after_commit(db_session: AsyncSession, test_user):
+    """Events wait for the writing transaction to commit"""
+    broker = get_broker()
+    queue = broker.subscribe(test_user.id)
+    try:
+        habit = Habit(user_id=test_user.id, name="Read")
+        db_session.add(habit)
+        await db_session.flush()
+        habit_id = habit.id
+        await ChangeEvents.entry_changed(db_session, test_user.id, habit_id, date.today(), True)
+        await asyncio.sleep(0)
+        assert queue.empty()
+
+        await db_session.commit()
+        change = await asyncio.wait_for(queue.get(), timeout=1)
+        assert change == {
+            "type": "entry",
+            "habit_id": str(habit_id),
+            "entry_date": date.today().isoformat(),
+            "completed": True,
+        }
+    finally:
+        broker.unsubscribe(test_user.id, queue)
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_event_stream_sends_snapshot_score_and_resync():
+    broker = get_broker()
+    user_id = uuid.uuid4()
+    habit = _habit()
+    queue = broker.subscribe(user_id)
+    state = LiveScoreState([habit], [], date.today())
+    stream = _event_stream(_ConnectedRequest(), user_id, queue, state)
+
+    assert (await anext(stream)).startswith(b"event: snapshot\n")
+
+    await broker.publish(user_id, {
+        "type": "entry",
+        "habit_id": str(habit.id),
+        "entry_date": date.today().isoformat(),
+        "completed": True,
+    })
+    score = await anext(stream)
+    assert score.startswith(b"event: score\n")
+    assert b'"completed":1' in score
+
+    await broker.publish(user_id, {"type": "habits"})
+    assert (await anext(stream)).startswith(b"event: resync\n")
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+    assert broker.subscriber_count(user_id) == 0
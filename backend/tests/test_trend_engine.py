@@ -0,0 +1,93 @@
+"""
+Trend engine tests - SQL series against the Python scoring they replace
+"""
+from datetime import date, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.aggregator import Aggregator
+from services.entry_store import EntryStore
+from services.score_engine import ScoreEngine
+from services.trend_engine import TrendEngine
+
+
+HABITS = [
+    dict(name="Run", weight=3, target_per_week=3, is_physical=True),
+    dict(name="Read", weight=5, target_per_week=7),
+    dict(name="Write", weight=2, target_per_week=5),
+    dict(name="Old", weight=4, target_per_week=4, is_active=False),
+]
+
+
+def _weekly_trends(habits: list, entries: list, today: date, lookback: int) -> dict:
+    """The weekly series scored week by week with score_week"""
+    current_week, _ = ScoreEngine.get_week_bounds(today)
+    weeks = [current_week - timedelta(weeks=i) for i in range(lookback - 1, -1, -1)]
+    scores = [ScoreEngine.score_week(habits, entries, week_start) for week_start in weeks]
+    return {
+        "labels": [week_start.strftime("%b %d") for week_start in weeks],
+        "completion_rates": [score["completion_rate"] for score in scores],
+        "weighted_scores": [score["weighted_score"] for score in scores],
+        "consistency_scores": [score["consistency_score"] for score in scores],
+    }
+
+
+@pytest.mark.asyncio
+async def test_weekly_trends_match_score_week(db_session: AsyncSession, test_user, seed_history):
+    await seed_history(test_user.id, HABITS, days=120, rate=0.6, seed=7, missed=0.3)
+    today = date.today()
+    lookback = 16
+
+    first_week, last_week = TrendEngine.weekly_range(today, lookback)
+    habits = await ScoreEngine.get_active_habits(db_session, test_user.id)
+    entries = await EntryStore.get_completed(db_session, test_user.id, first_week, last_week + timedelta(days=6))
+    expected = _weekly_trends(habits, entries, today, lookback)
+
+    actual = await TrendEngine.weekly_trends(db_session, test_user.id, today, lookback)
+    assert actual["labels"] == expected["labels"]
+    for series in ("completion_rates", "weighted_scores", "consistency_scores"):
+        assert actual[series] == pytest.approx(expected[series], abs=0.11), series
+
+
+@pytest.mark.asyncio
+async def test_monthly_trends_match_monthly_reports(db_session: AsyncSession, test_user, seed_history):
+    await seed_history(test_user.id, HABITS, days=200, rate=0.6, seed=7, missed=0.3)
+    today = date.today()
+    lookback = 7
+
+    expected = {"labels": [], "completion_rates": [], "weighted_scores": [], "consistency_scores": []}
+    for i in range(lookback - 1, -1, -1):
+        index = today.year * 12 + today.month - 1 - i
+        year, month = index // 12, index % 12 + 1
+        report, _ = Aggregator.summarize_month_data(
+            await Aggregator.fetch_month(db_session, test_user.id, year, month)
+        )
+        expected["labels"].append(date(year, month, 1).strftime("%b %Y"))
+        expected["completion_rates"].append(report["avg_completion_rate"])
+        expected["weighted_scores"].append(report["avg_weighted_score"])
+        expected["consistency_scores"].append(50 + report["consistency_trend"])
+
+    actual = await TrendEngine.monthly_trends(db_session, test_user.id, today, lookback)
+    assert actual["labels"] == expected["labels"]
+    for series in ("completion_rates", "weighted_scores", "consistency_scores"):
+        assert actual[series] == pytest.approx(expected[series], abs=0.11), series
+
+
+@pytest.mark.asyncio
+async def test_trends_without_habits_are_zero(db_session: AsyncSession, test_user):
+    weekly = await TrendEngine.weekly_trends(db_session, test_user.id, date.today(), 3)
+    assert weekly["completion_rates"] == weekly["weighted_scores"] == weekly["consistency_scores"] == [0.0] * 3
+    monthly = await TrendEngine.monthly_trends(db_session, test_user.id, date.today(), 0)
+    assert monthly["labels"] == []
+
+
+@pytest.mark.asyncio
+async def test_trends_endpoint_bounds_lookback(client: AsyncClient, auth_headers):
+    for period in ("weekly", "monthly"):
+        resp = await client.get(f"/api/analytics/trends?period={period}&lookback=260", headers=auth_headers)
+        assert resp.status_code == 200
+        assert len(resp.json()["labels"]) == 260
+        for lookback in (0, 261, 100000):
+            resp = await client.get(f"/api/analytics/trends?period={period}&lookback={lookback}", headers=auth_headers)
+            assert resp.status_code == 422, (period, lookback)
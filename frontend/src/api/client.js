@@ -107,6 +107,10 @@ class ApiClient {
     getWeekAnalytics(weekStart) { return weekStart ? this.request(`/analytics/week/${weekStart}`) : this.request('/analytics/week'); }
     getMonthAnalytics(year, month) { return year ? this.request(`/analytics/month/${year}/${month}`) : this.request('/analytics/month'); }
     getTrends(period = 'weekly', lookback = 8) { return this.request(`/analytics/trends?period=${period}&lookback=${lookback}`); }
+    getDashboard(lookback = 8) { return this.request(`/analytics/dashboard?lookback=${lookback}`); }
+
+    // Live score updates (server-sent events); EventSource cannot send headers
+    openStream() { return new EventSource(`${API_BASE}/stream?access_token=${encodeURIComponent(this.token)}`); }
 }
 
 export const api = new ApiClient();
@@ -5,13 +5,12 @@ import { TrendChart } from '../components/Charts';
 import { useAnalyticsStore, useHabitStore } from '../stores';
 
 export function DashboardPage() {
-    const { todayStats, trends, error, fetchTodayStats, fetchTrends, clearError } = useAnalyticsStore();
-    const { todayEntries, fetchTodayEntries } = useHabitStore();
+    const { todayStats, trends, error, fetchDashboard, connectStream, clearError } = useAnalyticsStore();
+    const { todayEntries } = useHabitStore();
 
     useEffect(() => {
-        fetchTodayStats();
-        fetchTodayEntries();
-        fetchTrends('weekly');
+        fetchDashboard();
+        return connectStream();
     }, []);
 
     if (!todayStats) return <LoadingState />;
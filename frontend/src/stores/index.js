@@ -173,6 +173,45 @@ export const useAnalyticsStore = create((set, get) => ({
         }
     },
 
+    // Today stats, this week, weekly trends and today's entries in one request
+    fetchDashboard: async () => {
+        try {
+            const data = await api.getDashboard();
+            set({ todayStats: data.today, weeklyData: data.week, trends: data.trends });
+            useHabitStore.setState({ todayEntries: data.entries });
+        } catch (e) {
+            set({ error: e.message });
+        }
+    },
+
+    // Subscribe to pushed score updates; returns a function that closes the stream
+    connectStream: () => {
+        const source = api.openStream();
+        const applyScore = (event) => {
+            const s = JSON.parse(event.data);
+            const { todayStats, weeklyData } = get();
+            set({
+                todayStats: todayStats && {
+                    ...todayStats,
+                    completed: s.completed,
+                    total: s.total,
+                    completion_rate: s.completion_rate,
+                    streak_days: s.streak_days
+                },
+                weeklyData: weeklyData && {
+                    ...weeklyData,
+                    completion_rate: s.week_completion_rate,
+                    weighted_score: s.week_weighted_score
+                }
+            });
+        };
+        source.addEventListener('snapshot', applyScore);
+        source.addEventListener('score', applyScore);
+        // Habits changed or the day rolled over; EventSource reconnects by itself
+        source.addEventListener('resync', () => get().fetchDashboard());
+        return () => source.close();
+    },
+
     fetchTrends: async (period = 'weekly') => {
         try {
             const data = await api.getTrends(period);